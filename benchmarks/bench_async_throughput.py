@@ -0,0 +1,218 @@
+"""Compare sync and async route handlers under many concurrent clients.
+
+Run with ``python benchmarks/bench_async_throughput.py``. Requests go through
+an in-process ASGI transport (no sockets), so the numbers isolate handler
+scheduling: sync handlers hold an anyio threadpool slot (40 by default) for
+the whole request, async handlers only await the database. The async side is
+the real application; the sync side mounts the same read paths written as
+before the port, on a session dependency shaped like ``get_session``.
+
+The sync side gets one pooled connection per client. With any smaller pool
+it stalls at this concurrency: a sync handler keeps its connection until the
+response is serialized, which needs another threadpool slot, while the slots
+are taken by handlers blocked on pool checkout; only the 30 s pool timeout
+breaks the cycle.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+# Before the app's engines are created on import.
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(tempfile.gettempdir()) / f'qc_bench_{os.getpid()}.db'}"
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException, Query
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, joinedload, selectinload, sessionmaker
+
+from quadral_cluster.database import Base, SessionLocal, async_engine, engine, share_engine_state
+from quadral_cluster.domain.socionics import QUADRA_SLOT_BITS, Quadra, SocType
+from quadral_cluster.main import app as async_app
+from quadral_cluster.models import availability, cluster, domain, preference  # noqa: F401
+from quadral_cluster.models.availability import Availability
+from quadral_cluster.models.cluster import Cluster, ClusterMember
+from quadral_cluster.models.domain import Profile, User
+from quadral_cluster.schemas import UserRead
+from quadral_cluster.services.matching import list_open_clusters_for_tim
+from quadral_cluster.utils.time_overlap import HOURS_PER_WEEK
+
+_DB_PATH = os.environ["DATABASE_URL"].removeprefix("sqlite:///")
+
+QUADRA = Quadra.BETA
+PRESENT_TIMS = [SocType.SLE, SocType.IEI, SocType.EIE]
+
+SyncSessionLocal = sessionmaker(autoflush=False)
+sync_app = FastAPI()
+
+
+def get_sync_session():
+    session = SyncSessionLocal()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+@sync_app.get("/users/{user_id}")
+def sync_get_user(user_id: int, session: Session = Depends(get_sync_session)) -> UserRead:
+    user = session.get(User, user_id, options=[selectinload(User.profile)])
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return UserRead.model_validate(user)
+
+
+@sync_app.get("/clusters/open")
+def sync_open_clusters(
+    quadra: str = Query(...),
+    tim: str = Query(...),
+    limit: int = Query(10),
+    user_id: int | None = Query(None),
+    session: Session = Depends(get_sync_session),
+) -> list[int]:
+    candidate = session.get(User, user_id, options=[joinedload(User.availability)])
+    clusters = list_open_clusters_for_tim(
+        Quadra(quadra), SocType(tim), limit=limit, session=session, candidate=candidate
+    )
+    return [item.cluster.id for item in clusters]
+
+
+def _populate(rng: random.Random, users: int, open_clusters: int) -> list[int]:
+    Base.metadata.create_all(engine)
+    with SessionLocal() as session:
+        rows = [
+            {
+                "username": f"user_{index}",
+                "email": f"user_{index}@example.com",
+                "socionics_type": PRESENT_TIMS[index % len(PRESENT_TIMS)].value,
+                "quadra": QUADRA.value,
+                "age": rng.randint(18, 60),
+            }
+            for index in range(users)
+        ]
+        ids = session.scalars(insert(User).returning(User.id, sort_by_parameter_order=True), rows).all()
+        session.execute(
+            insert(Profile),
+            [{"user_id": user_id, "socionics_type": rows[index]["socionics_type"]} for index, user_id in enumerate(ids)],
+        )
+        session.execute(
+            insert(Availability),
+            [{"user_id": user_id, "weekly_mask": rng.getrandbits(HOURS_PER_WEEK)} for user_id in ids],
+        )
+        cluster_ids = session.scalars(
+            insert(Cluster).returning(Cluster.id, sort_by_parameter_order=True),
+            [
+                {
+                    "quadra": QUADRA.value,
+                    "status": "locked",
+                    "member_count": 2,
+                    "occupied_tims": QUADRA_SLOT_BITS[PRESENT_TIMS[0]] | QUADRA_SLOT_BITS[PRESENT_TIMS[1]],
+                }
+                for _ in range(open_clusters)
+            ],
+        ).all()
+        session.execute(
+            insert(ClusterMember),
+            [
+                {"cluster_id": cluster_ids[index // 2], "user_id": user_id, "socionics_type": rows[index]["socionics_type"]}
+                for index, user_id in enumerate(ids[: open_clusters * 2])
+            ],
+        )
+        session.commit()
+        return list(ids)
+
+
+def _paths(rng: random.Random, user_ids: list[int], count: int) -> list[str]:
+    paths = []
+    for _ in range(count):
+        user_id = rng.choice(user_ids)
+        if rng.random() < 0.8:
+            paths.append(f"/users/{user_id}")
+        else:
+            paths.append(f"/clusters/open?quadra={QUADRA.value}&tim={SocType.LSI.value}&limit=5&user_id={user_id}")
+    return paths
+
+
+async def _run(app: FastAPI, clients: int, paths: list[str]) -> tuple[float, list[float], int]:
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for path in paths:
+        queue.put_nowait(path)
+    latencies: list[float] = []
+    failures = 0
+
+    async def client(http: httpx.AsyncClient) -> None:
+        nonlocal failures
+        while not queue.empty():
+            path = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                response = await http.get(path)
+                response.raise_for_status()
+            except Exception:  # pool timeouts surface as exceptions through the transport
+                failures += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+    return elapsed, latencies, failures
+
+
+def _report(label: str, elapsed: float, latencies: list[float], failures: int) -> None:
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1e3 if latencies else float("nan")
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)] * 1e3 if latencies else float("nan")
+    print(
+        f"{label:5}  {len(latencies) / elapsed:8.0f} req/s"
+        f"  p50 {p50:7.1f} ms  p95 {p95:7.1f} ms  failed {failures}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--open-clusters", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    user_ids = _populate(rng, args.users, args.open_clusters)
+    paths = _paths(rng, user_ids, args.requests)
+
+    sync_engine = create_engine(os.environ["DATABASE_URL"], pool_size=args.clients, max_overflow=0)
+    share_engine_state(engine, sync_engine)
+    SyncSessionLocal.configure(bind=sync_engine)
+
+    print(f"clients={args.clients} requests={len(paths)} users={args.users}")
+    try:
+        for label, app in (("sync", sync_app), ("async", async_app)):
+            await _run(app, args.clients, paths[: args.clients])  # warm pools and caches
+            _report(label, *await _run(app, args.clients, paths))
+    finally:
+        await async_engine.dispose()
+        sync_engine.dispose()
+        engine.dispose()
+        os.remove(_DB_PATH)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+"""Before/after benchmark for weekly availability overlap.
+
+Run with ``python benchmarks/bench_availability_overlap.py``. The "before"
+column reproduces the previous implementation that decoded both string masks
+into 168-element lists on every call; "after" works on packed integers.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from quadral_cluster.utils.time_overlap import (
+    HOURS_PER_WEEK,
+    decode_weekly_mask,
+    ensure_mask_length,
+    overlap,
+    pack_weekly_mask,
+)
+
+
+def _legacy_overlap(mask_a: str, mask_b: str) -> float:
+    bits_a = decode_weekly_mask(mask_a)
+    bits_b = decode_weekly_mask(mask_b)
+    total_a = sum(bits_a)
+    total_b = sum(bits_b)
+    if total_a == 0 and total_b == 0:
+        return 0.0
+    overlap_hours = sum(1 for bit_a, bit_b in zip(bits_a, bits_b) if bit_a and bit_b)
+    return overlap_hours / max(total_a, total_b, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pairs", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    strings = [
+        ensure_mask_length(1 if rng.random() < 0.35 else 0 for _ in range(HOURS_PER_WEEK))
+        for _ in range(512)
+    ]
+    packed = [pack_weekly_mask(decode_weekly_mask(mask)) for mask in strings]
+    pairs = [(rng.randrange(len(strings)), rng.randrange(len(strings))) for _ in range(args.pairs)]
+
+    before = min(
+        timeit.repeat(lambda: [_legacy_overlap(strings[i], strings[j]) for i, j in pairs], number=1, repeat=3)
+    )
+    after = min(timeit.repeat(lambda: [overlap(packed[i], packed[j]) for i, j in pairs], number=1, repeat=3))
+
+    for i, j in pairs[:1000]:
+        assert abs(_legacy_overlap(strings[i], strings[j]) - overlap(packed[i], packed[j])) < 1e-12
+
+    print(f"pairs:  {args.pairs}")
+    print(f"before: {before * 1e6 / args.pairs:8.2f} µs/pair  (decode + zip)")
+    print(f"after:  {after * 1e6 / args.pairs:8.2f} µs/pair  (popcount)")
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Compare per-item and batched availability/preference ingestion.
+
+Run with ``python benchmarks/bench_bulk_upserts.py``. The same bursts (one
+weekly grid per user, then swipe sessions of likes) are sent through an
+in-process ASGI transport twice: once as ``PUT /availability`` and
+``POST /preferences/like`` calls, once as ``/availability/batch`` and
+``/preferences/like/batch`` calls of ``--batch`` items. Reported: wall time
+and items written per second.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+# Before the app's engines are created on import.
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(tempfile.gettempdir()) / f'qc_bench_{os.getpid()}.db'}"
+
+import httpx
+from sqlalchemy import insert
+
+from quadral_cluster.database import SessionLocal, async_engine, engine, read_engine
+from quadral_cluster.main import app
+from quadral_cluster.migrations import upgrade_database
+from quadral_cluster.models.domain import User
+from quadral_cluster.utils.time_overlap import HOURS_PER_WEEK
+
+_DB_PATH = os.environ["DATABASE_URL"].removeprefix("sqlite:///")
+
+
+def _populate(users: int) -> list[int]:
+    upgrade_database(engine)
+    with SessionLocal() as session:
+        ids = session.scalars(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            [{"username": f"user_{index}", "socionics_type": "ILE"} for index in range(users)],
+        ).all()
+        session.commit()
+        return list(ids)
+
+
+def _workload(rng: random.Random, user_ids: list[int], likes_per_user: int):
+    grids = [
+        {"user_id": user_id, "weekly_mask": "".join(rng.choice("01") for _ in range(HOURS_PER_WEEK))}
+        for user_id in user_ids
+    ]
+    likes = [
+        {"from_user_id": user_id, "to_user_id": rng.choice(user_ids), "weight": rng.randint(-2, 2)}
+        for user_id in user_ids
+        for _ in range(likes_per_user)
+    ]
+    return grids, likes
+
+
+async def _per_item(http: httpx.AsyncClient, grids, likes) -> None:
+    for item in grids:
+        (await http.put("/availability", json=item)).raise_for_status()
+    for item in likes:
+        (await http.post("/preferences/like", json=item)).raise_for_status()
+
+
+async def _batched(http: httpx.AsyncClient, grids, likes, size: int) -> None:
+    for start in range(0, len(grids), size):
+        (await http.put("/availability/batch", json={"items": grids[start : start + size]})).raise_for_status()
+    for start in range(0, len(likes), size):
+        (await http.post("/preferences/like/batch", json={"items": likes[start : start + size]})).raise_for_status()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--likes-per-user", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    user_ids = _populate(args.users)
+    grids, likes = _workload(rng, user_ids, args.likes_per_user)
+    items = len(grids) + len(likes)
+
+    print(f"grids={len(grids)} likes={len(likes)} batch={args.batch}")
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            for label, run in (
+                ("per-item", lambda: _per_item(http, grids, likes)),
+                ("batched", lambda: _batched(http, grids, likes, args.batch)),
+            ):
+                started = time.perf_counter()
+                await run()
+                elapsed = time.perf_counter() - started
+                print(f"{label:8} {elapsed:7.2f} s  {items / elapsed:9.0f} items/s")
+    finally:
+        await async_engine.dispose()
+        if read_engine is not async_engine:
+            await read_engine.dispose()
+        engine.dispose()
+        os.remove(_DB_PATH)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
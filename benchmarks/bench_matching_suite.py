@@ -0,0 +1,237 @@
+"""Latency and throughput of the matching and scoring paths by population size.
+
+Run with ``python benchmarks/bench_matching_suite.py``. For every ``--sizes``
+entry a fresh SQLite file (with the application's pragmas) is migrated and
+filled by ``generate_population``; the same seed always yields the same
+data. Then each scenario runs ``--ops`` times, or until ``--max-seconds``
+have passed, after a few unrecorded warm-up calls:
+
+``find_or_create``
+    ``find_or_create_cluster_for_user`` for a random unclustered user of the
+    quadra, rolled back so every call sees the same database.
+``open_clusters``
+    ``list_open_clusters_for_tim`` ranked for a random candidate, as
+    ``GET /clusters/open?user_id=`` does.
+``recommendations``
+    The ``GET /matchmaking/recommendations`` work without HTTP and without
+    the per-user result cache: profile, memberships, engine ranking and the
+    cluster rows.
+``overlap_x1000``
+    1000 ``overlap`` calls on stored masks of random user pairs.
+
+Reported per scenario: p50/p95/p99/max latency in milliseconds and
+operations per second. Results are compared with the saved baselines in
+``benchmarks/baselines/matching_suite.json``; a scenario regresses when its
+p50 or p95 exceeds the baseline by more than ``--tolerance`` (default 2×:
+shared machines easily swing by half, and the check is after complexity
+regressions rather than small drifts), and the run then exits with status
+1. ``--save`` records the current numbers as the new baseline for the sizes
+that ran. Baselines are machine-specific: refresh them on the machine that
+checks them.
+
+``--db-dir`` keeps generated databases between runs (the 1M-user population
+takes minutes to write) and reuses them when size and seed match.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import numpy as np
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import selectinload, sessionmaker
+
+from quadral_cluster.config import Settings
+from quadral_cluster.database import engine_options, install_sqlite_pragmas, sqlite_pragmas
+from quadral_cluster.domain.socionics import Quadra, SocType
+from quadral_cluster.migrations import upgrade_database
+from quadral_cluster.models.availability import Availability
+from quadral_cluster.models.cluster import MatchingClusterMember
+from quadral_cluster.models.domain import Cluster, ClusterMembership, Profile, User
+from quadral_cluster.services.matching import (
+    find_or_create_cluster_for_user,
+    list_open_clusters_for_tim,
+)
+from quadral_cluster.services.matchmaking import recommendation_engine_for
+from quadral_cluster.services.population import PopulationSpec, generate_population
+from quadral_cluster.utils.time_overlap import overlap
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines" / "matching_suite.json"
+WARMUP_OPS = 3
+OVERLAP_BATCH = 1000
+
+
+def _open_database(users: int, seed: int, db_dir: str | None):
+    if db_dir:
+        path = Path(db_dir) / f"population_{users}_{seed}.db"
+        reuse = path.exists()
+    else:
+        fd, name = tempfile.mkstemp(prefix="qc_bench_", suffix=".db")
+        os.close(fd)
+        path, reuse = Path(name), False
+
+    url = f"sqlite:///{path}"
+    settings = Settings()
+    engine = create_engine(url, **engine_options(url, settings))
+    install_sqlite_pragmas(engine, sqlite_pragmas(settings))
+    factory = sessionmaker(bind=engine, autoflush=False)
+
+    populate_seconds = None
+    if not reuse:
+        upgrade_database(engine)
+        with factory() as session:
+            populate_seconds = generate_population(session, PopulationSpec(users=users, seed=seed)).elapsed
+    return engine, factory, path, populate_seconds
+
+
+def _scenarios(factory: sessionmaker, rng: random.Random) -> dict[str, Callable[[], None]]:
+    with factory() as session:
+        clustered = select(MatchingClusterMember.id).where(MatchingClusterMember.user_id == User.id).exists()
+        unclustered = session.execute(select(User.id, User.quadra).where(~clustered)).all()
+        users = session.execute(select(User.id, User.quadra, User.socionics_type)).all()
+        with_profile = session.scalars(select(Profile.user_id)).all()
+        masks = session.scalars(select(Availability.weekly_mask)).all()
+
+    def find_or_create() -> None:
+        user_id, quadra = rng.choice(unclustered)
+        with factory() as session:
+            find_or_create_cluster_for_user(user_id, Quadra(quadra), session=session)
+            session.rollback()
+
+    def open_clusters() -> None:
+        user_id, quadra, tim = rng.choice(users)
+        with factory() as session:
+            candidate = session.get(User, user_id)
+            list_open_clusters_for_tim(Quadra(quadra), SocType(tim), 10, session=session, candidate=candidate)
+
+    def recommendations() -> None:
+        user_id = rng.choice(with_profile)
+        with factory() as session:
+            user = session.scalars(select(User).where(User.id == user_id).options(selectinload(User.profile))).one()
+            member_of = session.scalars(
+                select(ClusterMembership.cluster_id).where(ClusterMembership.user_id == user_id)
+            ).all()
+            ranked = recommendation_engine_for(session).recommend(session, user.profile, 10, exclude=member_of)
+            session.scalars(select(Cluster).where(Cluster.id.in_([item.cluster_id for item in ranked]))).all()
+
+    def overlap_x1000() -> None:
+        for _ in range(OVERLAP_BATCH):
+            overlap(rng.choice(masks), rng.choice(masks))
+
+    return {
+        "find_or_create": find_or_create,
+        "open_clusters": open_clusters,
+        "recommendations": recommendations,
+        "overlap_x1000": overlap_x1000,
+    }
+
+
+def _measure(operation: Callable[[], None], ops: int, max_seconds: float) -> dict[str, float]:
+    for _ in range(WARMUP_OPS):
+        operation()
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < ops and time.perf_counter() - started < max_seconds:
+        call_started = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1e3, [50, 95, 99])
+    return {
+        "ops": len(latencies),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(max(latencies) * 1e3, 3),
+        "ops_per_s": round(len(latencies) / elapsed, 1),
+    }
+
+
+def _regressions(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    found = []
+    for name, result in current["scenarios"].items():
+        reference = baseline.get("scenarios", {}).get(name)
+        if reference is None:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            if result[metric] > reference[metric] * (1 + tolerance):
+                found.append(f"{name} {metric} {result[metric]:.3f} > {reference[metric]:.3f} × {1 + tolerance:.2f}")
+    return found
+
+
+def _environment() -> dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.machine(),
+        "processor": platform.processor() or "unknown",
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000], help="e.g. 1000 10000 100000 1000000")
+    parser.add_argument("--ops", type=int, default=200)
+    parser.add_argument("--max-seconds", type=float, default=30.0, help="time budget per scenario")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--tolerance", type=float, default=1.0, help="allowed slowdown before failing, 1.0 = 2x")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--db-dir", help="keep and reuse generated databases in this directory")
+    args = parser.parse_args()
+
+    saved = json.loads(args.baseline.read_text()) if args.baseline.exists() else {"sizes": {}}
+    results: dict[str, dict] = {}
+    regressions: list[str] = []
+
+    for users in args.sizes:
+        engine, factory, path, populate_seconds = _open_database(users, args.seed, args.db_dir)
+        try:
+            rng = random.Random(args.seed)
+            scenarios = {
+                name: _measure(run, args.ops, args.max_seconds) for name, run in _scenarios(factory, rng).items()
+            }
+        finally:
+            engine.dispose()
+            if not args.db_dir:
+                os.remove(path)
+
+        result = {"populate_s": populate_seconds and round(populate_seconds, 2), "scenarios": scenarios}
+        results[str(users)] = result
+        print(f"users={users}" + ("" if populate_seconds is None else f"  populated in {populate_seconds:.1f} s"))
+        for name, stats in scenarios.items():
+            print(
+                f"  {name:16} p50 {stats['p50_ms']:9.3f}  p95 {stats['p95_ms']:9.3f}  p99 {stats['p99_ms']:9.3f}"
+                f"  max {stats['max_ms']:9.3f} ms  {stats['ops_per_s']:9.1f} ops/s  (n={stats['ops']})"
+            )
+        if not args.save and str(users) in saved["sizes"]:
+            found = _regressions(result, saved["sizes"][str(users)], args.tolerance)
+            regressions.extend(f"users={users} {line}" for line in found)
+
+    if args.save:
+        saved.update({"environment": _environment(), "seed": args.seed, "ops": args.ops})
+        saved["sizes"].update(results)
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(saved, indent=2, sort_keys=True) + "\n")
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,143 @@
+"""Candidate-aware ``GET /clusters/open`` ranking benchmark.
+
+Run with ``python benchmarks/bench_open_clusters.py``. Builds an in-memory
+quadra of synthetic open clusters with two members each and ranks them for
+random candidates with ``list_open_clusters_for_tim``, hydrating the top
+``--limit`` as the route does. "before" drops the engine's
+``OpenClusterIndex`` ahead of every call, so members are read and packed per
+request; "after" ranks over the warm snapshot.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from quadral_cluster.database import Base
+from quadral_cluster.domain.socionics import QUADRA_MEMBERS, QUADRA_SLOT_BITS, Quadra, SocType
+from quadral_cluster.models import availability, cluster, domain, preference  # noqa: F401
+from quadral_cluster.models.availability import Availability
+from quadral_cluster.models.cluster import MatchingCluster, MatchingClusterMember
+from quadral_cluster.models.domain import User
+from quadral_cluster.models.preference import Preference
+from quadral_cluster.services.matching import list_open_clusters_for_tim, open_cluster_index_for
+from quadral_cluster.utils.time_overlap import HOURS_PER_WEEK
+
+QUADRA = Quadra.BETA
+CANDIDATE_TIM = SocType.EIE
+TIMEZONES = [None, "Europe/Moscow", "Europe/Berlin", "Asia/Omsk", "America/New_York"]
+
+
+def _populate(session, rng: random.Random, clusters: int, candidates: int) -> list[int]:
+    member_tims = sorted(QUADRA_MEMBERS[QUADRA] - {CANDIDATE_TIM}, key=lambda tim: tim.value)
+    users, members, cluster_rows = [], [], []
+    for index in range(clusters):
+        tims = rng.sample(member_tims, 2)
+        cluster_rows.append(
+            {
+                "id": index + 1,
+                "quadra": QUADRA.value,
+                "status": rng.choice(("open", "locked")),
+                "occupied_tims": sum(QUADRA_SLOT_BITS[tim] for tim in tims),
+                "member_count": len(tims),
+            }
+        )
+        for tim in tims:
+            user_id = len(users) + 1
+            users.append((user_id, tim))
+            members.append({"cluster_id": index + 1, "user_id": user_id, "socionics_type": tim.value})
+    candidate_ids = list(range(len(users) + 1, len(users) + candidates + 1))
+    users.extend((user_id, CANDIDATE_TIM) for user_id in candidate_ids)
+
+    session.execute(
+        insert(User),
+        [
+            {
+                "id": user_id,
+                "username": f"user_{user_id}",
+                "socionics_type": tim.value,
+                "quadra": QUADRA.value,
+                "age": rng.randint(18, 60),
+                "timezone": rng.choice(TIMEZONES),
+            }
+            for user_id, tim in users
+        ],
+    )
+    session.execute(
+        insert(Availability),
+        [{"user_id": user_id, "weekly_mask": rng.getrandbits(HOURS_PER_WEEK)} for user_id, _ in users],
+    )
+    session.execute(insert(MatchingCluster), cluster_rows)
+    session.execute(insert(MatchingClusterMember), members)
+    likes = {
+        (rng.choice(candidate_ids), rng.randint(1, len(members))): rng.choice((-2, -1, 1, 2))
+        for _ in range(len(members))
+    }
+    session.execute(
+        insert(Preference),
+        [{"from_user_id": left, "to_user_id": right, "weight": weight} for (left, right), weight in likes.items()],
+    )
+    session.commit()
+    return candidate_ids
+
+
+def _percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _summary(samples: list[float]) -> str:
+    return (
+        f"p50 {_percentile(samples, 0.5) * 1e3:7.2f} ms  p95 {_percentile(samples, 0.95) * 1e3:7.2f} ms"
+        f"  mean {statistics.fmean(samples) * 1e3:7.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clusters", type=int, default=10_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False, future=True)
+    with factory() as session:
+        candidate_ids = _populate(session, rng, args.clusters, args.queries)
+
+    def rank(candidate_id: int, cold: bool) -> float:
+        with factory() as session:
+            if cold:
+                open_cluster_index_for(session).invalidate()
+            started = time.perf_counter()
+            candidate = session.get(User, candidate_id)
+            ranked = list_open_clusters_for_tim(
+                QUADRA, CANDIDATE_TIM, args.limit, session=session, candidate=candidate
+            )
+            elapsed = time.perf_counter() - started
+        assert len(ranked) == min(args.limit, args.clusters)
+        return elapsed
+
+    rank(candidate_ids[0], cold=False)  # preference index and scoring caches
+    before = [rank(candidate_id, cold=True) for candidate_id in candidate_ids[:20]]
+    after = [rank(candidate_id, cold=False) for candidate_id in candidate_ids]
+
+    print(f"clusters={args.clusters} members={2 * args.clusters} queries={args.queries} limit={args.limit}")
+    print(f"before  read per request  {_summary(before)}")
+    print(f"after   warm snapshot     {_summary(after)}")
+
+
+if __name__ == "__main__":
+    main()
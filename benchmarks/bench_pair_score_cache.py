@@ -0,0 +1,155 @@
+"""Replay a request trace against the pair score cache and report its hit rate.
+
+Run with ``python benchmarks/bench_pair_score_cache.py``. The trace mixes
+repeated ``find_or_create`` attempts (one TIM of the quadra is absent, so they
+keep scoring the pool), candidate-aware ``GET /clusters/open`` lookups and a
+trickle of availability writes that bump user versions. Users are drawn from
+a Zipf-like distribution, because most traffic is the same users refreshing.
+The trace runs once with the cache disabled and once enabled.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from quadral_cluster.database import Base, engine_state
+from quadral_cluster.domain.socionics import QUADRA_SLOT_BITS, Quadra, SocType
+from quadral_cluster.models import availability, cluster, domain, preference  # noqa: F401
+from quadral_cluster.models.availability import Availability
+from quadral_cluster.models.cluster import Cluster, ClusterMember
+from quadral_cluster.models.domain import User
+from quadral_cluster.services.matching import (
+    find_or_create_cluster_for_user,
+    list_open_clusters_for_tim,
+)
+from quadral_cluster.services.scoring_cache import (
+    PairScoreCache,
+    mark_scoring_inputs_changed,
+)
+from quadral_cluster.utils.time_overlap import HOURS_PER_WEEK
+
+QUADRA = Quadra.BETA
+PRESENT_TIMS = [SocType.SLE, SocType.IEI, SocType.EIE]
+TIMEZONES = ["Europe/Moscow", "Europe/Berlin", "Asia/Novosibirsk", None]
+
+
+def _populate(factory: sessionmaker, rng: random.Random, users: int, open_clusters: int) -> list[tuple[int, SocType]]:
+    with factory() as session:
+        rows = [
+            {
+                "username": f"user_{index}",
+                "socionics_type": PRESENT_TIMS[index % len(PRESENT_TIMS)].value,
+                "quadra": QUADRA.value,
+                "age": rng.randint(18, 60),
+                "timezone": rng.choice(TIMEZONES),
+            }
+            for index in range(users)
+        ]
+        ids = session.scalars(insert(User).returning(User.id, sort_by_parameter_order=True), rows).all()
+        session.execute(
+            insert(Availability),
+            [{"user_id": user_id, "weekly_mask": rng.getrandbits(HOURS_PER_WEEK)} for user_id in ids],
+        )
+
+        members = ids[: open_clusters * 2]
+        cluster_ids = session.scalars(
+            insert(Cluster).returning(Cluster.id, sort_by_parameter_order=True),
+            [
+                {
+                    "quadra": QUADRA.value,
+                    "status": "locked",
+                    "member_count": 2,
+                    "occupied_tims": QUADRA_SLOT_BITS[PRESENT_TIMS[0]] | QUADRA_SLOT_BITS[PRESENT_TIMS[1]],
+                }
+                for _ in range(open_clusters)
+            ],
+        ).all()
+        session.execute(
+            insert(ClusterMember),
+            [
+                {
+                    "cluster_id": cluster_ids[index // 2],
+                    "user_id": user_id,
+                    "socionics_type": rows[index]["socionics_type"],
+                }
+                for index, user_id in enumerate(members)
+            ],
+        )
+        session.commit()
+        free = ids[open_clusters * 2 :]
+        return [(user_id, PRESENT_TIMS[ids.index(user_id) % len(PRESENT_TIMS)]) for user_id in free]
+
+
+def _trace(rng: random.Random, users: list[tuple[int, SocType]], requests: int) -> list[tuple[str, int, SocType]]:
+    weights = [1.0 / (rank + 1) ** 1.1 for rank in range(len(users))]
+    hot = rng.choices(users, weights=weights, k=requests)
+    trace = []
+    for user_id, tim in hot:
+        roll = rng.random()
+        if roll < 0.05:
+            trace.append(("write", rng.choice(users)[0], tim))
+        elif roll < 0.40:
+            trace.append(("open", user_id, tim))
+        else:
+            trace.append(("find_or_create", user_id, tim))
+    return trace
+
+
+def _replay(factory: sessionmaker, trace: list[tuple[str, int, SocType]], seed: int) -> float:
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    for action, user_id, tim in trace:
+        with factory() as session:
+            if action == "write":
+                session.merge(Availability(user_id=user_id, weekly_mask=rng.getrandbits(HOURS_PER_WEEK)))
+                session.flush()
+                mark_scoring_inputs_changed(session, [user_id])
+            elif action == "open":
+                candidate = session.get(User, user_id)
+                list_open_clusters_for_tim(QUADRA, SocType.LSI, limit=10, session=session, candidate=candidate)
+            else:
+                find_or_create_cluster_for_user(user_id, QUADRA, session=session)
+            session.commit()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=3_000)
+    parser.add_argument("--open-clusters", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False, future=True)
+    free_users = _populate(factory, rng, args.users, args.open_clusters)
+    trace = _trace(rng, free_users, args.requests)
+
+    with factory() as session:
+        state = engine_state(session)
+
+    print(f"users={args.users} open_clusters={args.open_clusters} requests={len(trace)}")
+    for label, maxsize in (("disabled", 0), ("enabled", 200_000)):
+        cache = state["pair_score_cache"] = PairScoreCache(maxsize)
+        elapsed = _replay(factory, trace, args.seed)
+        stats = cache.stats()
+        print(
+            f"cache {label:8}  {elapsed:7.2f} s  {elapsed / len(trace) * 1e3:7.2f} ms/request"
+            f"  hit rate {stats.hit_rate:6.1%}  stale {stats.stale}  size {stats.size}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Measure read endpoints on the read-only session against the committing one.
+
+Run with ``python benchmarks/bench_read_session.py``. A mixed workload (reads
+plus ``PUT /availability`` writes) is replayed through an in-process ASGI
+transport twice: once with the read routes on ``get_read_session`` and once
+with that dependency overridden by the committing ``get_async_session``.
+Reported per run: read latency, the number of COMMITs issued by the engines
+and how many requests failed (for example on ``database is locked``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+# Before the app's engines are created on import.
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(tempfile.gettempdir()) / f'qc_bench_{os.getpid()}.db'}"
+
+import httpx
+from sqlalchemy import event, insert
+
+from quadral_cluster.database import (
+    Base,
+    SessionLocal,
+    async_engine,
+    engine,
+    get_async_session,
+    get_read_session,
+    read_engine,
+)
+from quadral_cluster.main import app
+from quadral_cluster.models import availability, cluster, domain, preference  # noqa: F401
+from quadral_cluster.models.domain import Cluster, Profile, User
+
+_DB_PATH = os.environ["DATABASE_URL"].removeprefix("sqlite:///")
+
+LANGUAGES = ["ru", "en", "de"]
+
+_commits = 0
+
+
+def _count_commit(_connection) -> None:
+    global _commits
+    _commits += 1
+
+
+for _engine in {engine, async_engine.sync_engine, read_engine.sync_engine}:
+    event.listen(_engine, "commit", _count_commit)
+
+
+def _populate(rng: random.Random, users: int, clusters: int) -> tuple[list[int], list[int]]:
+    Base.metadata.create_all(engine)
+    with SessionLocal() as session:
+        user_ids = session.scalars(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            [{"username": f"user_{index}", "socionics_type": "ILE", "quadra": "alpha"} for index in range(users)],
+        ).all()
+        session.execute(insert(Profile), [{"user_id": user_id, "age": rng.randint(18, 60)} for user_id in user_ids])
+        cluster_ids = session.scalars(
+            insert(Cluster).returning(Cluster.id, sort_by_parameter_order=True),
+            [
+                {"name": f"cluster_{index}", "language": rng.choice(LANGUAGES), "activity_score": rng.random()}
+                for index in range(clusters)
+            ],
+        ).all()
+        session.commit()
+        return list(user_ids), list(cluster_ids)
+
+
+def _requests(rng: random.Random, user_ids: list[int], cluster_ids: list[int], count: int, writes: float):
+    trace = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < writes:
+            mask = "".join(rng.choice("01") for _ in range(168))
+            trace.append(("PUT", "/availability", {"user_id": rng.choice(user_ids), "weekly_mask": mask}))
+        elif roll < 0.5:
+            trace.append(("GET", f"/users/{rng.choice(user_ids)}", None))
+        elif roll < 0.8:
+            trace.append(("GET", f"/clusters/{rng.choice(cluster_ids)}", None))
+        else:
+            trace.append(("GET", f"/clusters/search?language={rng.choice(LANGUAGES)}&limit=20", None))
+    return trace
+
+
+async def _replay(trace, clients: int) -> tuple[list[float], int]:
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in trace:
+        queue.put_nowait(item)
+    read_latencies: list[float] = []
+    failures = 0
+
+    async def client(http: httpx.AsyncClient) -> None:
+        nonlocal failures
+        while not queue.empty():
+            method, path, body = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                response = await http.request(method, path, json=body)
+                response.raise_for_status()
+            except Exception:
+                failures += 1
+                continue
+            if method == "GET":
+                read_latencies.append(time.perf_counter() - started)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        await asyncio.gather(*(client(http) for _ in range(clients)))
+    return read_latencies, failures
+
+
+async def main() -> None:
+    global _commits
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=4_000)
+    parser.add_argument("--writes", type=float, default=0.1)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--clusters", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    user_ids, cluster_ids = _populate(rng, args.users, args.clusters)
+    trace = _requests(rng, user_ids, cluster_ids, args.requests, args.writes)
+
+    print(f"clients={args.clients} requests={len(trace)} writes={args.writes:.0%}")
+    try:
+        for label, override in (("commit", get_async_session), ("read-only", None)):
+            app.dependency_overrides.clear()
+            if override is not None:
+                app.dependency_overrides[get_read_session] = override
+            await _replay(trace[: args.clients * 5], args.clients)  # warm pools
+            _commits = 0
+            latencies, failures = await _replay(trace, args.clients)
+            latencies.sort()
+            print(
+                f"{label:9}  reads p50 {statistics.median(latencies) * 1e3:6.2f} ms"
+                f"  p95 {latencies[int(len(latencies) * 0.95) - 1] * 1e3:6.2f} ms"
+                f"  commits {_commits:5}  failed {failures}"
+            )
+    finally:
+        app.dependency_overrides.clear()
+        await async_engine.dispose()
+        if read_engine is not async_engine:
+            await read_engine.dispose()
+        engine.dispose()
+        os.remove(_DB_PATH)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
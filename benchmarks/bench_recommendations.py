@@ -0,0 +1,117 @@
+"""Full-catalog recommendation scoring benchmark.
+
+Run with ``python benchmarks/bench_recommendations.py``. Builds an in-memory
+catalog of synthetic clusters and compares the per-cluster ``evaluate_candidate``
+loop ("before") with ``RecommendationEngine.recommend`` over a warm snapshot
+("after").
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from quadral_cluster.database import Base
+from quadral_cluster.domain.socionics import QUADRA_BITS
+from quadral_cluster.models import availability, cluster, domain, preference  # noqa: F401
+from quadral_cluster.models.domain import Cluster, Profile
+from quadral_cluster.services.matchmaking import RecommendationEngine, evaluate_candidate
+
+QUADRAS = [None, "Alpha", "Beta", "Gamma", "Delta"]
+PSYCHOTYPES = [None, "analyst", "builder", "dreamer", "keeper"]
+CITIES = [None, "Moscow", "Kazan", "Perm", "Tomsk", "Omsk"]
+TIMEZONES = [None, "Europe/Moscow", "Asia/Omsk", "Asia/Tomsk"]
+
+
+def _catalog_rows(rng: random.Random, count: int) -> list[dict]:
+    rows = []
+    for index in range(count):
+        age_count = rng.randint(0, 4)
+        rows.append(
+            {
+                "name": f"cluster_{index}",
+                "target_quadra": rng.choice(QUADRAS),
+                "target_psychotype": rng.choice(PSYCHOTYPES),
+                "city": rng.choice(CITIES),
+                "timezone": rng.choice(TIMEZONES),
+                "activity_score": rng.random(),
+                "reputation_score": 0.5,
+                "member_count": age_count,
+                "age_sum": sum(rng.randint(18, 60) for _ in range(age_count)),
+                "age_count": age_count,
+                "member_quadras": rng.choice([0, *QUADRA_BITS.values()]),
+            }
+        )
+    return rows
+
+
+def _percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clusters", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, future=True)()
+    session.execute(insert(Cluster), _catalog_rows(rng, args.clusters))
+    session.commit()
+
+    candidates = [
+        Profile(
+            socionics_type=rng.choice(["ILE", "SLE", "EIE", "LSI"]),
+            psychotype=rng.choice(PSYCHOTYPES),
+            age=rng.randint(18, 60),
+            city=rng.choice(CITIES),
+            timezone=rng.choice(TIMEZONES),
+            reputation_score=0.5,
+        )
+        for _ in range(args.queries)
+    ]
+
+    clusters = session.query(Cluster).all()
+    started = time.perf_counter()
+    for candidate in candidates[:5]:
+        heapq.nlargest(args.limit, ((c, *evaluate_candidate(candidate, c)) for c in clusters), key=lambda i: i[1])
+    before = (time.perf_counter() - started) / 5
+
+    recommender = RecommendationEngine()
+    started = time.perf_counter()
+    recommender.load(session)
+    load_time = time.perf_counter() - started
+
+    samples = []
+    for candidate in candidates:
+        started = time.perf_counter()
+        recommender.recommend(session, candidate, args.limit)
+        samples.append(time.perf_counter() - started)
+
+    print(f"clusters={args.clusters} queries={args.queries} limit={args.limit}")
+    print(f"before  per-cluster loop  mean {before * 1e3:8.2f} ms (ORM rows already loaded)")
+    print(f"after   snapshot load          {load_time * 1e3:8.2f} ms (once)")
+    print(
+        f"after   recommend  p50 {_percentile(samples, 0.5) * 1e3:6.2f} ms"
+        f"  p95 {_percentile(samples, 0.95) * 1e3:6.2f} ms  mean {statistics.fmean(samples) * 1e3:6.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Compare the ORM/pydantic and projection paths for rendering user pages.
+
+Run with ``python benchmarks/bench_serialization.py``. Both sides page
+through the same users-with-profiles table in ``--page``-row keyset pages
+and produce the response body. The ORM side is what ``GET /users`` used to
+do: load ``User`` objects with their profiles, ``UserRead.model_validate``
+each one, let the ``response_model`` revalidate and dump the list, then
+``json.dumps`` it. The projection side selects ``USER_READ`` columns as
+tuples and renders them with ``FastJSONResponse``. Reported: total time and
+microseconds per row, split into query and serialization.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import selectinload, sessionmaker
+
+from quadral_cluster.api.serialization import USER_READ, FastJSONResponse
+from quadral_cluster.domain.socionics import SocType
+from quadral_cluster.migrations import upgrade_database
+from quadral_cluster.models.domain import Profile, User
+from quadral_cluster.schemas import UserRead
+
+RESPONSE = TypeAdapter(List[UserRead])
+
+
+def _populate(factory, rng: random.Random, users: int) -> None:
+    tims = [tim.value for tim in SocType]
+    with factory() as session:
+        ids = session.scalars(
+            insert(User.__table__).returning(User.id),
+            [
+                {"username": f"user_{index}", "email": f"user_{index}@example.com", "socionics_type": rng.choice(tims)}
+                for index in range(users)
+            ],
+        ).all()
+        session.execute(
+            insert(Profile.__table__),
+            [
+                {"user_id": user_id, "age": rng.randint(18, 60), "city": "Москва", "interests": ["chess", "go"]}
+                for user_id in ids
+            ],
+        )
+        session.commit()
+
+
+def _orm_pages(session, page: int) -> tuple[float, float]:
+    query_time = render_time = 0.0
+    last = 0
+    while True:
+        started = time.perf_counter()
+        stmt = select(User).options(selectinload(User.profile)).where(User.id > last).order_by(User.id)
+        users = list(session.scalars(stmt.limit(page)))
+        rendered = time.perf_counter()
+        if not users:
+            return query_time, render_time
+        models = [UserRead.model_validate(user) for user in users]
+        JSONResponse(RESPONSE.dump_python(RESPONSE.validate_python(models), mode="json"))
+        query_time += rendered - started
+        render_time += time.perf_counter() - rendered
+        last = users[-1].id
+        session.expunge_all()
+
+
+def _projection_pages(session, page: int) -> tuple[float, float]:
+    query_time = render_time = 0.0
+    last = 0
+    while True:
+        started = time.perf_counter()
+        rows = session.execute(USER_READ.select().where(User.id > last).order_by(User.id).limit(page)).all()
+        rendered = time.perf_counter()
+        if not rows:
+            return query_time, render_time
+        items = USER_READ.dump_all(rows)
+        FastJSONResponse(items)
+        query_time += rendered - started
+        render_time += time.perf_counter() - rendered
+        last = items[-1]["id"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--page", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(prefix="qc_bench_", suffix=".db")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        upgrade_database(engine)
+        factory = sessionmaker(bind=engine)
+        _populate(factory, random.Random(args.seed), args.users)
+        print(f"users={args.users} page={args.page}")
+        for label, run in (("orm", _orm_pages), ("projection", _projection_pages)):
+            with factory() as session:
+                query_time, render_time = run(session, args.page)
+            per_row = 1e6 / args.users
+            print(
+                f"{label:10} {query_time + render_time:6.2f} s  "
+                f"query {query_time * per_row:6.1f} us/row  serialize {render_time * per_row:6.1f} us/row"
+            )
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
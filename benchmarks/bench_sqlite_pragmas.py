@@ -0,0 +1,114 @@
+"""Concurrent SQLite writes with and without the connection pragmas.
+
+Run with ``python benchmarks/bench_sqlite_pragmas.py``. Writer threads upsert
+availability rows in short transactions while reader threads count them,
+once on SQLite defaults (rollback journal, ``synchronous=FULL``, no busy
+timeout) and once with the pragmas from ``Settings``. Reported: committed
+writes per second, completed reads and "database is locked" failures.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError
+
+from quadral_cluster.config import Settings
+from quadral_cluster.database import Base, engine_options, install_sqlite_pragmas, sqlite_pragmas
+from quadral_cluster.models import availability, cluster, domain, preference  # noqa: F401
+from quadral_cluster.models.availability import Availability
+from quadral_cluster.models.domain import User
+from quadral_cluster.utils.time_overlap import HOURS_PER_WEEK
+
+
+def _run(tuned: bool, writers: int, readers: int, seconds: float, users: int) -> tuple[int, int, int]:
+    fd, path = tempfile.mkstemp(prefix="qc_bench_", suffix=".db")
+    os.close(fd)
+    url = f"sqlite:///{path}"
+    settings = Settings()
+    if tuned:
+        engine = create_engine(url, **engine_options(url, settings))
+        install_sqlite_pragmas(engine, sqlite_pragmas(settings))
+    else:
+        # ``timeout=0`` turns off the sqlite3 module's own 5 s busy wait.
+        engine = create_engine(url, pool_size=writers + readers, connect_args={"timeout": 0})
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(User), [{"username": f"user_{index}", "socionics_type": "ILE"} for index in range(users)]
+        )
+
+    counts = {"writes": 0, "reads": 0, "locked": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def bump(key: str) -> None:
+        with lock:
+            counts[key] += 1
+
+    def writer(seed: int) -> None:
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            row = {"user_id": rng.randint(1, users), "weekly_mask": rng.getrandbits(HOURS_PER_WEEK)}
+            stmt = sqlite_insert(Availability).values(row)
+            stmt = stmt.on_conflict_do_update(index_elements=["user_id"], set_={"weekly_mask": stmt.excluded.weekly_mask})
+            try:
+                with engine.begin() as connection:
+                    connection.execute(stmt)
+            except OperationalError:
+                bump("locked")
+            else:
+                bump("writes")
+
+    def reader() -> None:
+        while time.perf_counter() < deadline:
+            try:
+                with engine.connect() as connection:
+                    connection.execute(select(func.count()).select_from(Availability)).scalar()
+            except OperationalError:
+                bump("locked")
+            else:
+                bump("reads")
+
+    threads = [threading.Thread(target=writer, args=(seed,)) for seed in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+    return counts["writes"], counts["reads"], counts["locked"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--users", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"writers={args.writers} readers={args.readers} seconds={args.seconds}")
+    for label, tuned in (("defaults", False), ("pragmas", True)):
+        writes, reads, locked = _run(tuned, args.writers, args.readers, args.seconds, args.users)
+        print(f"{label:8}  {writes / args.seconds:8.0f} writes/s  {reads:7} reads  locked {locked}")
+
+
+if __name__ == "__main__":
+    main()
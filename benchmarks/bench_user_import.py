@@ -0,0 +1,112 @@
+"""Compare creating users one request at a time with the bulk import.
+
+Run with ``python benchmarks/bench_user_import.py``. The per-row side repeats
+what ``POST /users`` does for every record (validate, add, flush, refresh,
+commit); the bulk side runs ``import_users`` over the same records as NDJSON.
+Both write to fresh SQLite files with the application's pragmas.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from quadral_cluster.config import Settings
+from quadral_cluster.database import engine_options, install_sqlite_pragmas, sqlite_pragmas
+from quadral_cluster.domain.socionics import SocType
+from quadral_cluster.migrations import upgrade_database
+from quadral_cluster.models.domain import Profile, User
+from quadral_cluster.schemas import UserCreate
+from quadral_cluster.services.user_import import NDJSON, import_users, parse_records
+
+TIMEZONES = ["Europe/Moscow", "Europe/Berlin", "Asia/Almaty", None]
+
+
+def _lines(rng: random.Random, count: int) -> list[str]:
+    tims = list(SocType)
+    return [
+        json.dumps(
+            {
+                "username": f"user_{index}",
+                "email": f"user_{index}@example.com",
+                "socionics_type": rng.choice(tims).value,
+                "profile": {"age": rng.randint(18, 60), "timezone": rng.choice(TIMEZONES), "interests": ["chess"]},
+            }
+        )
+        for index in range(count)
+    ]
+
+
+def _sessions():
+    fd, path = tempfile.mkstemp(prefix="qc_bench_", suffix=".db")
+    os.close(fd)
+    url = f"sqlite:///{path}"
+    settings = Settings()
+    engine = create_engine(url, **engine_options(url, settings))
+    install_sqlite_pragmas(engine, sqlite_pragmas(settings))
+    upgrade_database(engine)
+    return engine, sessionmaker(bind=engine, autoflush=False), path
+
+
+def _per_row(lines: list[str]) -> float:
+    engine, factory, path = _sessions()
+    started = time.perf_counter()
+    for line in lines:
+        payload = UserCreate.model_validate_json(line)
+        with factory() as session:
+            user = User(
+                username=payload.username,
+                email=payload.email,
+                socionics_type=payload.socionics_type,
+                quadra=payload.quadra,
+                timezone=payload.profile.timezone,
+            )
+            user.profile = Profile(**payload.profile.model_dump())
+            session.add(user)
+            session.flush()
+            session.refresh(user)
+            session.commit()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+    os.remove(path)
+    return elapsed
+
+
+def _bulk(lines: list[str], chunk_size: int) -> float:
+    engine, factory, path = _sessions()
+    started = time.perf_counter()
+    with factory() as session:
+        report = import_users(session, parse_records(lines, NDJSON), chunk_size)
+    elapsed = time.perf_counter() - started
+    assert report.created == len(lines), report.errors[:3]
+    engine.dispose()
+    os.remove(path)
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--chunk-size", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    lines = _lines(random.Random(args.seed), args.users)
+    print(f"users={args.users} chunk_size={args.chunk_size}")
+    for label, elapsed in (("per-row", _per_row(lines)), ("bulk", _bulk(lines, args.chunk_size))):
+        print(f"{label:8} {elapsed:7.2f} s  {args.users / elapsed:9.0f} users/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Keyset pagination and NDJSON streaming for list endpoints.
+
+A page is a JSON list; when more rows follow, the ``X-Next-Cursor`` response
+header carries an opaque cursor to pass back as ``?cursor=``. Cursors encode
+the sort key of the last row returned, so every page is an index range scan
+instead of an ``OFFSET`` over everything before it.
+
+Clients that send ``Accept: application/x-ndjson`` get one JSON object per
+line instead, streamed from a server-side cursor in batches of
+``STREAM_BATCH_SIZE`` rows, so memory stays flat whatever the table size.
+Both paths read column tuples through a ``serialization.Projection``
+rather than ORM objects.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+from typing import Any
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+from sqlalchemy import ColumnElement, Select, literal, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .serialization import FastJSONResponse, Projection
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+STREAM_BATCH_SIZE = 500
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: Sequence[ColumnElement]) -> list[Any]:
+    """Decode ``cursor`` into one value per sort key, or raise HTTP 400."""
+
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(payload, list) or len(payload) != len(keys):
+            raise ValueError("cursor does not match the sort order")
+        return [
+            datetime.fromisoformat(value) if key.type.python_type is datetime else value
+            for key, value in zip(keys, payload)
+        ]
+    except (ValueError, TypeError, binascii.Error, NotImplementedError) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from exc
+
+
+def keyset(stmt: Select, keys: Sequence[ColumnElement], cursor: str | None, *, descending: bool = False) -> Select:
+    """Order ``stmt`` by ``keys`` and keep only rows after ``cursor``.
+
+    The row-value bound is an index range on SQLite and PostgreSQL when
+    ``keys`` follow the index the ordering walks.
+    """
+
+    stmt = stmt.order_by(*(key.desc() if descending else key.asc() for key in keys))
+    if cursor is None:
+        return stmt
+    bound = tuple_(*(literal(value, key.type) for key, value in zip(keys, decode_cursor(cursor, keys))))
+    position = tuple_(*keys)
+    return stmt.where(position < bound if descending else position > bound)
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def fetch_page(
+    session: AsyncSession, stmt: Select, keys: Sequence[ColumnElement], limit: int, projection: Projection
+) -> FastJSONResponse:
+    """Render one page of a ``keyset`` statement over ``projection`` columns.
+
+    One extra row is fetched to learn whether another page exists; the
+    cursor is then read off the last item, so every key must be a field of
+    the projected schema.
+    """
+
+    rows = (await session.execute(stmt.limit(limit + 1))).all()
+    items = projection.dump_all(rows[:limit])
+    headers = None
+    if len(rows) > limit:
+        headers = {NEXT_CURSOR_HEADER: encode_cursor([items[-1][key.key] for key in keys])}
+    return FastJSONResponse(items, headers=headers)
+
+
+def stream_ndjson(
+    session: AsyncSession, stmt: Select, projection: Projection, limit: int | None = None
+) -> StreamingResponse:
+    """Stream ``stmt`` as NDJSON, one ``projection`` dict per line."""
+
+    if limit is not None:
+        stmt = stmt.limit(limit)
+
+    async def lines() -> AsyncIterator[bytes]:
+        result = await session.stream(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for partition in result.partitions():
+            yield b"".join(to_json(projection.dump(row)) + b"\n" for row in partition)
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+
+__all__ = [
+    "DEFAULT_PAGE_SIZE",
+    "MAX_PAGE_SIZE",
+    "NDJSON_MEDIA_TYPE",
+    "NEXT_CURSOR_HEADER",
+    "STREAM_BATCH_SIZE",
+    "decode_cursor",
+    "encode_cursor",
+    "fetch_page",
+    "keyset",
+    "stream_ndjson",
+    "wants_ndjson",
+]
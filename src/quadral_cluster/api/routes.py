@@ -1,12 +1,17 @@
 from __future__ import annotations
 
-from collections.abc import Iterable
 from typing import TYPE_CHECKING, List
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, selectinload
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload, sessionmaker
 
-from ..database import get_session
+from ..config import get_settings
+from ..database import get_read_session, get_read_session_factory, get_session
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page, keyset, stream_ndjson, wants_ndjson
+from .serialization import APPLICATION_READ, CLUSTER_READ, USER_READ
 from quadral_cluster.models.domain import (
     Application,
     ApplicationStatusEnum,
@@ -19,6 +24,7 @@ from quadral_cluster.models.domain import (
 from quadral_cluster.schemas import (
     ApplicationCreate,
     ApplicationRead,
+    CacheStatsRead,
     ClusterCreate,
     ClusterRead,
     CompatibilityBreakdownRead,
@@ -30,9 +36,24 @@ from quadral_cluster.schemas import (
     TestResultCreate,
     TestResultRead,
     UserCreate,
+    UserImportReport,
     UserRead,
 )
-from quadral_cluster.services.matchmaking import build_quadra_cluster, evaluate_candidate
+from quadral_cluster.services.matchmaking import (
+    RankedCluster,
+    build_quadra_cluster,
+    evaluate_candidate,
+    mark_clusters_changed,
+    mark_users_changed,
+    recommendation_engine_for,
+    recommendation_refresh_due,
+    refresh_cluster_aggregates,
+    refresh_user_cluster_aggregates,
+)
+from quadral_cluster.services.recommendations import recommendation_cache_for
+from quadral_cluster.services.scoring_cache import mark_scoring_inputs_changed
+from quadral_cluster.services.user_import import CSV, NDJSON, ImportReport, Record, aparse_records, import_user_chunk
+from quadral_cluster.utils.timezones import normalize_timezone
 
 if TYPE_CHECKING:  # pragma: no cover - type checking helper
     from quadral_cluster.services.matchmaking import CompatibilityBreakdown
@@ -40,6 +61,8 @@ if TYPE_CHECKING:  # pragma: no cover - type checking helper
 
 router = APIRouter()
 
+SEARCH_PAGE_SIZE = 20
+
 
 def _enum_value_or_str(x):
     if x is None:
@@ -48,8 +71,15 @@ def _enum_value_or_str(x):
     return str(val)
 
 
-def _ensure_user(session: Session, user_id: int) -> User:
-    user = session.get(User, user_id)
+def _ensure_user(session: Session, user_id: int, *options) -> User:
+    user = session.get(User, user_id, options=options)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return user
+
+
+async def _load_user(session: AsyncSession, user_id: int, *options) -> User:
+    user = await session.get(User, user_id, options=options)
     if user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return user
@@ -62,20 +92,15 @@ def _ensure_profile(user: User) -> Profile:
     return profile
 
 
-def _to_breakdown_schema(breakdown: "CompatibilityBreakdown") -> CompatibilityBreakdownRead:
-    return CompatibilityBreakdownRead(**breakdown.__dict__)
+def _validated_timezone(value: str | None) -> str | None:
+    try:
+        return normalize_timezone(value)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
 
-def _matches_candidate_age(memberships: Iterable[ClusterMembership], candidate_age: int) -> bool:
-    ages = [
-        membership.user.profile.age
-        for membership in memberships
-        if membership.user.profile and membership.user.profile.age is not None
-    ]
-    if not ages:
-        return True
-    avg_age = sum(ages) / len(ages)
-    return abs(candidate_age - avg_age) <= 5
+def _to_breakdown_schema(breakdown: "CompatibilityBreakdown") -> CompatibilityBreakdownRead:
+    return CompatibilityBreakdownRead(**breakdown.__dict__)
 
 
 @router.post("/users", response_model=UserRead, status_code=status.HTTP_201_CREATED)
@@ -89,6 +114,10 @@ def create_user(payload: UserCreate, session: Session = Depends(get_session)) ->
     )
     profile_data = payload.profile.model_dump()
     profile_data.setdefault("socionics_type", _enum_value_or_str(payload.socionics_type))
+    profile_data["timezone"] = _validated_timezone(profile_data.get("timezone"))
+    # Pair scoring reads age and timezone from ``User``; the profile is the user-facing copy.
+    user.timezone = profile_data["timezone"]
+    user.age = profile_data.get("age")
     profile = Profile(**profile_data)
     user.profile = profile
     session.add(user)
@@ -97,15 +126,75 @@ def create_user(payload: UserCreate, session: Session = Depends(get_session)) ->
     return UserRead.model_validate(user)
 
 
+_IMPORT_MEDIA_TYPES = {"application/x-ndjson": NDJSON, "application/jsonl": NDJSON, "text/csv": CSV}
+
+
+def _import_chunk_and_commit(session: Session, chunk: list[Record], report: ImportReport) -> None:
+    import_user_chunk(session, chunk, report)
+    session.commit()
+
+
+@router.post(
+    "/users/import",
+    response_model=UserImportReport,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {media_type: {"schema": {"type": "string"}} for media_type in _IMPORT_MEDIA_TYPES},
+        }
+    },
+)
+async def import_users(
+    request: Request,
+    chunk_size: int | None = Query(None, ge=1, le=10_000),
+    session: Session = Depends(get_session),
+) -> UserImportReport:
+    """Bulk-create users from an NDJSON or CSV body of ``UserCreate`` records.
+
+    The body is read as a stream and committed every ``chunk_size`` rows;
+    invalid or duplicate rows are skipped and listed in the report by line.
+    Chunks are validated and inserted in the threadpool, so the event loop
+    keeps serving other requests meanwhile.
+    """
+
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    fmt = _IMPORT_MEDIA_TYPES.get(media_type)
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Expected one of: {', '.join(_IMPORT_MEDIA_TYPES)}",
+        )
+
+    size = chunk_size or get_settings().user_import_chunk_size
+    report = ImportReport()
+    chunk = []
+    async for record in aparse_records(request.stream(), fmt):
+        chunk.append(record)
+        if len(chunk) >= size:
+            await run_in_threadpool(_import_chunk_and_commit, session, chunk, report)
+            chunk = []
+    if chunk:
+        await run_in_threadpool(_import_chunk_and_commit, session, chunk, report)
+    return UserImportReport.model_validate(report)
+
+
 @router.get("/users", response_model=List[UserRead])
-def list_users(session: Session = Depends(get_session)) -> List[UserRead]:
-    users = session.query(User).options(selectinload(User.profile)).all()
-    return [UserRead.model_validate(user) for user in users]
+async def list_users(
+    request: Request,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_read_session),
+) -> List[UserRead]:
+    keys = [User.id]
+    query = keyset(USER_READ.select(), keys, cursor)
+    if wants_ndjson(request):
+        return stream_ndjson(session, query, USER_READ, limit)
+    return await fetch_page(session, query, keys, limit or DEFAULT_PAGE_SIZE, USER_READ)
 
 
 @router.get("/users/{user_id}", response_model=UserRead)
-def get_user(user_id: int, session: Session = Depends(get_session)) -> UserRead:
-    user = _ensure_user(session, user_id)
+async def get_user(user_id: int, session: AsyncSession = Depends(get_read_session)) -> UserRead:
+    user = await _load_user(session, user_id, selectinload(User.profile))
     return UserRead.model_validate(user)
 
 
@@ -116,35 +205,49 @@ def update_profile(
     user = _ensure_user(session, user_id)
     profile = _ensure_profile(user)
 
-    for field, value in payload.model_dump(exclude_unset=True).items():
+    updates = payload.model_dump(exclude_unset=True)
+    if "timezone" in updates:
+        updates["timezone"] = _validated_timezone(updates["timezone"])
+        user.timezone = updates["timezone"]
+    if "age" in updates:
+        user.age = updates["age"]
+
+    for field, value in updates.items():
         setattr(profile, field, value)
 
+    if "age" in updates or "socionics_type" in updates:
+        refresh_user_cluster_aggregates(session, user_id)
+    if "age" in updates or "timezone" in updates:
+        mark_scoring_inputs_changed(session, [user_id])
+    mark_users_changed(session, [user_id])
+
     session.flush()
     session.refresh(profile)
     return ProfileRead.model_validate(profile)
 
 
 @router.get("/users/{user_id}/applications", response_model=List[ApplicationRead])
-def list_user_applications(user_id: int, session: Session = Depends(get_session)) -> List[ApplicationRead]:
-    _ensure_user(session, user_id)
-    applications = (
-        session.query(Application)
-        .filter(Application.user_id == user_id)
-        .options(selectinload(Application.cluster))
-        .order_by(Application.created_at.desc())
-        .all()
-    )
-    return [ApplicationRead.model_validate(application) for application in applications]
+async def list_user_applications(
+    user_id: int,
+    request: Request,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_read_session),
+) -> List[ApplicationRead]:
+    await _load_user(session, user_id)
+    keys = [Application.created_at, Application.id]
+    query = APPLICATION_READ.select().where(Application.user_id == user_id)
+    query = keyset(query, keys, cursor, descending=True)
+    if wants_ndjson(request):
+        return stream_ndjson(session, query, APPLICATION_READ, limit)
+    return await fetch_page(session, query, keys, limit or DEFAULT_PAGE_SIZE, APPLICATION_READ)
 
 
 @router.get("/users/{user_id}/tests", response_model=List[TestResultRead])
-def list_user_tests(user_id: int, session: Session = Depends(get_session)) -> List[TestResultRead]:
-    _ensure_user(session, user_id)
-    results = (
-        session.query(TestResult)
-        .filter(TestResult.user_id == user_id)
-        .order_by(TestResult.created_at.desc())
-        .all()
+async def list_user_tests(user_id: int, session: AsyncSession = Depends(get_read_session)) -> List[TestResultRead]:
+    await _load_user(session, user_id)
+    results = await session.scalars(
+        select(TestResult).where(TestResult.user_id == user_id).order_by(TestResult.created_at.desc())
     )
     return [TestResultRead.model_validate(result) for result in results]
 
@@ -163,6 +266,7 @@ def create_cluster(payload: ClusterCreate, session: Session = Depends(get_sessio
     )
     session.add(cluster)
     session.flush()
+    mark_clusters_changed(session, [cluster.id])
 
     if payload.founder_user_id is not None:
         founder = session.get(User, payload.founder_user_id)
@@ -170,52 +274,66 @@ def create_cluster(payload: ClusterCreate, session: Session = Depends(get_sessio
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Founder user not found")
         membership = ClusterMembership(cluster_id=cluster.id, user_id=founder.id, role="founder")
         session.add(membership)
+        refresh_cluster_aggregates(session, [cluster.id])
 
     session.refresh(cluster)
     return ClusterRead.model_validate(cluster)
 
 
 @router.get("/clusters", response_model=List[ClusterRead])
-def list_clusters(session: Session = Depends(get_session)) -> List[ClusterRead]:
-    clusters = session.query(Cluster).all()
-    return [ClusterRead.model_validate(cluster) for cluster in clusters]
+async def list_clusters(
+    request: Request,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_read_session),
+) -> List[ClusterRead]:
+    keys = [Cluster.id]
+    query = keyset(CLUSTER_READ.select(), keys, cursor)
+    if wants_ndjson(request):
+        return stream_ndjson(session, query, CLUSTER_READ, limit)
+    return await fetch_page(session, query, keys, limit or DEFAULT_PAGE_SIZE, CLUSTER_READ)
 
 
 @router.get("/clusters/search", response_model=List[ClusterRead])
-def search_clusters(
+async def search_clusters(
+    request: Request,
     language: str | None = None,
     city: str | None = None,
     timezone: str | None = None,
     min_activity: float | None = None,
     min_reputation: float | None = None,
     candidate_age: int | None = None,
-    limit: int = 20,
-    session: Session = Depends(get_session),
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_read_session),
 ) -> List[ClusterRead]:
-    query = session.query(Cluster).options(
-        selectinload(Cluster.memberships)
-        .selectinload(ClusterMembership.user)
-        .selectinload(User.profile)
-    )
+    query = CLUSTER_READ.select()
 
     if language:
-        query = query.filter(Cluster.language == language)
+        query = query.where(Cluster.language == language)
     if city:
-        query = query.filter(Cluster.city == city)
+        query = query.where(Cluster.city == city)
     if timezone:
-        query = query.filter(Cluster.timezone == timezone)
+        query = query.where(Cluster.timezone == timezone)
     if min_activity is not None:
-        query = query.filter(Cluster.activity_score >= min_activity)
+        query = query.where(Cluster.activity_score >= min_activity)
     if min_reputation is not None:
-        query = query.filter(Cluster.reputation_score >= min_reputation)
-
-    query = query.order_by(Cluster.created_at.desc()).limit(limit * 3)
-    clusters = query.all()
-
+        query = query.where(Cluster.reputation_score >= min_reputation)
     if candidate_age is not None:
-        clusters = [cluster for cluster in clusters if _matches_candidate_age(cluster.memberships, candidate_age)]
+        # |candidate_age - age_sum / age_count| <= 5, kept in integers; clusters
+        # without known ages match everyone.
+        query = query.where(
+            or_(
+                Cluster.age_count == 0,
+                func.abs(candidate_age * Cluster.age_count - Cluster.age_sum) <= 5 * Cluster.age_count,
+            )
+        )
 
-    return [ClusterRead.model_validate(cluster) for cluster in clusters[:limit]]
+    keys = [Cluster.created_at, Cluster.id]
+    query = keyset(query, keys, cursor, descending=True)
+    if wants_ndjson(request):
+        return stream_ndjson(session, query, CLUSTER_READ, limit)
+    return await fetch_page(session, query, keys, limit or SEARCH_PAGE_SIZE, CLUSTER_READ)
 
 
 @router.post("/matchmaking/quadra", response_model=QuadraMatchResponse)
@@ -243,48 +361,85 @@ def build_strict_quadra_cluster(
 
 
 @router.get("/clusters/{cluster_id}", response_model=ClusterRead)
-def get_cluster(cluster_id: int, session: Session = Depends(get_session)) -> ClusterRead:
-    cluster = session.get(Cluster, cluster_id)
+async def get_cluster(cluster_id: int, session: AsyncSession = Depends(get_read_session)) -> ClusterRead:
+    cluster = await session.get(Cluster, cluster_id)
     if cluster is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cluster not found")
     return ClusterRead.model_validate(cluster)
 
 
 @router.get("/matchmaking/recommendations", response_model=List[Recommendation])
-def get_recommendations(user_id: int, limit: int = 10, session: Session = Depends(get_session)) -> List[Recommendation]:
-    user = _ensure_user(session, user_id)
+async def get_recommendations(
+    user_id: int,
+    limit: int = 10,
+    session: AsyncSession = Depends(get_read_session),
+    read_sessions: sessionmaker = Depends(get_read_session_factory),
+) -> List[Recommendation]:
+    if recommendation_refresh_due(session.sync_session):
+        # Other processes' cluster writes must drop cached lists before they are served.
+        def refresh() -> None:
+            with read_sessions() as sync_session:
+                recommendation_engine_for(sync_session)
+
+        await run_in_threadpool(refresh)
+
+    cache = recommendation_cache_for(session.sync_session)
+    cached, token = cache.lookup(user_id, limit)
+    if cached is not None:
+        return cached
+
+    user = await _load_user(session, user_id, joinedload(User.profile))
     profile = _ensure_profile(user)
 
-    clusters = (
-        session.query(Cluster)
-        .filter(~Cluster.memberships.any(ClusterMembership.user_id == user_id))
-        .options(
-            selectinload(Cluster.memberships)
-            .selectinload(ClusterMembership.user)
-            .selectinload(User.profile)
+    member_of = (
+        await session.scalars(select(ClusterMembership.cluster_id).where(ClusterMembership.user_id == user_id))
+    ).all()
+    # One connection at a time: the ranking below opens its own read-only session.
+    await session.close()
+
+    def rank() -> list[RankedCluster]:
+        # Snapshot patches and numpy scoring run in the threadpool, not on the event loop.
+        with read_sessions() as sync_session:
+            return recommendation_engine_for(sync_session).recommend(sync_session, profile, limit, exclude=member_of)
+
+    ranked = await run_in_threadpool(rank)
+    clusters = {
+        cluster.id: cluster
+        for cluster in await session.scalars(
+            select(Cluster).where(Cluster.id.in_([item.cluster_id for item in ranked]))
         )
-        .limit(limit * 5)
-        .all()
-    )
+    }
 
-    recommendations: List[Recommendation] = []
-    for cluster in clusters:
-        score, breakdown = evaluate_candidate(profile, cluster, cluster.memberships)
-        recommendations.append(
-            Recommendation(
-                cluster=ClusterRead.model_validate(cluster),
-                compatibility_score=score,
-                breakdown=_to_breakdown_schema(breakdown),
-            )
+    recommendations = [
+        Recommendation(
+            cluster=ClusterRead.model_validate(clusters[item.cluster_id]),
+            compatibility_score=item.score,
+            breakdown=_to_breakdown_schema(item.breakdown),
         )
-
-    recommendations.sort(key=lambda rec: rec.compatibility_score, reverse=True)
-    return recommendations[:limit]
+        for item in ranked
+        if item.cluster_id in clusters
+    ]
+    cache.store(user_id, limit, recommendations, token)
+    return recommendations
+
+
+@router.get("/matchmaking/recommendations/cache", response_model=CacheStatsRead)
+async def get_recommendation_cache_stats(session: AsyncSession = Depends(get_read_session)) -> CacheStatsRead:
+    stats = recommendation_cache_for(session.sync_session).stats()
+    return CacheStatsRead(
+        hits=stats.hits,
+        misses=stats.misses,
+        evictions=stats.evictions,
+        expirations=stats.expirations,
+        size=stats.size,
+        maxsize=stats.maxsize,
+        hit_rate=stats.hit_rate,
+    )
 
 
 @router.post("/applications", response_model=ApplicationRead, status_code=status.HTTP_201_CREATED)
 def create_application(payload: ApplicationCreate, session: Session = Depends(get_session)) -> ApplicationRead:
-    user = _ensure_user(session, payload.user_id)
+    user = _ensure_user(session, payload.user_id, joinedload(User.profile))
     profile = _ensure_profile(user)
     cluster = session.get(Cluster, payload.cluster_id)
     if cluster is None:
@@ -293,7 +448,7 @@ def create_application(payload: ApplicationCreate, session: Session = Depends(ge
     if session.query(ClusterMembership).filter_by(user_id=user.id, cluster_id=cluster.id).first():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User already in cluster")
 
-    compatibility, _ = evaluate_candidate(profile, cluster, cluster.memberships)
+    compatibility, _ = evaluate_candidate(profile, cluster)
     application = Application(
         user_id=user.id,
         cluster_id=cluster.id,
@@ -302,7 +457,6 @@ def create_application(payload: ApplicationCreate, session: Session = Depends(ge
     )
     session.add(application)
     session.flush()
-    session.refresh(application)
     return ApplicationRead.model_validate(application)
 
 
@@ -326,6 +480,9 @@ def create_test_result(payload: TestResultCreate, session: Session = Depends(get
                 profile.socionics_type = payload.socionics_type
             if payload.psychotype:
                 profile.psychotype = payload.psychotype
+            if payload.socionics_type:
+                refresh_user_cluster_aggregates(session, user.id)
+            mark_users_changed(session, [user.id])
 
     session.flush()
     session.refresh(result)
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import secrets
+from datetime import datetime, timezone
+from typing import List
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, status
+from fastapi.responses import PlainTextResponse
+
+from quadral_cluster.config import get_settings
+from quadral_cluster.profiling import PROFILE_ID_PATTERN, ProfileStore
+from quadral_cluster.schemas import RequestProfileRead
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def profile_store(x_profile_token: str | None = Header(default=None)) -> ProfileStore:
+    """Authorize with ``X-Profile-Token``; the routes do not exist without ``PROFILING_TOKEN``."""
+
+    settings = get_settings()
+    if settings.profiling_token is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if x_profile_token is None or not secrets.compare_digest(
+        x_profile_token.encode(), settings.profiling_token.encode()
+    ):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid profiling token")
+    return ProfileStore(settings.profiling_dir, settings.profiling_keep)
+
+
+@router.get("/profiles", response_model=List[RequestProfileRead])
+def list_profiles(store: ProfileStore = Depends(profile_store)) -> List[RequestProfileRead]:
+    return [
+        RequestProfileRead(
+            id=info.id, bytes=info.bytes, created_at=datetime.fromtimestamp(info.created, tz=timezone.utc)
+        )
+        for info in store.profiles()
+    ]
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+def get_profile(
+    profile_id: str = Path(pattern=PROFILE_ID_PATTERN), store: ProfileStore = Depends(profile_store)
+) -> PlainTextResponse:
+    body = store.read(profile_id)
+    if body is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return PlainTextResponse(body)
@@ -3,19 +3,30 @@ from __future__ import annotations
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, sessionmaker
 
-from quadral_cluster.database import get_session
+from quadral_cluster.database import get_async_session, get_read_session, get_read_session_factory, get_session
 from quadral_cluster.domain.socionics import Quadra, SocType
 from quadral_cluster.models.availability import Availability
+from quadral_cluster.models.domain import User
+from quadral_cluster.models.job import MatchmakingJob
 from quadral_cluster.models.preference import Preference
+from quadral_cluster.schemas import AvailabilityBatch, MatchmakingJobRead, PreferenceBatch
+from quadral_cluster.services.availability import upsert_availabilities
+from quadral_cluster.services.jobs import enqueue_find_or_create
 from quadral_cluster.services.matching import (
     ClusterWithScore,
+    MatchingError,
     find_or_create_cluster_for_user,
     list_open_clusters_for_tim,
     try_join_cluster,
 )
-from quadral_cluster.utils.time_overlap import decode_weekly_mask, ensure_mask_length
+from quadral_cluster.services.preferences import queue_preference_edges, upsert_preferences
+from quadral_cluster.services.scoring_cache import mark_scoring_inputs_changed
+from quadral_cluster.utils.time_overlap import normalize_weekly_mask
 
 
 router = APIRouter(prefix="", tags=["matching"])
@@ -49,30 +60,43 @@ def _cluster_payload(cluster: ClusterWithScore) -> dict[str, Any]:
 
 
 @router.get("/clusters/open")
-def get_open_clusters(
+async def get_open_clusters(
     quadra: str = Query(...),
     tim: str = Query(...),
     limit: int = Query(10, ge=1, le=50),
-    session: Session = Depends(get_session),
+    user_id: int | None = Query(None),
+    session: AsyncSession = Depends(get_read_session),
+    read_sessions: sessionmaker = Depends(get_read_session_factory),
 ) -> list[dict[str, Any]]:
     quadra_enum = _parse_quadra(quadra)
     tim_enum = _parse_tim(tim)
-    clusters = list_open_clusters_for_tim(
-        quadra_enum, tim_enum, limit=limit, session=session
-    )
-    return [_cluster_payload(cluster) for cluster in clusters]
+    candidate = None
+    if user_id is not None:
+        candidate = await session.get(User, user_id, options=[joinedload(User.availability)])
+        if candidate is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    # Hand the connection back: ranking runs on its own read-only session.
+    await session.close()
+
+    def rank() -> list[dict[str, Any]]:
+        # Ranking is CPU-bound numpy work; run_sync would keep it on the event loop.
+        with read_sessions() as sync_session:
+            clusters = list_open_clusters_for_tim(
+                quadra_enum, tim_enum, limit=limit, session=sync_session, candidate=candidate
+            )
+            return [_cluster_payload(cluster) for cluster in clusters]
+
+    return await run_in_threadpool(rank)
 
 
 @router.post("/clusters/join")
-def post_join_cluster(
-    payload: dict[str, int], session: Session = Depends(get_session)
-) -> dict[str, Any]:
+async def post_join_cluster(payload: dict[str, int], session: Session = Depends(get_session)) -> dict[str, Any]:
     cluster_id = payload.get("cluster_id")
     user_id = payload.get("user_id")
     if cluster_id is None or user_id is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="cluster_id and user_id are required")
 
-    result = try_join_cluster(user_id=user_id, cluster_id=cluster_id, session=session)
+    result = await run_in_threadpool(try_join_cluster, user_id=user_id, cluster_id=cluster_id, session=session)
     if result.get("ok"):
         return result
     if result.get("reason") == "slot_taken":
@@ -81,8 +105,10 @@ def post_join_cluster(
 
 
 @router.post("/clusters/find_or_create")
-def post_find_or_create(
-    payload: dict[str, Any], session: Session = Depends(get_session)
+async def post_find_or_create(
+    payload: dict[str, Any],
+    session: AsyncSession = Depends(get_async_session),
+    sync_session: Session = Depends(get_session),
 ) -> dict[str, Any]:
     user_id = payload.get("user_id")
     quadra_value = payload.get("quadra")
@@ -90,13 +116,39 @@ def post_find_or_create(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="user_id and quadra are required")
 
     quadra_enum = _parse_quadra(quadra_value)
-    result = find_or_create_cluster_for_user(user_id=user_id, quadra=quadra_enum, session=session)
-    return result
+    if payload.get("async"):
+        if await session.get(User, user_id) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        try:
+            job = await session.run_sync(
+                lambda sync_session: enqueue_find_or_create(sync_session, user_id, quadra_enum)
+            )
+        except MatchingError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+        await session.commit()
+        return JSONResponse(
+            {"job_id": job.id, "status": job.status},
+            status_code=status.HTTP_202_ACCEPTED,
+            headers={"Location": f"/jobs/{job.id}"},
+        )
+
+    # Matching scores the whole pool; keep it off the event loop.
+    return await run_in_threadpool(
+        find_or_create_cluster_for_user, user_id=user_id, quadra=quadra_enum, session=sync_session
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=MatchmakingJobRead)
+async def get_job(job_id: int, session: AsyncSession = Depends(get_read_session)) -> MatchmakingJobRead:
+    job = await session.get(MatchmakingJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return MatchmakingJobRead.model_validate(job)
 
 
 @router.post("/preferences/like")
-def post_preference(
-    payload: dict[str, Any], session: Session = Depends(get_session)
+async def post_preference(
+    payload: dict[str, Any], session: AsyncSession = Depends(get_async_session)
 ) -> dict[str, Any]:
     from_user_id = payload.get("from_user_id")
     to_user_id = payload.get("to_user_id")
@@ -108,7 +160,7 @@ def post_preference(
     if weight_int < -2 or weight_int > 2:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="weight must be between -2 and 2")
 
-    preference = session.get(Preference, (from_user_id, to_user_id))
+    preference = await session.get(Preference, (from_user_id, to_user_id))
     if preference is None:
         preference = Preference(
             from_user_id=from_user_id, to_user_id=to_user_id, weight=weight_int
@@ -117,31 +169,48 @@ def post_preference(
     else:
         preference.weight = weight_int
 
-    session.flush()
+    await session.flush()
+    queue_preference_edges(session.sync_session, [(from_user_id, to_user_id, weight_int)])
+    mark_scoring_inputs_changed(session.sync_session, [from_user_id, to_user_id])
     return {"ok": True}
 
 
 @router.put("/availability")
-def put_availability(
-    payload: dict[str, Any], session: Session = Depends(get_session)
+async def put_availability(
+    payload: dict[str, Any], session: AsyncSession = Depends(get_async_session)
 ) -> dict[str, Any]:
     user_id = payload.get("user_id")
     weekly_mask = payload.get("weekly_mask")
     if user_id is None or weekly_mask is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="user_id and weekly_mask are required")
 
-    bits = (
-        [1 if bool(value) else 0 for value in weekly_mask]
-        if isinstance(weekly_mask, (list, tuple))
-        else decode_weekly_mask(str(weekly_mask))
-    )
-    mask = ensure_mask_length(bits)
-    availability = session.get(Availability, user_id)
+    mask = normalize_weekly_mask(weekly_mask)
+    availability = await session.get(Availability, user_id)
     if availability is None:
         availability = Availability(user_id=user_id, weekly_mask=mask)
         session.add(availability)
     else:
         availability.weekly_mask = mask
 
-    session.flush()
+    await session.flush()
+    mark_scoring_inputs_changed(session.sync_session, [user_id])
     return {"ok": True}
+
+
+@router.put("/availability/batch")
+async def put_availability_batch(
+    payload: AvailabilityBatch, session: AsyncSession = Depends(get_async_session)
+) -> dict[str, Any]:
+    # Later items for the same user win, as if they had been sent one by one.
+    masks = {item.user_id: normalize_weekly_mask(item.weekly_mask) for item in payload.items}
+    await session.run_sync(upsert_availabilities, masks)
+    return {"ok": True, "written": len(masks)}
+
+
+@router.post("/preferences/like/batch")
+async def post_preference_batch(
+    payload: PreferenceBatch, session: AsyncSession = Depends(get_async_session)
+) -> dict[str, Any]:
+    weights = {(item.from_user_id, item.to_user_id): item.weight for item in payload.items}
+    await session.run_sync(upsert_preferences, weights)
+    return {"ok": True, "written": len(weights)}
@@ -0,0 +1,120 @@
+"""Column projections and a fast JSON response for list endpoints.
+
+Rows read back from our own tables have already passed validation on the
+way in, so list endpoints skip the ORM-object → pydantic-model → dict
+round trip: a ``Projection`` selects exactly the columns of a read schema
+as plain row tuples (nested one-to-one relations through an outer join),
+turns each row into a dict keyed by the schema's field names, and
+``FastJSONResponse`` encodes the result with pydantic-core's serializer.
+The ``response_model`` declared on the route still documents the shape in
+OpenAPI; ``tests/test_serialization.py`` keeps the two in step.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Mapping
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+from sqlalchemy import Select, select
+from sqlalchemy.orm import InstrumentedAttribute
+
+from quadral_cluster.domain.socionics import QUADRA_MEMBERS
+from quadral_cluster.models.domain import Application, Cluster, Profile, User
+from quadral_cluster.schemas import ApplicationRead, ClusterRead, ProfileRead, UserRead
+
+
+class FastJSONResponse(JSONResponse):
+    """``JSONResponse`` rendered by pydantic-core instead of ``json.dumps``.
+
+    Output is byte-for-byte what ``JSONResponse`` produces for the same
+    content: compact separators, UTF-8 rather than ``\\u`` escapes.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+class Projection:
+    """Select the columns behind ``schema`` and dump rows as its JSON dicts.
+
+    Every field of ``schema`` must be a column of ``model`` with the same
+    name, or a key of ``nested``: a ``(relationship, Projection)`` pair for
+    a one-to-one relation, loaded through an outer join and dumped as
+    ``None`` when the related row is missing (its ``id`` is ``NULL``).
+    ``fallbacks`` fill fields the schema derives in a validator when the
+    column is ``NULL``. Keys come out in the schema's field order.
+    """
+
+    def __init__(
+        self,
+        schema: type[BaseModel],
+        model: type,
+        *,
+        nested: Mapping[str, tuple[InstrumentedAttribute, Projection]] | None = None,
+        fallbacks: Mapping[str, Callable[[dict[str, Any]], Any]] | None = None,
+    ) -> None:
+        nested = nested or {}
+        self.schema = schema
+        self.model = model
+        self._fallbacks = dict(fallbacks or {})
+        self._joins = [relationship for relationship, _ in nested.values()]
+        self._names: list[str] = []
+        self._nested: list[tuple[str, Projection, int, int]] = []
+        self.columns = []
+        for name in schema.model_fields:
+            if name in nested:
+                continue
+            self._names.append(name)
+            self.columns.append(getattr(model, name).label(name))
+        for name, (_, projection) in nested.items():
+            start = len(self.columns)
+            self._nested.append((name, projection, start, start + projection._names.index("id")))
+            self.columns.extend(column.label(f"{name}__{column.name}") for column in projection.columns)
+        self._width = len(self._names)
+        self._order = list(schema.model_fields) if nested else None
+
+    def select(self) -> Select:
+        stmt = select(*self.columns).select_from(self.model)
+        for relationship in self._joins:
+            stmt = stmt.outerjoin(relationship)
+        return stmt
+
+    def dump(self, row: Any, offset: int = 0) -> dict[str, Any]:
+        item = dict(zip(self._names, row[offset : offset + self._width]))
+        for name, projection, start, key in self._nested:
+            item[name] = projection.dump(row, offset + start) if row[offset + key] is not None else None
+        for name, fallback in self._fallbacks.items():
+            if item[name] is None:
+                item[name] = fallback(item)
+        if self._order is not None:
+            return {name: item[name] for name in self._order}
+        return item
+
+    def dump_all(self, rows: Any) -> list[dict[str, Any]]:
+        return [self.dump(row) for row in rows]
+
+
+_QUADRA_BY_TYPE = {tim.value: quadra.value for quadra, members in QUADRA_MEMBERS.items() for tim in members}
+
+PROFILE_READ = Projection(ProfileRead, Profile)
+USER_READ = Projection(
+    UserRead,
+    User,
+    nested={"profile": (User.profile, PROFILE_READ)},
+    fallbacks={"quadra": lambda item: _QUADRA_BY_TYPE.get(item["socionics_type"])},
+)
+CLUSTER_READ = Projection(ClusterRead, Cluster)
+APPLICATION_READ = Projection(ApplicationRead, Application)
+
+
+__all__ = [
+    "APPLICATION_READ",
+    "CLUSTER_READ",
+    "FastJSONResponse",
+    "PROFILE_READ",
+    "Projection",
+    "USER_READ",
+]
@@ -1,11 +1,63 @@
 from functools import lru_cache
+from typing import Literal
 
-from pydantic import Field
+from pydantic import Field, field_validator, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     database_url: str = Field(default="sqlite:///./dev.db")
+    # Adds per-request SQL statement, row and time counts as X-DB-* headers.
+    debug: bool = Field(default=False)
+    # Connection pool; ignored by the single-connection pools of in-memory SQLite.
+    db_pool_size: int = Field(default=5, ge=1)
+    db_max_overflow: int = Field(default=10, ge=0)
+    db_pool_timeout_seconds: float = Field(default=30.0, gt=0)
+    db_pool_recycle_seconds: int = Field(default=-1, ge=-1)
+    db_pool_pre_ping: bool = Field(default=False)
+    # Prepared statements kept per connection by the driver (sqlite3, asyncpg).
+    db_statement_cache_size: int = Field(default=128, ge=0)
+    # Pragmas applied to every new SQLite connection; unknown modes fail at startup.
+    sqlite_journal_mode: Literal["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"] = Field(default="WAL")
+    sqlite_synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = Field(default="NORMAL")
+    sqlite_busy_timeout_ms: int = Field(default=5_000, ge=0)
+    sqlite_mmap_size: int = Field(default=256 * 1024 * 1024, ge=0)
+    sqlite_cache_size: int = Field(default=-64_000)
+    batch_match_time_budget_seconds: float = Field(default=30.0, gt=0)
+    batch_match_seed: int = Field(default=0)
+    recommendation_cache_size: int = Field(default=10_000, ge=0)
+    recommendation_cache_ttl_seconds: float = Field(default=300.0, gt=0)
+    pair_score_cache_size: int = Field(default=200_000, ge=0)
+    # How often in-process indexes check the database for rows written by other
+    # processes (API workers, the matchmaking worker, bulk imports); 0 checks on every use.
+    cache_refresh_seconds: float = Field(default=5.0, ge=0)
+    # Rows validated and inserted per transaction by the bulk user import.
+    user_import_chunk_size: int = Field(default=1_000, ge=1)
+    # Matchmaking worker (``quadral_cluster.worker``): jobs claimed per round trip, idle
+    # poll interval, and how long a claim lasts before another worker may take the job.
+    matchmaking_job_batch_size: int = Field(default=16, ge=1)
+    matchmaking_job_poll_seconds: float = Field(default=0.5, gt=0)
+    matchmaking_job_lease_seconds: float = Field(default=300.0, gt=0)
+    # Request profiling, off without a token: ``X-Profile: <token>`` profiles a request, and
+    # requests slower than ``profiling_slow_ms`` are profiled without the header. The admin
+    # routes that read the profiles need the token, so slow capture requires it too.
+    profiling_token: str | None = Field(default=None)
+    profiling_slow_ms: float | None = Field(default=None, gt=0)
+    profiling_interval_ms: float = Field(default=5.0, gt=0)
+    profiling_dir: str = Field(default="profiles")
+    profiling_keep: int = Field(default=50, ge=1)
+
+    @field_validator("sqlite_journal_mode", "sqlite_synchronous", mode="before")
+    @classmethod
+    def _upper_pragma(cls, value: object) -> object:
+        # SQLite reads pragma values case-insensitively; accept ``wal`` as well.
+        return value.strip().upper() if isinstance(value, str) else value
+
+    @model_validator(mode="after")
+    def _slow_profiles_need_token(self) -> "Settings":
+        if self.profiling_slow_ms is not None and self.profiling_token is None:
+            raise ValueError("PROFILING_SLOW_MS requires PROFILING_TOKEN: profiles are only readable with it")
+        return self
 
     model_config = SettingsConfigDict(
         env_file=".env",
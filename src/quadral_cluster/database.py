@@ -1,9 +1,20 @@
-from typing import Generator
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from urllib.parse import quote
+from typing import Any, AsyncGenerator, AsyncIterator, Generator, Iterator
+from weakref import WeakKeyDictionary
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, URL, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
 
-from .config import get_settings
+from .config import Settings, get_settings
+from .metrics import REGISTRY, MetricFamily, install_pool_metrics
+from .query_counter import install_query_counter
 
 
 class Base(DeclarativeBase):
@@ -12,7 +23,77 @@ class Base(DeclarativeBase):
 
 _settings = get_settings()
 
-engine = create_engine(_settings.database_url, future=True)
+
+def _is_sqlite_memory(url: URL) -> bool:
+    database = url.database or ""
+    return database in ("", ":memory:") or url.query.get("mode") == "memory"
+
+
+def engine_options(url: str, settings: Settings) -> dict[str, Any]:
+    """Keyword arguments for ``create_engine``/``create_async_engine`` on ``url``.
+
+    In-memory SQLite keeps SQLAlchemy's single-connection pool, which takes
+    no sizing arguments.
+    """
+
+    parsed = make_url(url)
+    options: dict[str, Any] = {}
+    if not (parsed.get_backend_name() == "sqlite" and _is_sqlite_memory(parsed)):
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout_seconds,
+            pool_recycle=settings.db_pool_recycle_seconds,
+            pool_pre_ping=settings.db_pool_pre_ping,
+        )
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"cached_statements": settings.db_statement_cache_size}
+    elif parsed.get_driver_name() == "asyncpg":
+        options["connect_args"] = {"prepared_statement_cache_size": settings.db_statement_cache_size}
+    return options
+
+
+def sqlite_pragmas(settings: Settings, *, read_only: bool = False) -> dict[str, str | int]:
+    """Pragmas for new SQLite connections.
+
+    ``journal_mode`` is persistent and can only be changed by a writer, so
+    read-only connections skip it.
+    """
+
+    pragmas: dict[str, str | int] = {
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        "synchronous": settings.sqlite_synchronous,
+        "mmap_size": settings.sqlite_mmap_size,
+        "cache_size": settings.sqlite_cache_size,
+    }
+    if not read_only:
+        pragmas = {"journal_mode": settings.sqlite_journal_mode, **pragmas}
+    return pragmas
+
+
+def install_sqlite_pragmas(engine: Engine, pragmas: dict[str, str | int]) -> None:
+    """Apply ``pragmas`` to every connection ``engine`` opens (no-op off SQLite)."""
+
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, _connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+        finally:
+            cursor.close()
+
+
+def _create_engine(url: str, *, read_only: bool = False, **options: Any) -> Engine:
+    created = create_engine(url, future=True, **engine_options(url, _settings), **options)
+    install_sqlite_pragmas(created, sqlite_pragmas(_settings, read_only=read_only))
+    return created
+
+
+engine = _create_engine(_settings.database_url)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
 
@@ -28,3 +109,276 @@ def get_session() -> Generator[Session, None, None]:
         raise
     finally:
         session.close()
+
+
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def async_database_url(url: str) -> str:
+    """Return ``url`` with its async driver (``aiosqlite`` for local SQLite)."""
+
+    parsed = make_url(url)
+    if parsed.get_dialect().is_async:
+        return url
+    drivername = _ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if drivername is None:
+        raise ValueError(f"No async driver known for {parsed.drivername!r}")
+    return drivername + url[url.index("://") :]
+
+
+def read_only_database_url(url: str) -> str | None:
+    """Return a URL that opens ``url`` read-only, or ``None`` if there is none.
+
+    Only SQLite files qualify: they are reopened as ``mode=ro`` URIs, so the
+    connection can never take a write lock. In-memory databases cannot be
+    shared by a second engine.
+    """
+
+    parsed = make_url(url)
+    database = parsed.database
+    if parsed.get_backend_name() != "sqlite" or database in (None, "", ":memory:") or database.startswith("file:"):
+        return None
+    return f"{parsed.drivername}:///file:{quote(database)}?mode=ro&uri=true"
+
+
+def _create_async_engine(url: str, *, read_only: bool = False, **options: Any):
+    created = create_async_engine(url, **engine_options(url, _settings), **options)
+    install_sqlite_pragmas(created.sync_engine, sqlite_pragmas(_settings, read_only=read_only))
+    return created
+
+
+class FairCheckout:
+    """Admit async sessions to an engine's pool in arrival order.
+
+    The async pool queues waiters on ``asyncio.Queue``, where a checkout that
+    arrives just as a connection is returned takes it ahead of the waiter
+    woken for it, which then queues again at the back. With many concurrent
+    requests a few of them wait for seconds. Waiting first on a FIFO
+    semaphore keeps the order; a wait longer than ``timeout`` raises the
+    pool's own ``TimeoutError``.
+    """
+
+    def __init__(self, size: int, timeout: float) -> None:
+        self._size = size
+        self._timeout = timeout
+        # Semaphores bind to the loop they first wait on; tests run several loops.
+        self._semaphores: "WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = WeakKeyDictionary()
+
+    @asynccontextmanager
+    async def __call__(self) -> AsyncIterator[None]:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self._size)
+        try:
+            async with asyncio.timeout(self._timeout):
+                await semaphore.acquire()
+        except TimeoutError as exc:
+            raise PoolTimeoutError(f"No database connection became free within {self._timeout} s") from exc
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+def _fair_checkout(settings: Settings) -> FairCheckout:
+    # Sized to the pool without overflow: overflow connections are closed when
+    # returned, so under sustained load each request would open (and for
+    # aiosqlite, start a thread for) a fresh one.
+    return FairCheckout(settings.db_pool_size, settings.db_pool_timeout_seconds)
+
+
+async_engine = _create_async_engine(async_database_url(_settings.database_url))
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+_async_checkout = _fair_checkout(_settings)
+
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    """Yield an async database session for FastAPI dependencies.
+
+    Short sync services run on it through ``AsyncSession.run_sync``; commit
+    and rollback hooks fire on the wrapped sync ``Session`` as usual.
+    ``run_sync`` runs on the event loop, so CPU-bound services (ranking,
+    matching) take a ``get_session`` session into ``run_in_threadpool``.
+    """
+
+    async with _async_checkout(), AsyncSessionLocal() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
+_read_only_url = read_only_database_url(async_database_url(_settings.database_url))
+# A ``mode=ro`` connection never holds changes, so the rollback the pool issues
+# when a connection is returned would only cost another round trip.
+read_engine = (
+    _create_async_engine(_read_only_url, read_only=True, pool_reset_on_return=None)
+    if _read_only_url is not None
+    else async_engine
+)
+ReadSessionLocal = async_sessionmaker(bind=read_engine, autoflush=False, expire_on_commit=False)
+_read_checkout = _fair_checkout(_settings) if read_engine is not async_engine else _async_checkout
+
+
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """Yield a session for read-only endpoints.
+
+    Nothing is flushed or committed: the transaction is rolled back when the
+    session closes, which releases the connection without a commit. On
+    SQLite files the session runs on a ``mode=ro`` connection.
+    """
+
+    async with _read_checkout(), ReadSessionLocal() as session:
+        yield session
+
+
+_read_only_sync_url = read_only_database_url(_settings.database_url)
+read_sync_engine = (
+    _create_engine(_read_only_sync_url, read_only=True, pool_reset_on_return=None)
+    if _read_only_sync_url is not None
+    else engine
+)
+ReadSyncSessionLocal = sessionmaker(bind=read_sync_engine, autoflush=False, autocommit=False, future=True)
+
+
+def get_read_session_factory() -> sessionmaker:
+    """Return the factory of sync read-only sessions for threadpool work.
+
+    Read routes hand CPU-bound services (ranking over in-memory snapshots)
+    to ``run_in_threadpool``, which opens a session from this factory only
+    once it needs one. Like ``get_read_session``, the session never
+    commits, and on SQLite files it runs on a ``mode=ro`` connection.
+    """
+
+    return ReadSyncSessionLocal
+
+
+_UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def dialect_insert(session: Session, table):
+    """``INSERT`` construct of the session's dialect, with ``on_conflict_do_update``.
+
+    SQLite and PostgreSQL both spell upserts as ``INSERT ... ON CONFLICT``.
+    """
+
+    name = session.get_bind().dialect.name
+    insert = _UPSERT_INSERTS.get(name)
+    if insert is None:
+        raise NotImplementedError(f"No upsert support for the {name!r} dialect")
+    return insert(table)
+
+
+_engine_state: "WeakKeyDictionary[Engine, dict[str, Any]]" = WeakKeyDictionary()
+_engine_state_lock = threading.Lock()
+
+
+def engine_state(session: Session) -> dict[str, Any]:
+    """Return process-local state shared by every session on the same engine.
+
+    In-memory indexes and caches live here so that separate databases (for
+    example per-test in-memory engines) never see each other's data.
+    """
+
+    bind = session.get_bind()
+    engine = getattr(bind, "engine", bind)
+    with _engine_state_lock:
+        state = _engine_state.get(engine)
+        if state is None:
+            state = _engine_state[engine] = {}
+        return state
+
+
+def share_engine_state(engine: Engine, alias: Engine) -> None:
+    """Make sessions on ``alias`` see the same state as sessions on ``engine``.
+
+    Used for the sync engine that backs ``async_engine``: both talk to the
+    same database, so they must share its indexes and caches.
+    """
+
+    with _engine_state_lock:
+        state = _engine_state.get(engine)
+        if state is None:
+            state = _engine_state[engine] = {}
+        _engine_state[alias] = state
+
+
+share_engine_state(engine, async_engine.sync_engine)
+if read_engine is not async_engine:
+    share_engine_state(engine, read_engine.sync_engine)
+if read_sync_engine is not engine:
+    share_engine_state(engine, read_sync_engine)
+
+for _instrumented in (engine, async_engine.sync_engine, read_engine.sync_engine, read_sync_engine):
+    install_query_counter(_instrumented)
+install_pool_metrics(engine, "sync")
+install_pool_metrics(async_engine.sync_engine, "async")
+if read_engine is not async_engine:
+    install_pool_metrics(read_engine.sync_engine, "read")
+if read_sync_engine is not engine:
+    install_pool_metrics(read_sync_engine, "read_sync")
+
+
+def _collect_cache_metrics() -> Iterator[MetricFamily]:
+    """Counters of the caches kept in the application engines' shared state."""
+
+    with _engine_state_lock:
+        state = dict(_engine_state.get(engine) or {})
+    stats = {name.removesuffix("_cache"): value.stats() for name, value in state.items() if name.endswith("_cache")}
+    for metric, kind, documentation, field in (
+        ("cache_hits_total", "counter", "Cache lookups that found a valid entry.", "hits"),
+        ("cache_misses_total", "counter", "Cache lookups that found nothing valid.", "misses"),
+        ("cache_evictions_total", "counter", "Entries dropped to stay within the size limit.", "evictions"),
+        ("cache_entries", "gauge", "Entries currently cached.", "size"),
+        ("cache_hit_ratio", "gauge", "Hits over lookups since start.", "hit_rate"),
+    ):
+        yield MetricFamily(
+            metric, kind, documentation, [("", {"cache": name}, getattr(value, field)) for name, value in stats.items()]
+        )
+
+
+REGISTRY.register_collector(_collect_cache_metrics)
+
+
+def describe_engines() -> list[dict[str, Any]]:
+    """Effective configuration of the application engines, for startup logs.
+
+    SQLite pragmas are read back from a live connection of the sync engine,
+    so the report shows what the database actually runs with (for example
+    ``memory`` instead of ``wal`` for in-memory databases).
+    """
+
+    effective: dict[str, Any] = {}
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as connection:
+            for name in sqlite_pragmas(_settings):
+                effective[name] = connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+    report = []
+    for name, candidate in (
+        ("sync", engine),
+        ("async", async_engine.sync_engine),
+        ("read", read_engine.sync_engine),
+        ("read_sync", read_sync_engine),
+    ):
+        if (name == "read" and read_engine is async_engine) or (name == "read_sync" and read_sync_engine is engine):
+            continue
+        pool = candidate.pool
+        entry: dict[str, Any] = {
+            "engine": name,
+            "url": candidate.url.render_as_string(hide_password=True),
+            "pool": type(pool).__name__,
+            "pool_size": pool.size() if hasattr(pool, "size") else None,
+            "max_overflow": getattr(pool, "_max_overflow", None),
+            "pool_timeout": getattr(pool, "_timeout", None),
+            "pool_recycle": pool._recycle,
+            "pool_pre_ping": pool._pre_ping,
+            "statement_cache_size": _settings.db_statement_cache_size,
+        }
+        if effective:
+            entry["pragmas"] = effective
+        report.append(entry)
+    return report
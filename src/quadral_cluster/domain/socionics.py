@@ -33,3 +33,13 @@ QUADRA_MEMBERS = {
     Quadra.GAMMA: {SocType.SEE, SocType.ESI, SocType.LIE, SocType.ILI},
     Quadra.DELTA: {SocType.IEE, SocType.EII, SocType.LSE, SocType.SLI},
 }
+
+
+# Each TIM's bit inside its quadra's four-slot occupancy mask.
+QUADRA_SLOT_BITS = {
+    soc_type: 1 << position
+    for members in QUADRA_MEMBERS.values()
+    for position, soc_type in enumerate(sorted(members, key=lambda member: member.value))
+}
+FULL_QUADRA_MASK = (1 << 4) - 1
+QUADRA_BITS = {quadra: 1 << position for position, quadra in enumerate(Quadra)}
@@ -1,13 +1,23 @@
+import logging
 from pathlib import Path
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
 from .api.routes import router
+from .api.routes_admin import router as admin_router
 from .api.routes_matching import router as matching_router
-from .database import Base, engine
+from .config import get_settings
+from .database import async_engine, describe_engines, engine, read_engine
+from .metrics import CONTENT_TYPE, REGISTRY, MetricsMiddleware
+from .migrations import upgrade_database
+from .profiling import ProfileStore, ProfilingMiddleware
+from .query_counter import QueryCounterMiddleware
+
+# Uvicorn's error logger is the one its default config prints at INFO.
+logger = logging.getLogger("uvicorn.error")
 
 
 app = FastAPI(
@@ -18,6 +28,18 @@ app = FastAPI(
     openapi_url="/openapi.json",
 )
 
+_settings = get_settings()
+if _settings.profiling_token is not None:
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=ProfileStore(_settings.profiling_dir, _settings.profiling_keep),
+        token=_settings.profiling_token,
+        slow_ms=_settings.profiling_slow_ms,
+        interval_ms=_settings.profiling_interval_ms,
+    )
+# Inside the query counter: route metrics read the request's SQL totals.
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(QueryCounterMiddleware, emit_headers=_settings.debug)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -25,8 +47,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(router)
+# Matching routes go first so ``/clusters/open`` is not captured by ``/clusters/{cluster_id}``.
 app.include_router(matching_router)
+app.include_router(router)
+app.include_router(admin_router)
 
 BASE_DIR = Path(__file__).resolve().parent
 templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
@@ -42,9 +66,18 @@ app.mount(
 def on_startup() -> None:
     # Ensure models are imported so that metadata is populated
     from .models import domain  # noqa: F401
-    from .models import availability, cluster, preference  # noqa: F401
+    from .models import availability, cluster, job, preference  # noqa: F401
+
+    upgrade_database(engine)
+    for description in describe_engines():
+        logger.info("database engine: %s", description)
 
-    Base.metadata.create_all(bind=engine)
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    await async_engine.dispose()
+    if read_engine is not async_engine:
+        await read_engine.dispose()
 
 
 @app.get("/health", tags=["health"])
@@ -52,6 +85,11 @@ def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics", tags=["health"], include_in_schema=False)
+def metrics() -> Response:
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/", include_in_schema=False)
 async def index(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
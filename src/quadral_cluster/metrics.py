@@ -0,0 +1,352 @@
+"""Process-local metrics in the Prometheus text exposition format.
+
+``REGISTRY`` holds counters, gauges and histograms, created once at import
+time by the modules that update them, plus collectors: callables evaluated
+at scrape time for values that already live elsewhere (pool state, cache
+statistics). ``GET /metrics`` renders it with ``REGISTRY.render()``.
+
+Updating a metric takes a label lookup, a lock and an addition, so it is
+cheap enough for per-request and per-operation use. Label values must come
+from small fixed sets (route templates, outcomes), never from ids or
+free-form messages.
+
+``MetricsMiddleware`` records per-route latency and database time (from the
+request's ``QueryStats``, so it has to run inside ``QueryCounterMiddleware``);
+``install_pool_metrics`` times connection checkouts of an engine.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from typing import NamedTuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .query_counter import current_query_stats
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers sub-millisecond cache hits up to requests that time out.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1_000, 2_000, 5_000, 10_000, 50_000, 100_000)
+
+
+class MetricFamily(NamedTuple):
+    """One metric as rendered: ``samples`` are ``(suffix, labels, value)``."""
+
+    name: str
+    kind: str
+    documentation: str
+    samples: Sequence[tuple[str, Mapping[str, str], float]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """Return the child for ``values``, one per label name, in order."""
+
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(tuple(str(value) for value in values), self._new_child())
+        return child
+
+    def _labelled(self) -> list[tuple[dict[str, str], object]]:
+        with self._lock:
+            children = list(self._children.items())
+        return [(dict(zip(self.labelnames, values)), child) for values, child in children]
+
+    def collect(self) -> MetricFamily:
+        samples = [("", labels, child.value) for labels, child in self._labelled()]
+        return MetricFamily(self.name, self.kind, self.documentation, samples)
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        # One slot per bound plus +Inf; cumulated when rendered.
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def collect(self) -> MetricFamily:
+        samples = []
+        for labels, child in self._labelled():
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                samples.append(("_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, cumulative))
+        return MetricFamily(self.name, self.kind, self.documentation, samples)
+
+
+Collector = Callable[[], Iterable[MetricFamily]]
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Collector] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name!r} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Collector) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def collect(self) -> Iterator[MetricFamily]:
+        with self._lock:
+            metrics, collectors = list(self._metrics.values()), list(self._collectors)
+        for metric in metrics:
+            yield metric.collect()
+        for collector in collectors:
+            yield from collector()
+
+    def render(self) -> str:
+        # Collectors may report the same family (one per engine); Prometheus
+        # wants each name's HELP/TYPE once, with all its samples together.
+        families: dict[str, MetricFamily] = {}
+        for family in self.collect():
+            known = families.get(family.name)
+            if known is None:
+                families[family.name] = family._replace(samples=list(family.samples))
+            else:
+                known.samples.extend(family.samples)
+
+        lines = []
+        for family in families.values():
+            lines.append(f"# HELP {family.name} {_escape(family.documentation)}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for suffix, labels, value in family.samples:
+                rendered = ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels.items())
+                selector = f"{family.name}{suffix}{{{rendered}}}" if rendered else family.name + suffix
+                lines.append(f"{selector} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by route template and status code.", ("method", "route", "status")
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time to handle an HTTP request.", ("method", "route")
+)
+HTTP_DB_TIME = REGISTRY.histogram(
+    "http_request_db_seconds", "Time an HTTP request spent executing SQL.", ("method", "route")
+)
+HTTP_DB_STATEMENTS = REGISTRY.counter(
+    "http_request_db_statements_total", "SQL statements executed by HTTP requests.", ("method", "route")
+)
+POOL_CHECKOUT = REGISTRY.histogram(
+    "db_pool_checkout_seconds",
+    "Time to get a connection from the pool, including opening a new one.",
+    ("engine",),
+)
+
+
+def _route_label(scope: Scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Record latency, status and database time of each HTTP request by route."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            method, route = scope["method"], _route_label(scope)
+            HTTP_LATENCY.labels(method, route).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+            stats = current_query_stats()
+            if stats is not None:
+                HTTP_DB_TIME.labels(method, route).observe(stats.duration)
+                HTTP_DB_STATEMENTS.labels(method, route).inc(stats.statements)
+
+
+def _time_checkouts(engine: Engine, name: str) -> None:
+    pool = engine.pool
+    connect = pool.connect
+    checkout = POOL_CHECKOUT.labels(name)
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            checkout.observe(time.perf_counter() - started)
+
+    pool.connect = timed_connect
+
+
+def install_pool_metrics(engine: Engine, name: str) -> None:
+    """Time connection checkouts of ``engine`` and report its pool occupancy.
+
+    ``dispose`` replaces the pool, so the new one is wrapped again.
+    """
+
+    _time_checkouts(engine, name)
+    event.listen(engine, "engine_disposed", lambda disposed: _time_checkouts(disposed, name))
+
+    def collect() -> Iterator[MetricFamily]:
+        pool = engine.pool
+        if not hasattr(pool, "checkedout"):
+            return
+        labels = {"engine": name}
+        yield MetricFamily(
+            "db_pool_checked_out", "gauge", "Connections currently checked out.", [("", labels, pool.checkedout())]
+        )
+        yield MetricFamily("db_pool_size", "gauge", "Configured pool size.", [("", labels, pool.size())])
+
+    REGISTRY.register_collector(collect)
+
+
+__all__ = [
+    "CONTENT_TYPE",
+    "LATENCY_BUCKETS",
+    "REGISTRY",
+    "SIZE_BUCKETS",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricFamily",
+    "MetricsMiddleware",
+    "MetricsRegistry",
+    "install_pool_metrics",
+]
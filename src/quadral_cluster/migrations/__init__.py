@@ -0,0 +1,71 @@
+"""Alembic migrations for the Core API schema.
+
+``alembic.ini`` at the repository root points the CLI here; the application
+calls ``upgrade_database`` on startup instead of ``Base.metadata.create_all``.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection, Engine, Inspector
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent
+
+
+def alembic_config(connection: Connection | None = None) -> Config:
+    """Alembic config for this package, optionally bound to ``connection``."""
+
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+def _legacy_revision(inspector: Inspector) -> str:
+    """Newest revision whose schema a pre-migration database already has."""
+
+    tables = set(inspector.get_table_names())
+    if "matchmaking_jobs" in tables and "uq_matchmaking_jobs_active_user_id" in {
+        index["name"] for index in inspector.get_indexes("matchmaking_jobs")
+    }:
+        return "0009"
+    if "ix_clusters_updated_at" in {index["name"] for index in inspector.get_indexes("clusters")}:
+        return "0008"
+    if "ix_matching_clusters_updated_at" in {index["name"] for index in inspector.get_indexes("matching_clusters")}:
+        return "0007"
+    if "ix_availabilities_updated_at" in {index["name"] for index in inspector.get_indexes("availabilities")}:
+        return "0006"
+    if "ix_preferences_updated_at" in {index["name"] for index in inspector.get_indexes("preferences")}:
+        return "0005"
+    if "matchmaking_jobs" in tables:
+        return "0004"
+    if "ix_users_quadra_socionics_type" in {index["name"] for index in inspector.get_indexes("users")}:
+        return "0003"
+    if "occupied_tims" in {column["name"] for column in inspector.get_columns("matching_clusters")}:
+        return "0002"
+    return "0001"
+
+
+def upgrade_database(engine: Engine, revision: str = "head") -> None:
+    """Migrate the database behind ``engine`` to ``revision``.
+
+    Databases created with ``create_all`` before migrations existed have the
+    tables but no ``alembic_version``; they are stamped with the revision
+    they match and upgraded from there.
+    """
+
+    with engine.begin() as connection:
+        config = alembic_config(connection)
+        inspector = inspect(connection)
+        tables = set(inspector.get_table_names())
+        if "users" in tables and "alembic_version" not in tables:
+            command.stamp(config, _legacy_revision(inspector))
+        command.upgrade(config, revision)
+
+
+__all__ = ["MIGRATIONS_DIR", "alembic_config", "upgrade_database"]
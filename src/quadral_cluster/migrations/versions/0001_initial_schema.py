@@ -0,0 +1,160 @@
+"""Initial schema.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('clusters',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.Column('language', sa.String(length=32), nullable=False),
+    sa.Column('city', sa.String(length=120), nullable=True),
+    sa.Column('timezone', sa.String(length=64), nullable=True),
+    sa.Column('target_quadra', sa.String(length=16), nullable=True),
+    sa.Column('target_psychotype', sa.String(length=32), nullable=True),
+    sa.Column('activity_score', sa.Float(), nullable=False),
+    sa.Column('reputation_score', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('matching_clusters',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('quadra', sa.String(length=16), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('telegram_id', sa.Integer(), nullable=True),
+    sa.Column('username', sa.String(length=64), nullable=True),
+    sa.Column('email', sa.String(length=255), nullable=True),
+    sa.Column('socionics_type', sa.String(length=8), nullable=False),
+    sa.Column('quadra', sa.String(length=16), nullable=True),
+    sa.Column('timezone', sa.String(length=64), nullable=True),
+    sa.Column('age', sa.Integer(), nullable=True),
+    sa.Column('city', sa.String(length=120), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email'),
+    sa.UniqueConstraint('telegram_id'),
+    sa.UniqueConstraint('username')
+    )
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_table('applications',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('cluster_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'APPROVED', 'REJECTED', name='applicationstatusenum', native_enum=False), nullable=False),
+    sa.Column('compatibility_score', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['cluster_id'], ['clusters.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('availabilities',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('weekly_mask', sa.String(length=256), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('cluster_memberships',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cluster_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('role', sa.String(length=32), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['cluster_id'], ['clusters.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'cluster_id', name='uq_user_cluster')
+    )
+    op.create_table('matching_cluster_members',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cluster_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('socionics_type', sa.String(length=8), nullable=False),
+    sa.Column('joined_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['cluster_id'], ['matching_clusters.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('cluster_id', 'socionics_type', name='uq_cluster_tim'),
+    sa.UniqueConstraint('user_id')
+    )
+    op.create_table('preferences',
+    sa.Column('from_user_id', sa.Integer(), nullable=False),
+    sa.Column('to_user_id', sa.Integer(), nullable=False),
+    sa.Column('weight', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['from_user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['to_user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('from_user_id', 'to_user_id')
+    )
+    op.create_table('profiles',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('age', sa.Integer(), nullable=True),
+    sa.Column('bio', sa.String(length=300), nullable=True),
+    sa.Column('city', sa.String(length=120), nullable=True),
+    sa.Column('timezone', sa.String(length=64), nullable=True),
+    sa.Column('interests', sa.JSON(), nullable=True),
+    sa.Column('socionics_type', sa.String(length=8), nullable=True),
+    sa.Column('psychotype', sa.String(length=32), nullable=True),
+    sa.Column('reputation_score', sa.Float(), nullable=False),
+    sa.Column('activity_score', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id')
+    )
+    op.create_table('test_results',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('test_type', sa.String(length=32), nullable=False),
+    sa.Column('socionics_type', sa.String(length=8), nullable=True),
+    sa.Column('psychotype', sa.String(length=32), nullable=True),
+    sa.Column('confidence', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('test_results')
+    op.drop_table('profiles')
+    op.drop_table('preferences')
+    op.drop_table('matching_cluster_members')
+    op.drop_table('cluster_memberships')
+    op.drop_table('availabilities')
+    op.drop_table('applications')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_table('users')
+    op.drop_table('matching_clusters')
+    op.drop_table('clusters')
@@ -0,0 +1,181 @@
+"""Pack availability masks and denormalize cluster aggregates.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from quadral_cluster.domain.socionics import QUADRA_BITS, QUADRA_MEMBERS, QUADRA_SLOT_BITS
+from quadral_cluster.utils.time_overlap import (
+    HOURS_PER_WEEK,
+    MASK_BYTES,
+    decode_weekly_mask,
+    mask_from_bytes,
+    mask_to_bytes,
+    pack_weekly_mask,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_BATCH = 5_000
+
+availabilities = sa.table(
+    "availabilities",
+    sa.column("user_id", sa.Integer),
+    sa.column("weekly_mask", sa.String),
+    sa.column("weekly_mask_packed", sa.LargeBinary),
+    sa.column("weekly_mask_text", sa.String),
+)
+matching_clusters = sa.table(
+    "matching_clusters",
+    sa.column("id", sa.Integer),
+    sa.column("occupied_tims", sa.SmallInteger),
+    sa.column("member_count", sa.SmallInteger),
+)
+matching_cluster_members = sa.table(
+    "matching_cluster_members",
+    sa.column("cluster_id", sa.Integer),
+    sa.column("socionics_type", sa.String),
+)
+clusters = sa.table(
+    "clusters",
+    sa.column("id", sa.Integer),
+    sa.column("member_count", sa.Integer),
+    sa.column("age_sum", sa.Integer),
+    sa.column("age_count", sa.Integer),
+    sa.column("member_quadras", sa.SmallInteger),
+)
+cluster_memberships = sa.table(
+    "cluster_memberships",
+    sa.column("cluster_id", sa.Integer),
+    sa.column("user_id", sa.Integer),
+)
+profiles = sa.table(
+    "profiles",
+    sa.column("user_id", sa.Integer),
+    sa.column("age", sa.Integer),
+    sa.column("socionics_type", sa.String),
+)
+
+
+def _rewrite_masks(source: str, target: str, convert) -> None:
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(availabilities.c.user_id, availabilities.c[source])).all()
+    update = (
+        availabilities.update()
+        .where(availabilities.c.user_id == sa.bindparam("uid"))
+        .values({target: sa.bindparam("mask")})
+    )
+    for start in range(0, len(rows), _BATCH):
+        bind.execute(update, [{"uid": user_id, "mask": convert(mask)} for user_id, mask in rows[start : start + _BATCH]])
+
+
+def _text_to_blob(value) -> bytes:
+    if isinstance(value, (bytes, memoryview)):
+        return mask_to_bytes(mask_from_bytes(bytes(value)))
+    return mask_to_bytes(pack_weekly_mask(decode_weekly_mask(value)))
+
+
+def _blob_to_text(value) -> str:
+    return format(mask_from_bytes(bytes(value)) if value is not None else 0, f"0{HOURS_PER_WEEK}b")
+
+
+def _backfill_matching_clusters() -> None:
+    members = matching_cluster_members.c
+    occupied = sa.case(
+        {soc_type.value: bit for soc_type, bit in QUADRA_SLOT_BITS.items()}, value=members.socionics_type, else_=0
+    )
+    of_cluster = members.cluster_id == matching_clusters.c.id
+    op.execute(
+        matching_clusters.update().values(
+            occupied_tims=sa.select(sa.func.coalesce(sa.func.sum(occupied), 0)).where(of_cluster).scalar_subquery(),
+            member_count=sa.select(sa.func.count()).where(of_cluster).scalar_subquery(),
+        )
+    )
+
+
+def _backfill_clusters() -> None:
+    joined = cluster_memberships.outerjoin(profiles, profiles.c.user_id == cluster_memberships.c.user_id)
+    of_cluster = cluster_memberships.c.cluster_id == clusters.c.id
+
+    def aggregate(expression):
+        return sa.select(expression).select_from(joined).where(of_cluster).scalar_subquery()
+
+    soc_type = sa.func.upper(profiles.c.socionics_type)
+    quadra_flags = [
+        aggregate(
+            sa.func.coalesce(
+                sa.func.max(sa.case((soc_type.in_([member.value for member in members]), QUADRA_BITS[quadra]), else_=0)),
+                0,
+            )
+        )
+        for quadra, members in QUADRA_MEMBERS.items()
+    ]
+    op.execute(
+        clusters.update().values(
+            member_count=aggregate(sa.func.count()),
+            age_sum=aggregate(sa.func.coalesce(sa.func.sum(profiles.c.age), 0)),
+            age_count=aggregate(sa.func.count(profiles.c.age)),
+            member_quadras=sum(quadra_flags[1:], quadra_flags[0]),
+        )
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Availability masks: 168-character text -> fixed 21-byte blob.
+    op.add_column("availabilities", sa.Column("weekly_mask_packed", sa.LargeBinary(length=MASK_BYTES), nullable=True))
+    _rewrite_masks("weekly_mask", "weekly_mask_packed", _text_to_blob)
+    with op.batch_alter_table("availabilities") as batch_op:
+        batch_op.drop_column("weekly_mask")
+        batch_op.alter_column(
+            "weekly_mask_packed",
+            new_column_name="weekly_mask",
+            existing_type=sa.LargeBinary(length=MASK_BYTES),
+            nullable=False,
+        )
+
+    with op.batch_alter_table("matching_clusters") as batch_op:
+        batch_op.add_column(sa.Column("occupied_tims", sa.SmallInteger(), nullable=False, server_default="0"))
+        batch_op.add_column(sa.Column("member_count", sa.SmallInteger(), nullable=False, server_default="0"))
+        batch_op.create_index(
+            "ix_matching_clusters_quadra_status_count", ["quadra", "status", "member_count"], unique=False
+        )
+    _backfill_matching_clusters()
+
+    with op.batch_alter_table("clusters") as batch_op:
+        batch_op.add_column(sa.Column("member_count", sa.Integer(), nullable=False, server_default="0"))
+        batch_op.add_column(sa.Column("age_sum", sa.Integer(), nullable=False, server_default="0"))
+        batch_op.add_column(sa.Column("age_count", sa.Integer(), nullable=False, server_default="0"))
+        batch_op.add_column(sa.Column("member_quadras", sa.SmallInteger(), nullable=False, server_default="0"))
+    _backfill_clusters()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("clusters") as batch_op:
+        for column in ("member_quadras", "age_count", "age_sum", "member_count"):
+            batch_op.drop_column(column)
+
+    with op.batch_alter_table("matching_clusters") as batch_op:
+        batch_op.drop_index("ix_matching_clusters_quadra_status_count")
+        batch_op.drop_column("member_count")
+        batch_op.drop_column("occupied_tims")
+
+    op.add_column("availabilities", sa.Column("weekly_mask_text", sa.String(length=256), nullable=True))
+    _rewrite_masks("weekly_mask", "weekly_mask_text", _blob_to_text)
+    with op.batch_alter_table("availabilities") as batch_op:
+        batch_op.drop_column("weekly_mask")
+        batch_op.alter_column(
+            "weekly_mask_text", new_column_name="weekly_mask", existing_type=sa.String(length=256), nullable=False
+        )
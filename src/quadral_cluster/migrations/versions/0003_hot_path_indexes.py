@@ -0,0 +1,41 @@
+"""Index the filtered and ordered columns of the hot query paths.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns); matching_clusters(quadra, status) is already covered
+# by ix_matching_clusters_quadra_status_count from 0002.
+INDEXES = (
+    ("ix_users_quadra_socionics_type", "users", ["quadra", "socionics_type"]),
+    ("ix_users_created_at", "users", ["created_at"]),
+    ("ix_clusters_language_city_created_at", "clusters", ["language", "city", "created_at"]),
+    ("ix_clusters_created_at", "clusters", ["created_at"]),
+    ("ix_cluster_memberships_cluster_id", "cluster_memberships", ["cluster_id"]),
+    ("ix_applications_user_id_created_at", "applications", ["user_id", "created_at"]),
+    ("ix_test_results_user_id_created_at", "test_results", ["user_id", "created_at"]),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,29 @@
+"""Index clusters and memberships by updated_at for recommendation snapshot refreshes.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, Sequence[str], None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_clusters_updated_at", "clusters", ["updated_at"], unique=False)
+    op.create_index("ix_cluster_memberships_updated_at", "cluster_memberships", ["updated_at"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_cluster_memberships_updated_at", table_name="cluster_memberships")
+    op.drop_index("ix_clusters_updated_at", table_name="clusters")
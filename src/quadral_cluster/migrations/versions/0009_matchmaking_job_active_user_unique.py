@@ -0,0 +1,50 @@
+"""At most one queued or running matchmaking job per user.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, Sequence[str], None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = "status IN ('queued', 'running')"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Duplicates left by racing enqueues: keep each user's oldest active job.
+    op.execute(
+        f"""
+        UPDATE matchmaking_jobs
+        SET status = 'failed', error = 'duplicate of an earlier pending job',
+            finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+        WHERE {ACTIVE}
+          AND id > (
+            SELECT MIN(earlier.id) FROM matchmaking_jobs AS earlier
+            WHERE earlier.user_id = matchmaking_jobs.user_id AND earlier.{ACTIVE}
+          )
+        """
+    )
+    op.create_index(
+        "uq_matchmaking_jobs_active_user_id",
+        "matchmaking_jobs",
+        ["user_id"],
+        unique=True,
+        sqlite_where=sa.text(ACTIVE),
+        postgresql_where=sa.text(ACTIVE),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("uq_matchmaking_jobs_active_user_id", table_name="matchmaking_jobs")
@@ -3,22 +3,51 @@ from __future__ import annotations
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, LargeBinary
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.types import TypeDecorator
 
 from quadral_cluster.database import Base
+from quadral_cluster.utils.time_overlap import (
+    MASK_BYTES,
+    decode_weekly_mask,
+    mask_from_bytes,
+    mask_to_bytes,
+    pack_weekly_mask,
+)
 
 if TYPE_CHECKING:
     from .user import User
 
 
+class WeeklyMask(TypeDecorator):
+    """168-bit weekly mask stored as a fixed 21-byte blob, exposed as ``int``."""
+
+    impl = LargeBinary(MASK_BYTES)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return mask_to_bytes(int(value))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            # Rows written before masks were packed hold the textual form.
+            return pack_weekly_mask(decode_weekly_mask(value))
+        return mask_from_bytes(bytes(value))
+
+
 class Availability(Base):
     __tablename__ = "availabilities"
+    __table_args__ = (Index("ix_availabilities_updated_at", "updated_at"),)
 
     user_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
     )
-    weekly_mask: Mapped[str] = mapped_column(String(256), nullable=False)
+    weekly_mask: Mapped[int] = mapped_column(WeeklyMask, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
     )
@@ -26,4 +55,4 @@ class Availability(Base):
     user: Mapped["User"] = relationship(back_populates="availability")
 
 
-__all__ = ["Availability"]
+__all__ = ["Availability", "WeeklyMask"]
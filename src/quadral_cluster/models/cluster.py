@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, SmallInteger, String, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from quadral_cluster.database import Base
@@ -15,10 +15,17 @@ if TYPE_CHECKING:
 
 class MatchingCluster(Base):
     __tablename__ = "matching_clusters"
+    __table_args__ = (
+        Index("ix_matching_clusters_quadra_status_count", "quadra", "status", "member_count"),
+        Index("ix_matching_clusters_updated_at", "updated_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     quadra: Mapped[str] = mapped_column(String(16), nullable=False)
     status: Mapped[str] = mapped_column(String(16), nullable=False, default="locked")
+    # Denormalized from members: QUADRA_SLOT_BITS of the TIMs already taken.
+    occupied_tims: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0)
+    member_count: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=datetime.utcnow, nullable=False
     )
@@ -9,8 +9,10 @@ from sqlalchemy import (
     Enum as SQLEnum,
     Float,
     ForeignKey,
+    Index,
     Integer,
     JSON,
+    SmallInteger,
     String,
     UniqueConstraint,
 )
@@ -33,6 +35,11 @@ class TimestampMixin:
 
 class User(Base, TimestampMixin):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_quadra_socionics_type", "quadra", "socionics_type"),
+        Index("ix_users_created_at", "created_at"),
+        Index("ix_users_updated_at", "updated_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     telegram_id: Mapped[Optional[int]] = mapped_column(Integer, unique=True)
@@ -88,6 +95,11 @@ class Profile(Base, TimestampMixin):
 
 class Cluster(Base, TimestampMixin):
     __tablename__ = "clusters"
+    __table_args__ = (
+        Index("ix_clusters_language_city_created_at", "language", "city", "created_at"),
+        Index("ix_clusters_created_at", "created_at"),
+        Index("ix_clusters_updated_at", "updated_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(120), unique=True)
@@ -98,6 +110,12 @@ class Cluster(Base, TimestampMixin):
     target_psychotype: Mapped[Optional[str]] = mapped_column(String(32))
     activity_score: Mapped[float] = mapped_column(Float, default=0.5)
     reputation_score: Mapped[float] = mapped_column(Float, default=0.5)
+    # Aggregates over member profiles, kept current by
+    # ``services.matchmaking.refresh_cluster_aggregates``.
+    member_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    age_sum: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    age_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    member_quadras: Mapped[int] = mapped_column(SmallInteger, default=0, nullable=False)
 
     memberships: Mapped[List["ClusterMembership"]] = relationship(
         back_populates="cluster", cascade="all, delete-orphan"
@@ -109,7 +127,11 @@ class Cluster(Base, TimestampMixin):
 
 class ClusterMembership(Base, TimestampMixin):
     __tablename__ = "cluster_memberships"
-    __table_args__ = (UniqueConstraint("user_id", "cluster_id", name="uq_user_cluster"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "cluster_id", name="uq_user_cluster"),
+        Index("ix_cluster_memberships_cluster_id", "cluster_id"),
+        Index("ix_cluster_memberships_updated_at", "updated_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     cluster_id: Mapped[int] = mapped_column(ForeignKey("clusters.id", ondelete="CASCADE"))
@@ -128,6 +150,7 @@ class ApplicationStatusEnum(str, Enum):
 
 class Application(Base, TimestampMixin):
     __tablename__ = "applications"
+    __table_args__ = (Index("ix_applications_user_id_created_at", "user_id", "created_at"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
@@ -145,6 +168,7 @@ class Application(Base, TimestampMixin):
 
 class TestResult(Base, TimestampMixin):
     __tablename__ = "test_results"
+    __table_args__ = (Index("ix_test_results_user_id_created_at", "user_id", "created_at"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import JSON, DateTime, ForeignKey, Index, Integer, String, Text, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from quadral_cluster.database import Base
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+_ACTIVE = f"status IN ('{JOB_QUEUED}', '{JOB_RUNNING}')"
+
+
+class MatchmakingJob(Base):
+    """A queued ``find_or_create`` call, run by ``quadral_cluster.worker``."""
+
+    __tablename__ = "matchmaking_jobs"
+    __table_args__ = (
+        # Claim order within a worker's quadras; also finds running jobs whose lease expired.
+        Index("ix_matchmaking_jobs_status_quadra_id", "status", "quadra", "id"),
+        Index("ix_matchmaking_jobs_user_id_status", "user_id", "status"),
+        # At most one queued or running job per user, so concurrent enqueues cannot both insert.
+        Index(
+            "uq_matchmaking_jobs_active_user_id",
+            "user_id",
+            unique=True,
+            sqlite_where=text(_ACTIVE),
+            postgresql_where=text(_ACTIVE),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    quadra: Mapped[str] = mapped_column(String(16), nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default=JOB_QUEUED)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    claimed_by: Mapped[Optional[str]] = mapped_column(String(64))
+    claimed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    result: Mapped[Optional[dict[str, Any]]] = mapped_column(JSON)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+
+__all__ = ["JOB_DONE", "JOB_FAILED", "JOB_QUEUED", "JOB_RUNNING", "MatchmakingJob"]
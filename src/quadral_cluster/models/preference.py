@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey, Integer
+from sqlalchemy import DateTime, ForeignKey, Index, Integer
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from quadral_cluster.database import Base
@@ -14,6 +14,7 @@ if TYPE_CHECKING:
 
 class Preference(Base):
     __tablename__ = "preferences"
+    __table_args__ = (Index("ix_preferences_updated_at", "updated_at"),)
 
     from_user_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
@@ -0,0 +1,261 @@
+"""On-demand stack-sampling profiles of individual HTTP requests.
+
+``ProfilingMiddleware`` is only installed when ``PROFILING_TOKEN`` is set;
+otherwise requests never reach this module. ``PROFILING_SLOW_MS`` needs the
+token as well, since the admin routes only serve profiles with it.
+A request is profiled when
+
+* it carries ``X-Profile: <PROFILING_TOKEN>``: sampling covers the whole
+  request and the response names the result in ``X-Profile-Id``;
+* or it is still running ``PROFILING_SLOW_MS`` after it started: sampling
+  starts at that point, so the profile shows where the slow tail went.
+
+One daemon thread takes the samples, and only while some request is being
+profiled or watched. Every ``PROFILING_INTERVAL_MS`` it reads the stacks of
+all threads with ``sys._current_frames`` and keeps those running
+application code, from the outermost application frame down. Application
+frames are named by their function (``find_or_create_cluster_for_user``,
+``_best_candidates_for_tim``, ``pair_score``, ``evaluate_candidate``),
+library frames by ``module:function``. The event loop and the threadpool
+are shared, so requests running at the same time show up in each other's
+profiles.
+
+Profiles are written to ``PROFILING_DIR`` in the collapsed-stack format
+(``frame;frame;frame count`` per line) that ``flamegraph.pl`` and
+speedscope read. The newest ``PROFILING_KEEP`` are kept; the admin routes
+list and return them.
+"""
+
+from __future__ import annotations
+
+import re
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+TRIGGER_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+SUFFIX = ".folded"
+PROFILE_ID_PATTERN = r"^[0-9A-Za-z_-]+$"
+
+# Frames of these modules wrap every request and would only add noise at the root.
+_WRAPPER_MODULES = frozenset({"quadral_cluster.metrics", "quadral_cluster.profiling", "quadral_cluster.query_counter"})
+
+
+@dataclass(eq=False, slots=True)
+class _Capture:
+    started: float
+    # ``None`` while a slow-request watch has not yet reached its threshold.
+    sampling_since: float | None
+    stacks: Counter = field(default_factory=Counter)
+    samples: int = 0
+
+
+class _Sampler:
+    """Background thread sampling all stacks into the active captures."""
+
+    def __init__(self, interval: float, packages: Sequence[str]) -> None:
+        self.interval = interval
+        self.packages = tuple(packages)
+        self._watched: dict[_Capture, float | None] = {}
+        self._labels: dict[object, tuple[str, bool, bool]] = {}
+        self._wake = threading.Condition()
+        self._thread: threading.Thread | None = None
+
+    def watch(self, capture: _Capture, threshold: float | None) -> None:
+        with self._wake:
+            self._watched[capture] = threshold
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+            self._wake.notify()
+
+    def unwatch(self, capture: _Capture) -> None:
+        with self._wake:
+            self._watched.pop(capture, None)
+
+    def _run(self) -> None:
+        while True:
+            with self._wake:
+                while not self._watched:
+                    self._wake.wait()
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            with self._wake:
+                active = []
+                for capture, threshold in self._watched.items():
+                    if capture.sampling_since is None and now - capture.started >= threshold:
+                        capture.sampling_since = now
+                    if capture.sampling_since is not None:
+                        active.append(capture)
+            if not active:
+                continue
+            stacks = self.sample()
+            with self._wake:
+                for capture in active:
+                    capture.samples += 1
+                    capture.stacks.update(stacks)
+
+    def _label(self, frame) -> tuple[str, bool, bool]:
+        code = frame.f_code
+        label = self._labels.get(code)
+        if label is None:
+            module = frame.f_globals.get("__name__", "?")
+            own = module.startswith(self.packages)
+            name = code.co_qualname if own else f"{module}:{code.co_qualname}"
+            label = self._labels.setdefault(code, (name, own, module in _WRAPPER_MODULES))
+        return label
+
+    def sample(self) -> list[str]:
+        """Collapsed stacks of the threads currently running application code."""
+
+        stacks = []
+        current = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == current:
+                continue
+            names: list[str] = []
+            root = None
+            while frame is not None:
+                name, own, wrapper = self._label(frame)
+                names.append(name)
+                if own and not wrapper:
+                    root = len(names)
+                frame = frame.f_back
+            if root is not None:
+                stacks.append(";".join(reversed(names[:root])))
+        return stacks
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^0-9A-Za-z]+", "_", text).strip("_")[:60] or "root"
+
+
+@dataclass(frozen=True, slots=True)
+class ProfileInfo:
+    id: str
+    bytes: int
+    created: float
+
+
+class ProfileStore:
+    """Collapsed-stack files in ``directory``, newest ``keep`` retained."""
+
+    def __init__(self, directory: str | Path, keep: int) -> None:
+        self.directory = Path(directory)
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def _path(self, profile_id: str) -> Path:
+        if not re.match(PROFILE_ID_PATTERN, profile_id):
+            raise ValueError(f"Invalid profile id {profile_id!r}")
+        return self.directory / f"{profile_id}{SUFFIX}"
+
+    def write(self, profile_id: str, stacks: Counter) -> Path:
+        path = self._path(profile_id)
+        body = "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path.write_text(body, encoding="utf-8")
+            for stale in self.profiles()[self.keep :]:
+                self._path(stale.id).unlink(missing_ok=True)
+        return path
+
+    def profiles(self) -> list[ProfileInfo]:
+        """Stored profiles, newest first."""
+
+        if not self.directory.is_dir():
+            return []
+        found = []
+        for path in self.directory.glob(f"*{SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            found.append(ProfileInfo(id=path.name.removesuffix(SUFFIX), bytes=stat.st_size, created=stat.st_mtime))
+        found.sort(key=lambda info: (info.created, info.id), reverse=True)
+        return found
+
+    def read(self, profile_id: str) -> str | None:
+        try:
+            return self._path(profile_id).read_text(encoding="utf-8")
+        except (FileNotFoundError, ValueError):
+            return None
+
+
+class ProfilingMiddleware:
+    """Sample the stacks of requests that ask for it or run too long."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        store: ProfileStore,
+        token: str | None = None,
+        slow_ms: float | None = None,
+        interval_ms: float = 5.0,
+        packages: Sequence[str] = ("quadral_cluster",),
+    ) -> None:
+        self.app = app
+        self.store = store
+        self.token = token
+        self.threshold = slow_ms / 1000 if slow_ms is not None else None
+        self.sampler = _Sampler(interval_ms / 1000, packages)
+
+    def _requested(self, scope: Scope) -> bool:
+        if self.token is None:
+            return False
+        supplied = Headers(scope=scope).get(TRIGGER_HEADER)
+        return supplied is not None and secrets.compare_digest(supplied.encode(), self.token.encode())
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        requested = self._requested(scope)
+        if not requested and self.threshold is None:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        capture = _Capture(started=started, sampling_since=started if requested else None)
+        prefix = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}-{scope['method']}"
+
+        def profile_id() -> str:
+            # The router has put the matched route into ``scope`` by the time this is called.
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            return f"{prefix}-{_slug(route)}"
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start" and requested:
+                MutableHeaders(scope=message)[PROFILE_ID_HEADER] = profile_id()
+            await send(message)
+
+        self.sampler.watch(capture, None if requested else self.threshold)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            self.sampler.unwatch(capture)
+            if requested or capture.samples:
+                # Writing and pruning the directory is file I/O; keep it off the event loop.
+                await run_in_threadpool(self.store.write, profile_id(), capture.stacks)
+
+
+__all__ = [
+    "PROFILE_ID_HEADER",
+    "PROFILE_ID_PATTERN",
+    "TRIGGER_HEADER",
+    "ProfileInfo",
+    "ProfileStore",
+    "ProfilingMiddleware",
+]
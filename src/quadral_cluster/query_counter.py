@@ -0,0 +1,201 @@
+"""Count SQL statements, rows and database time per request.
+
+``install_query_counter`` hooks an engine's cursor events; the application
+engines are instrumented in ``database``. Statements are attributed to every
+``QueryStats`` that is active at the time:
+
+* ``QueryCounterMiddleware`` activates one per HTTP request through a
+  context variable, which follows the request into ``run_sync`` greenlets
+  and the threadpool that runs sync routes and dependencies. With
+  ``emit_headers`` (``DEBUG=true``) the totals are sent back as
+  ``X-DB-Queries``, ``X-DB-Rows`` and ``X-DB-Time-Ms``. Streaming responses
+  report what ran before their headers went out.
+* ``count_queries`` and ``query_budget`` activate one process-wide, for
+  tests: the request runs in another thread, so a context variable set by
+  the test would not reach it.
+
+Rows are those fetched from result sets plus the row counts of statements
+that return none. With nothing active the event handlers return at once.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+QUERIES_HEADER = "X-DB-Queries"
+ROWS_HEADER = "X-DB-Rows"
+TIME_HEADER = "X-DB-Time-Ms"
+
+
+@dataclass(slots=True)
+class QueryStats:
+    statements: int = 0
+    rows: int = 0
+    duration: float = 0.0
+    # SQL of every statement, when the collector was asked to keep it.
+    sql: list[str] | None = field(default=None, repr=False)
+
+
+_request_stats: ContextVar[QueryStats | None] = ContextVar("request_query_stats", default=None)
+_process_stats: list[QueryStats] = []
+_process_stats_lock = threading.Lock()
+_STARTED_KEY = "query_counter_started"
+
+
+def current_query_stats() -> QueryStats | None:
+    """Stats of the HTTP request being handled, if ``QueryCounterMiddleware`` runs."""
+
+    return _request_stats.get()
+
+
+def _active() -> list[QueryStats]:
+    current = _request_stats.get()
+    if not _process_stats:
+        return [current] if current is not None else []
+    return [*_process_stats, *([current] if current is not None else [])]
+
+
+class _CountingCursor:
+    """DBAPI cursor proxy that adds fetched rows to ``targets``."""
+
+    def __init__(self, cursor, targets: list[QueryStats]) -> None:
+        object.__setattr__(self, "_cursor", cursor)
+        object.__setattr__(self, "_targets", targets)
+
+    def __getattr__(self, name: str):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(self._cursor, name, value)
+
+    def _count(self, rows: int) -> None:
+        for stats in self._targets:
+            stats.rows += rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._count(1)
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._cursor.fetchmany(*args)
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._count(len(rows))
+        return rows
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _request_stats.get() is None and not _process_stats:
+        return
+    conn.info.setdefault(_STARTED_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info.get(_STARTED_KEY)
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    targets = _active()
+    if not targets:
+        return
+    for stats in targets:
+        stats.statements += 1
+        stats.duration += elapsed
+        if stats.sql is not None:
+            stats.sql.append(statement)
+    if cursor.description is None:
+        written = max(cursor.rowcount, 0)
+        for stats in targets:
+            stats.rows += written
+    elif context is not None and context.cursor is cursor:
+        context.cursor = _CountingCursor(cursor, targets)
+
+
+def install_query_counter(engine: Engine) -> None:
+    """Attribute statements run on ``engine`` to the active ``QueryStats``."""
+
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def count_queries(*, record_sql: bool = True) -> Iterator[QueryStats]:
+    """Count every statement on every instrumented engine while the block runs."""
+
+    stats = QueryStats(sql=[] if record_sql else None)
+    with _process_stats_lock:
+        _process_stats.append(stats)
+    try:
+        yield stats
+    finally:
+        with _process_stats_lock:
+            _process_stats.remove(stats)
+
+
+@contextmanager
+def query_budget(max_statements: int) -> Iterator[QueryStats]:
+    """Fail with the offending SQL when the block runs more than ``max_statements``."""
+
+    with count_queries() as stats:
+        yield stats
+    if stats.statements > max_statements:
+        listing = "\n".join(f"  {index}. {sql}" for index, sql in enumerate(stats.sql or (), start=1))
+        raise AssertionError(f"{stats.statements} SQL statements, budget is {max_statements}:\n{listing}")
+
+
+class QueryCounterMiddleware:
+    """Collect ``QueryStats`` for each HTTP request, optionally as response headers."""
+
+    def __init__(self, app: ASGIApp, *, emit_headers: bool = False) -> None:
+        self.app = app
+        self.emit_headers = emit_headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _request_stats.set(stats)
+
+        async def send_with_stats(message: Message) -> None:
+            if message["type"] == "http.response.start" and self.emit_headers:
+                headers = MutableHeaders(scope=message)
+                headers[QUERIES_HEADER] = str(stats.statements)
+                headers[ROWS_HEADER] = str(stats.rows)
+                headers[TIME_HEADER] = f"{stats.duration * 1000:.2f}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _request_stats.reset(token)
+
+
+__all__ = [
+    "QUERIES_HEADER",
+    "ROWS_HEADER",
+    "TIME_HEADER",
+    "QueryCounterMiddleware",
+    "QueryStats",
+    "count_queries",
+    "current_query_stats",
+    "install_query_counter",
+    "query_budget",
+]
@@ -45,7 +45,7 @@ def _ensure_quadra(socionics_type: SocType, quadra: Quadra | None) -> Quadra | N
         if socionics_type not in QUADRA_MEMBERS[quadra]:
             msg = (
                 "Socionics type must belong to the specified quadra: "
-                f"{socionics_type} ∉ {quadra.value}"
+                f"{socionics_type} ∉ {Quadra(quadra).value}"
             )
             raise ValueError(msg)
         return quadra
@@ -165,6 +165,72 @@ class Recommendation(BaseSchema):
     breakdown: CompatibilityBreakdownRead
 
 
+# ---------- Пакетная запись доступности и лайков ----------
+
+MAX_BATCH_ITEMS = 1_000
+
+
+class AvailabilityItem(BaseSchema):
+    user_id: int
+    weekly_mask: str | List[int | bool]
+
+
+class AvailabilityBatch(BaseSchema):
+    items: List[AvailabilityItem] = Field(min_length=1, max_length=MAX_BATCH_ITEMS)
+
+
+class PreferenceItem(BaseSchema):
+    from_user_id: int
+    to_user_id: int
+    weight: int = Field(ge=-2, le=2)
+
+
+class PreferenceBatch(BaseSchema):
+    items: List[PreferenceItem] = Field(min_length=1, max_length=MAX_BATCH_ITEMS)
+
+
+class UserImportRowError(BaseSchema):
+    line: int
+    errors: List[str]
+
+
+class UserImportReport(BaseSchema):
+    created: int
+    failed: int
+    errors: List[UserImportRowError]
+
+
+class CacheStatsRead(BaseSchema):
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    size: int
+    maxsize: int
+    hit_rate: float
+
+
+class MatchmakingJobRead(BaseSchema):
+    id: int
+    user_id: int
+    quadra: str
+    status: str
+    attempts: int
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+
+
+class RequestProfileRead(BaseSchema):
+    """A stored request profile (collapsed stacks), see ``GET /admin/profiles/{id}``."""
+
+    id: str
+    bytes: int
+    created_at: datetime
+
+
 class ApplicationCreate(BaseSchema):
     user_id: int
     cluster_id: int
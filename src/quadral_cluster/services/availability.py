@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+
+from sqlalchemy.orm import Session
+
+from quadral_cluster.database import dialect_insert
+from quadral_cluster.models.availability import Availability
+from quadral_cluster.services.scoring_cache import mark_scoring_inputs_changed
+
+
+def upsert_availabilities(session: Session, masks: Mapping[int, int]) -> None:
+    """Write packed weekly ``masks`` keyed by user id in one ``INSERT ... ON CONFLICT``.
+
+    Score versions of the users are bumped once ``session`` commits.
+    """
+
+    if not masks:
+        return
+    table = Availability.__table__
+    stmt = dialect_insert(session, table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id],
+        set_={"weekly_mask": stmt.excluded.weekly_mask, "updated_at": stmt.excluded.updated_at},
+    )
+    session.connection().execute(stmt, [{"user_id": user_id, "weekly_mask": mask} for user_id, mask in masks.items()])
+    mark_scoring_inputs_changed(session, masks)
+
+
+__all__ = ["upsert_availabilities"]
@@ -0,0 +1,206 @@
+"""Database-backed queue of ``find_or_create`` jobs.
+
+The API enqueues with ``enqueue_find_or_create``; ``quadral_cluster.worker``
+processes call ``process_jobs`` in a loop. A claim is a single
+``UPDATE ... WHERE id IN (SELECT ... LIMIT n) RETURNING``: on PostgreSQL
+the inner select takes ``FOR UPDATE SKIP LOCKED``, so concurrent workers
+pass over each other's rows instead of waiting. SQLite has no row locks,
+but the ``UPDATE`` holds the database write lock for its whole run, so two
+workers can never claim the same row; a busy worker waits at most
+``busy_timeout``.
+
+A claimed job is leased to its worker for ``matchmaking_job_lease_seconds``.
+If the worker dies, another one claims the job again after that. Results
+are only written by the worker that holds the current claim.
+
+A user has at most one queued or running job, enforced by a unique partial
+index; ``enqueue_find_or_create`` returns the existing job when a concurrent
+enqueue inserted it first.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable, Sequence
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from quadral_cluster.config import get_settings
+from quadral_cluster.domain.socionics import Quadra
+from quadral_cluster.models.domain import User
+from quadral_cluster.models.job import JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, MatchmakingJob
+from quadral_cluster.services.matching import (
+    MatchingError,
+    ensure_user_belongs_to_quadra,
+    find_or_create_cluster_for_user,
+)
+
+logger = logging.getLogger(__name__)
+
+# Unexpected errors (lost connection, lock timeout) are retried this many times in total.
+MAX_ATTEMPTS = 3
+
+
+class ClaimedJob(NamedTuple):
+    id: int
+    user_id: int
+    quadra: str
+
+
+def _pending_job(session: Session, user_id: int) -> MatchmakingJob | None:
+    return session.scalars(
+        select(MatchmakingJob)
+        .where(MatchmakingJob.user_id == user_id)
+        .where(MatchmakingJob.status.in_((JOB_QUEUED, JOB_RUNNING)))
+    ).first()
+
+
+def enqueue_find_or_create(session: Session, user_id: int, quadra: Quadra) -> MatchmakingJob:
+    """Queue ``find_or_create`` for ``user_id``, or return the job already pending for it.
+
+    Raises ``MatchingError`` if the user does not exist or is not part of
+    ``quadra``, as the inline call does.
+    """
+
+    user = session.get(User, user_id)
+    if user is None:
+        raise MatchingError(f"User {user_id} not found")
+    ensure_user_belongs_to_quadra(user, quadra)
+
+    pending = _pending_job(session, user_id)
+    if pending is not None:
+        return pending
+    job = MatchmakingJob(user_id=user_id, quadra=quadra.value, status=JOB_QUEUED, attempts=0)
+    try:
+        # A savepoint, so losing the race to a concurrent enqueue keeps the transaction usable.
+        with session.begin_nested():
+            session.add(job)
+    except IntegrityError:
+        pending = _pending_job(session, user_id)
+        if pending is None:
+            raise
+        return pending
+    return job
+
+
+def claim_jobs(
+    session: Session,
+    worker_id: str,
+    quadras: Sequence[Quadra],
+    limit: int,
+    *,
+    lease_seconds: float | None = None,
+) -> list[ClaimedJob]:
+    """Mark up to ``limit`` jobs of ``quadras`` as running for ``worker_id``, oldest first.
+
+    Running jobs whose lease has expired count as queued. Commit right
+    after, so other workers see the claim.
+    """
+
+    lease = get_settings().matchmaking_job_lease_seconds if lease_seconds is None else lease_seconds
+    now = datetime.utcnow()
+    claimable = or_(
+        MatchmakingJob.status == JOB_QUEUED,
+        and_(MatchmakingJob.status == JOB_RUNNING, MatchmakingJob.claimed_at < now - timedelta(seconds=lease)),
+    )
+    picked = (
+        select(MatchmakingJob.id)
+        .where(MatchmakingJob.quadra.in_([quadra.value for quadra in quadras]))
+        .where(claimable)
+        .order_by(MatchmakingJob.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    rows = session.execute(
+        update(MatchmakingJob)
+        .where(MatchmakingJob.id.in_(picked.scalar_subquery()))
+        .values(
+            status=JOB_RUNNING,
+            claimed_by=worker_id,
+            claimed_at=now,
+            attempts=MatchmakingJob.attempts + 1,
+            updated_at=now,
+        )
+        .returning(MatchmakingJob.id, MatchmakingJob.user_id, MatchmakingJob.quadra)
+        .execution_options(synchronize_session=False)
+    ).all()
+    rows.sort(key=lambda row: row.id)
+    return [ClaimedJob(row.id, row.user_id, row.quadra) for row in rows]
+
+
+def _finish(session: Session, job: ClaimedJob, worker_id: str, **values) -> None:
+    now = datetime.utcnow()
+    session.execute(
+        update(MatchmakingJob)
+        .where(MatchmakingJob.id == job.id, MatchmakingJob.claimed_by == worker_id)
+        .values(updated_at=now, **values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def run_job(session: Session, job: ClaimedJob, worker_id: str) -> str:
+    """Run one claimed job and commit its outcome; returns the final status."""
+
+    try:
+        result = find_or_create_cluster_for_user(job.user_id, Quadra(job.quadra), session=session)
+        _finish(session, job, worker_id, status=JOB_DONE, result=result, error=None, finished_at=datetime.utcnow())
+        session.commit()
+        return JOB_DONE
+    except MatchingError as exc:
+        session.rollback()
+        _finish(session, job, worker_id, status=JOB_FAILED, error=str(exc), finished_at=datetime.utcnow())
+        session.commit()
+        return JOB_FAILED
+    except Exception as exc:
+        session.rollback()
+        logger.exception("matchmaking job %s failed", job.id)
+        attempts = session.scalar(select(MatchmakingJob.attempts).where(MatchmakingJob.id == job.id)) or 0
+        if attempts < MAX_ATTEMPTS:
+            _finish(session, job, worker_id, status=JOB_QUEUED, error=repr(exc), claimed_by=None, claimed_at=None)
+            status = JOB_QUEUED
+        else:
+            _finish(session, job, worker_id, status=JOB_FAILED, error=repr(exc), finished_at=datetime.utcnow())
+            status = JOB_FAILED
+        session.commit()
+        return status
+
+
+def process_jobs(
+    session_factory: Callable[[], Session],
+    worker_id: str,
+    quadras: Sequence[Quadra],
+    *,
+    batch_size: int | None = None,
+    lease_seconds: float | None = None,
+) -> int:
+    """Claim one batch of jobs and run them; returns how many were claimed.
+
+    The engine's caches stay warm across batches. Likes, availability, ages
+    and timezones written by the API since are picked up by the preference
+    index and the pair score cache themselves, from ``updated_at``
+    watermarks checked every ``cache_refresh_seconds``.
+    """
+
+    limit = get_settings().matchmaking_job_batch_size if batch_size is None else batch_size
+    with session_factory() as session:
+        jobs = claim_jobs(session, worker_id, quadras, limit, lease_seconds=lease_seconds)
+        session.commit()
+        if not jobs:
+            return 0
+        for job in jobs:
+            run_job(session, job, worker_id)
+    return len(jobs)
+
+
+__all__ = [
+    "MAX_ATTEMPTS",
+    "ClaimedJob",
+    "claim_jobs",
+    "enqueue_find_or_create",
+    "process_jobs",
+    "run_job",
+]
@@ -1,24 +1,98 @@
 from __future__ import annotations
 
+import functools
+import heapq
+import itertools
+import threading
+import time
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Iterable, Sequence
+from typing import Callable, Iterable, Mapping, NamedTuple, Sequence
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session, joinedload
+import numpy as np
+from sqlalchemy import LargeBinary, event, insert, select, type_coerce
+from sqlalchemy.orm import Session, joinedload, object_session, selectinload
 
-from quadral_cluster.database import SessionLocal
-from quadral_cluster.domain.socionics import QUADRA_MEMBERS, Quadra, SocType
+from quadral_cluster.config import get_settings
+from quadral_cluster.database import SessionLocal, engine_state
+from quadral_cluster.domain.socionics import QUADRA_MEMBERS, QUADRA_SLOT_BITS, Quadra, SocType
+from quadral_cluster.metrics import REGISTRY, SIZE_BUCKETS
+from quadral_cluster.models.availability import Availability, WeeklyMask
 from quadral_cluster.models.cluster import Cluster, ClusterMember
 from quadral_cluster.models.domain import User
 from quadral_cluster.models.preference import Preference
-from quadral_cluster.utils.time_overlap import overlap as availability_overlap
+from quadral_cluster.services.preferences import PreferenceIndex, clamp_weight, preference_index_for
+from quadral_cluster.services.scoring_cache import PairScoreCache, ScoringInputWatch, pair_score_cache_for
+from quadral_cluster.utils.time_overlap import (
+    EMPTY_MASK,
+    MASK_BYTES,
+    mask_to_bytes,
+    overlap as availability_overlap,
+)
+from quadral_cluster.utils.timezones import (
+    MAX_SCORED_OFFSET_MINUTES,
+    ZONE_SCORE_BY_MINUTES,
+    utc_offset_minutes,
+    zone_score as offset_zone_score,
+)
 
 
 class MatchingError(Exception):
     """Base class for matching service errors."""
 
 
+_OPERATION_SECONDS = REGISTRY.histogram(
+    "matching_operation_duration_seconds",
+    "Duration of find_or_create and try_join_cluster by outcome.",
+    ("operation", "outcome"),
+)
+_CANDIDATE_POOL = REGISTRY.histogram(
+    "matching_candidate_pool_size",
+    "Candidates scored per call: unclustered users for find_or_create and batch, open clusters for open_clusters.",
+    ("operation",),
+    buckets=SIZE_BUCKETS,
+)
+# ``MatchingError`` messages name users and clusters; only these are kept as outcomes.
+_KNOWN_REASONS = frozenset({"slot_taken", "archived"})
+
+
+def _observed(operation: str, outcome: Callable[[dict[str, object]], str]):
+    """Record the duration of ``operation`` under the outcome of its result.
+
+    A ``MatchingError`` that escapes counts as ``rejected``, anything else as
+    ``error``.
+    """
+
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            label = "error"
+            try:
+                result = function(*args, **kwargs)
+                label = outcome(result)
+                return result
+            except MatchingError:
+                label = "rejected"
+                raise
+            finally:
+                _OPERATION_SECONDS.labels(operation, label).observe(time.perf_counter() - started)
+
+        return wrapper
+
+    return decorate
+
+
+def _join_outcome(result: dict[str, object]) -> str:
+    if result.get("ok"):
+        return "ok"
+    reason = result.get("reason")
+    return reason if reason in _KNOWN_REASONS else "rejected"
+
+
+def _find_or_create_outcome(result: dict[str, object]) -> str:
+    return "ok" if result.get("ok") else "missing"
+
+
 @dataclass(slots=True)
 class ClusterWithScore:
     cluster: Cluster
@@ -26,6 +100,16 @@ class ClusterWithScore:
     members: Sequence[ClusterMember]
 
 
+class CandidateRow(NamedTuple):
+    """Scoring columns of a user fetched without hydrating the ORM graph."""
+
+    id: int
+    socionics_type: str
+    age: int | None
+    timezone: str | None
+    weekly_mask: int | None
+
+
 def _ensure_session(session: Session | None) -> tuple[Session, bool]:
     if session is not None:
         return session, False
@@ -38,7 +122,7 @@ def _close_session(session: Session, should_close: bool) -> None:
         session.close()
 
 
-def _ensure_user_belongs_to_quadra(user: User, quadra: Quadra) -> None:
+def ensure_user_belongs_to_quadra(user: User, quadra: Quadra) -> None:
     members = QUADRA_MEMBERS[quadra]
     if SocType(user.socionics_type) not in members:
         msg = f"User {user.id} with TIM {user.socionics_type} is not part of quadra {quadra.value}"
@@ -48,30 +132,48 @@ def _ensure_user_belongs_to_quadra(user: User, quadra: Quadra) -> None:
 def _load_preference_map(preferences: Iterable[Preference]) -> dict[int, int]:
     mapping: dict[int, int] = {}
     for pref in preferences:
-        mapping[pref.to_user_id] = max(min(pref.weight, 2), -2)
+        mapping[pref.to_user_id] = clamp_weight(pref.weight)
     return mapping
 
 
+def _resolve_preferences(user: User, preferences: PreferenceIndex | None) -> PreferenceIndex | None:
+    if preferences is not None:
+        return preferences
+    session = object_session(user)
+    if session is None:
+        return None
+    return preference_index_for(session)
+
+
+_TZ_OK = 0
+_TZ_MISSING = 1
+_TZ_INVALID = 2
+
+_POPCOUNT_BYTE = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+_ZONE_SCORE = np.asarray(ZONE_SCORE_BY_MINUTES, dtype=np.float64)
+_EMPTY_MASK_BLOB = mask_to_bytes(EMPTY_MASK)
+
+
+def _timezone_offset(name: str | None) -> tuple[int, int]:
+    """Map a timezone name to a state flag and its cached UTC offset in minutes."""
+
+    if not name:
+        return _TZ_MISSING, 0
+    minutes = utc_offset_minutes(name)
+    if minutes is None:
+        return _TZ_INVALID, 0
+    return _TZ_OK, minutes
+
+
 def _timezone_score(a: User, b: User) -> float:
     if not a.timezone or not b.timezone:
         return 0.5
-    try:
-        from zoneinfo import ZoneInfo
-    except Exception:  # pragma: no cover - optional dependency fallback
-        return 0.5
 
-    try:
-        now = datetime.utcnow()
-        delta_a = now.astimezone(ZoneInfo(a.timezone)).utcoffset()
-        delta_b = now.astimezone(ZoneInfo(b.timezone)).utcoffset()
-    except Exception:  # pragma: no cover - invalid timezone name
+    minutes_a = utc_offset_minutes(a.timezone)
+    minutes_b = utc_offset_minutes(b.timezone)
+    if minutes_a is None or minutes_b is None:
         return 0.0
-
-    if delta_a is None or delta_b is None:
-        return 0.5
-
-    diff_hours = abs((delta_a - delta_b).total_seconds()) / 3600.0
-    return max(0.0, 1.0 - min(diff_hours, 12.0) / 12.0)
+    return offset_zone_score(minutes_a, minutes_b)
 
 
 def _age_score(a: User, b: User) -> float:
@@ -83,18 +185,23 @@ def _age_score(a: User, b: User) -> float:
     return max(0.0, 1.0 - diff / 20.0)
 
 
-def pair_score(a: User, b: User) -> float:
+def pair_score(a: User, b: User, *, preferences: PreferenceIndex | None = None) -> float:
     """Calculate compatibility score between two users."""
 
-    prefs_from_a = _load_preference_map(a.preferences_from)
-    prefs_from_b = _load_preference_map(b.preferences_from)
+    index = _resolve_preferences(a, preferences)
+    if index is not None:
+        weight_a = index.weight(a.id, b.id)
+        weight_b = index.weight(b.id, a.id)
+    else:
+        weight_a = _load_preference_map(a.preferences_from).get(b.id, 0)
+        weight_b = _load_preference_map(b.preferences_from).get(a.id, 0)
 
-    like_a = (prefs_from_a.get(b.id, 0) + 2) / 4
-    like_b = (prefs_from_b.get(a.id, 0) + 2) / 4
+    like_a = (weight_a + 2) / 4
+    like_b = (weight_b + 2) / 4
     like_score = (like_a + like_b) / 2
 
-    mask_a = a.availability.weekly_mask if a.availability else ""
-    mask_b = b.availability.weekly_mask if b.availability else ""
+    mask_a = a.availability.weekly_mask if a.availability else EMPTY_MASK
+    mask_b = b.availability.weekly_mask if b.availability else EMPTY_MASK
     time_score = availability_overlap(mask_a, mask_b)
 
     zone_score = _timezone_score(a, b)
@@ -103,6 +210,509 @@ def pair_score(a: User, b: User) -> float:
     return (like_score * 0.5) + (time_score * 0.3) + (zone_score * 0.1) + (age_score * 0.1)
 
 
+@dataclass(slots=True)
+class ScoringFeatures:
+    """Column-oriented ``pair_score`` inputs for a batch of users."""
+
+    ids: np.ndarray
+    ages: np.ndarray
+    tz_states: np.ndarray
+    tz_offsets: np.ndarray
+    masks: np.ndarray
+    hours: np.ndarray
+
+
+def _weekly_mask_of(user: User | CandidateRow) -> int:
+    if isinstance(user, CandidateRow):
+        return user.weekly_mask if user.weekly_mask is not None else EMPTY_MASK
+    return user.availability.weekly_mask if user.availability else EMPTY_MASK
+
+
+def _mask_blob(value: bytes | str | None) -> bytes:
+    if value is None:
+        return _EMPTY_MASK_BLOB
+    if isinstance(value, bytes) and len(value) == MASK_BYTES:
+        return value
+    return mask_to_bytes(WeeklyMask().process_result_value(value, None))
+
+
+def pack_scoring_columns(
+    ids: Sequence[int],
+    ages: Sequence[int | None],
+    timezones: Sequence[str | None],
+    raw_masks: Sequence[bytes | str | None],
+) -> ScoringFeatures:
+    """Pack column values as read from the database into ``ScoringFeatures``.
+
+    ``raw_masks`` holds stored ``weekly_mask`` values, so callers can select
+    the blob column directly and skip building an integer per row.
+    """
+
+    count = len(ids)
+    resolved = {name: _timezone_offset(name) for name in dict.fromkeys(timezones)}
+    zones = np.array(list(map(resolved.__getitem__, timezones)), dtype=np.int64).reshape(count, 2)
+    tz_states = zones[:, 0].astype(np.int8)
+    tz_offsets = zones[:, 1]
+
+    if all(type(value) is bytes and len(value) == MASK_BYTES for value in raw_masks):
+        raw = b"".join(raw_masks)
+    else:
+        raw = b"".join(map(_mask_blob, raw_masks))
+    masks = np.frombuffer(raw, dtype=np.uint8).reshape(count, MASK_BYTES)
+
+    return ScoringFeatures(
+        ids=np.fromiter(ids, dtype=np.int64, count=count),
+        ages=np.array(ages, dtype=np.float64).reshape(count),
+        tz_states=tz_states,
+        tz_offsets=tz_offsets,
+        masks=masks,
+        hours=_POPCOUNT_BYTE[masks].sum(axis=1, dtype=np.int64),
+    )
+
+
+def pack_scoring_features(users: Sequence[User | CandidateRow]) -> ScoringFeatures:
+    """Pack ages, UTC offsets and availability bits of ``users`` into arrays."""
+
+    return pack_scoring_columns(
+        [user.id for user in users],
+        [user.age for user in users],
+        [user.timezone for user in users],
+        [mask_to_bytes(_weekly_mask_of(user)) for user in users],
+    )
+
+
+def pair_scores(
+    features: ScoringFeatures,
+    left: np.ndarray,
+    right: np.ndarray,
+    like_left: np.ndarray,
+    like_right: np.ndarray,
+) -> np.ndarray:
+    """Vectorized ``pair_score`` for the index pairs ``(left[k], right[k])``.
+
+    ``like_left[k]`` is the weight ``left[k]`` gave ``right[k]`` and
+    ``like_right[k]`` the weight in the opposite direction.
+    """
+
+    like_score = ((np.clip(like_left, -2, 2) + 2) / 4 + (np.clip(like_right, -2, 2) + 2) / 4) / 2
+
+    hours_left = features.hours[left]
+    hours_right = features.hours[right]
+    common = _POPCOUNT_BYTE[features.masks[left] & features.masks[right]].sum(axis=1, dtype=np.int64)
+    denominator = np.maximum(np.maximum(hours_left, hours_right), 1)
+    time_score = np.where((hours_left == 0) & (hours_right == 0), 0.0, common / denominator)
+
+    states_left = features.tz_states[left]
+    states_right = features.tz_states[right]
+    diff_minutes = np.abs(features.tz_offsets[left] - features.tz_offsets[right])
+    zone_score = np.where(
+        (states_left == _TZ_MISSING) | (states_right == _TZ_MISSING),
+        0.5,
+        np.where(
+            (states_left == _TZ_OK) & (states_right == _TZ_OK),
+            _ZONE_SCORE[np.minimum(diff_minutes, MAX_SCORED_OFFSET_MINUTES)],
+            0.0,
+        ),
+    )
+
+    age_diff = np.abs(features.ages[left] - features.ages[right])
+    age_score = np.where(np.isnan(age_diff), 0.5, np.maximum(0.0, 1.0 - age_diff / 20.0))
+
+    return (like_score * 0.5) + (time_score * 0.3) + (zone_score * 0.1) + (age_score * 0.1)
+
+
+def score_candidates(
+    anchor: User,
+    candidates: Sequence[User | CandidateRow],
+    *,
+    preferences: PreferenceIndex | None = None,
+    cache: PairScoreCache | None = None,
+) -> np.ndarray:
+    """Score ``anchor`` against every candidate in a single vectorized pass.
+
+    Matches ``pair_score(anchor, candidate)`` element-wise within float tolerance.
+    With a ``cache``, only pairs without a current cached score are computed.
+    """
+
+    if not candidates:
+        return np.empty(0, dtype=np.float64)
+    if cache is not None:
+        return cache.scores(
+            anchor.id,
+            [candidate.id for candidate in candidates],
+            lambda missing: score_candidates(
+                anchor, [candidates[index] for index in missing], preferences=preferences
+            ),
+        )
+
+    index = _resolve_preferences(anchor, preferences)
+    if index is not None:
+        prefs_from_anchor = index.outgoing(anchor.id)
+        prefs_to_anchor = index.incoming(anchor.id)
+    else:
+        prefs_from_anchor = _load_preference_map(anchor.preferences_from)
+        prefs_to_anchor = {pref.from_user_id: pref.weight for pref in anchor.preferences_to}
+
+    features = pack_scoring_features([anchor, *candidates])
+    count = len(candidates)
+    like_left = np.fromiter(
+        (prefs_from_anchor.get(candidate.id, 0) for candidate in candidates), dtype=np.float64, count=count
+    )
+    like_right = np.fromiter(
+        (prefs_to_anchor.get(candidate.id, 0) for candidate in candidates), dtype=np.float64, count=count
+    )
+    return pair_scores(
+        features,
+        np.zeros(count, dtype=np.intp),
+        np.arange(1, count + 1, dtype=np.intp),
+        like_left,
+        like_right,
+    )
+
+
+_FEATURE_CHUNK = 5000
+
+
+def _feature_rows(db: Session, user_ids: Sequence[int]) -> list[tuple]:
+    """``(id, age, timezone, raw weekly mask)`` for ``user_ids``, in the same order.
+
+    Masks come back as stored blobs, ready for ``pack_scoring_columns``.
+    """
+
+    found: dict[int, tuple] = {}
+    for start in range(0, len(user_ids), _FEATURE_CHUNK):
+        stmt = (
+            select(User.id, User.age, User.timezone, type_coerce(Availability.weekly_mask, LargeBinary))
+            .outerjoin(Availability, Availability.user_id == User.id)
+            .where(User.id.in_(user_ids[start : start + _FEATURE_CHUNK]))
+        )
+        found.update((row[0], tuple(row)) for row in db.connection().execute(stmt))
+    return [found.get(user_id, (user_id, None, None, None)) for user_id in user_ids]
+
+
+def _score_feature_rows(anchor: User, rows: Sequence[tuple], preferences: PreferenceIndex) -> np.ndarray:
+    """Vectorized ``pair_score`` of ``anchor`` against ``_feature_rows`` output."""
+
+    count = len(rows)
+    user_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=count)
+    features = pack_scoring_columns(
+        [anchor.id, *user_ids.tolist()],
+        [anchor.age, *(row[1] for row in rows)],
+        [anchor.timezone, *(row[2] for row in rows)],
+        [mask_to_bytes(_weekly_mask_of(anchor)), *(row[3] for row in rows)],
+    )
+    return pair_scores(
+        features,
+        np.zeros(count, dtype=np.intp),
+        np.arange(1, count + 1, dtype=np.intp),
+        _weights_towards(user_ids, preferences.outgoing(anchor.id)),
+        _weights_towards(user_ids, preferences.incoming(anchor.id)),
+    )
+
+
+def _cached_scores(db: Session, anchor: User, user_ids: Sequence[int]) -> np.ndarray:
+    """Scores of ``anchor`` against ``user_ids``; features are loaded for cache misses only."""
+
+    preferences = preference_index_for(db)
+    return pair_score_cache_for(db).scores(
+        anchor.id,
+        user_ids,
+        lambda missing: _score_feature_rows(
+            anchor, _feature_rows(db, [user_ids[index] for index in missing]), preferences
+        ),
+    )
+
+
+def _open_clusters_filter(stmt, quadra: Quadra, tim: SocType | None):
+    """Restrict ``stmt`` to joinable clusters of ``quadra`` without ``tim`` (any TIM for ``None``)."""
+
+    stmt = (
+        stmt.where(Cluster.quadra == quadra.value)
+        .where(Cluster.status.in_(["open", "locked"]))
+        .where(Cluster.member_count < len(QUADRA_MEMBERS[quadra]))
+    )
+    if tim in QUADRA_MEMBERS[quadra]:
+        stmt = stmt.where(Cluster.occupied_tims.bitwise_and(QUADRA_SLOT_BITS[tim]) == 0)
+    return stmt
+
+
+def _load_clusters(db: Session, cluster_ids: Sequence[int]) -> list[Cluster]:
+    loaded = db.execute(
+        select(Cluster)
+        .where(Cluster.id.in_(cluster_ids))
+        .options(selectinload(Cluster.members).joinedload(ClusterMember.user).joinedload(User.availability))
+    ).scalars()
+    by_id = {cluster.id: cluster for cluster in loaded}
+    return [by_id[cluster_id] for cluster_id in cluster_ids if cluster_id in by_id]
+
+
+def _weights_towards(user_ids: np.ndarray, weights: Mapping[int, int]) -> np.ndarray:
+    """Look up ``weights[user_id]`` (default 0) for every id in ``user_ids``."""
+
+    result = np.zeros(len(user_ids), dtype=np.float64)
+    if not weights:
+        return result
+    keys = np.fromiter(weights.keys(), dtype=np.int64, count=len(weights))
+    values = np.fromiter(weights.values(), dtype=np.float64, count=len(weights))
+    order = np.argsort(keys)
+    keys, values = keys[order], values[order]
+    positions = np.minimum(np.searchsorted(keys, user_ids), len(keys) - 1)
+    found = keys[positions] == user_ids
+    result[found] = values[positions[found]]
+    return result
+
+
+@dataclass(frozen=True, slots=True)
+class _OpenClusterColumns:
+    """Joinable clusters of one quadra and the scoring features of their members.
+
+    Clusters are sorted by id; ``member_slots[k]`` is the position in ``ids``
+    of the cluster of member ``k``.
+    """
+
+    ids: np.ndarray
+    occupied: np.ndarray
+    member_slots: np.ndarray
+    members: ScoringFeatures
+
+
+def _take_features(features: ScoringFeatures, positions: np.ndarray) -> ScoringFeatures:
+    return ScoringFeatures(*(getattr(features, name)[positions] for name in ScoringFeatures.__slots__))
+
+
+def _concat_features(parts: Sequence[ScoringFeatures]) -> ScoringFeatures:
+    return ScoringFeatures(
+        *(np.concatenate([getattr(part, name) for part in parts]) for name in ScoringFeatures.__slots__)
+    )
+
+
+def _read_open_clusters(db: Session, quadra: Quadra, cluster_ids: Sequence[int] | None = None) -> list[tuple]:
+    """Rows of ``(cluster id, occupied_tims, *member feature row)`` for joinable clusters.
+
+    Clusters without members come back as a single row with NULL member
+    columns. ``cluster_ids`` restricts the read to those clusters.
+    """
+
+    stmt = _open_clusters_filter(
+        select(
+            Cluster.id,
+            Cluster.occupied_tims,
+            User.id,
+            User.age,
+            User.timezone,
+            type_coerce(Availability.weekly_mask, LargeBinary),
+        )
+        .select_from(Cluster)
+        .outerjoin(ClusterMember, ClusterMember.cluster_id == Cluster.id)
+        .outerjoin(User, User.id == ClusterMember.user_id)
+        .outerjoin(Availability, Availability.user_id == User.id),
+        quadra,
+        None,
+    )
+    if cluster_ids is None:
+        return db.connection().execute(stmt).all()
+    rows = []
+    for start in range(0, len(cluster_ids), _FEATURE_CHUNK):
+        chunk = stmt.where(Cluster.id.in_(cluster_ids[start : start + _FEATURE_CHUNK]))
+        rows.extend(db.connection().execute(chunk))
+    return rows
+
+
+def _pack_open_clusters(rows: Sequence[tuple]) -> _OpenClusterColumns:
+    count = len(rows)
+    cluster_column, occupied_column, *member_columns = zip(*rows) if rows else ((),) * 6
+    ids, first, slots = np.unique(
+        np.fromiter(cluster_column, dtype=np.int64, count=count), return_index=True, return_inverse=True
+    )
+    members = [index for index, user_id in enumerate(member_columns[0]) if user_id is not None]
+    return _OpenClusterColumns(
+        ids=ids,
+        occupied=np.fromiter(occupied_column, dtype=np.int64, count=count)[first],
+        member_slots=slots.reshape(count)[members],
+        members=pack_scoring_columns(*([column[index] for index in members] for column in member_columns)),
+    )
+
+
+def _merge_open_clusters(
+    columns: _OpenClusterColumns, replaced: Sequence[int], fresh: _OpenClusterColumns
+) -> _OpenClusterColumns:
+    """``columns`` without the ``replaced`` clusters, plus every cluster in ``fresh``."""
+
+    keep = np.isin(columns.ids, np.fromiter(replaced, dtype=np.int64, count=len(replaced)), invert=True)
+    kept_members = np.flatnonzero(keep[columns.member_slots])
+    ids = np.concatenate([columns.ids[keep], fresh.ids])
+    order = np.argsort(ids, kind="stable")
+    positions = np.empty(len(ids), dtype=np.intp)
+    positions[order] = np.arange(len(ids))
+    kept_slots = (np.cumsum(keep) - 1)[columns.member_slots[kept_members]]
+    return _OpenClusterColumns(
+        ids=ids[order],
+        occupied=np.concatenate([columns.occupied[keep], fresh.occupied])[order],
+        member_slots=positions[np.concatenate([kept_slots, fresh.member_slots + int(keep.sum())])],
+        members=_concat_features([_take_features(columns.members, kept_members), fresh.members]),
+    )
+
+
+class _OpenClusterWatch(ScoringInputWatch):
+    _COLUMNS = (("matching_clusters", Cluster.id, Cluster.updated_at),)
+
+
+class OpenClusterIndex:
+    """Per-quadra snapshots of joinable clusters and their members' scoring features.
+
+    A quadra is read in one query on first use. Clusters changed by commits
+    of this process, clusters other processes stamped (checked at most every
+    ``cache_refresh_seconds``) and clusters with a member whose scoring
+    inputs changed since the snapshot are re-read and patched in before the
+    next ranking, the way ``RecommendationEngine`` keeps its snapshot
+    current. Member changes come from the pair score cache generations.
+    """
+
+    def __init__(self, refresh_seconds: float | None = None) -> None:
+        self._columns: dict[Quadra, _OpenClusterColumns] = {}
+        self._generations: dict[Quadra, int] = {}
+        self._stale: dict[Quadra, set[int]] = {}
+        self._watch = _OpenClusterWatch(refresh_seconds)
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._columns.clear()
+            self._generations.clear()
+            self._stale.clear()
+
+    def mark_stale(self, cluster_ids: Iterable[int]) -> None:
+        cluster_ids = set(cluster_ids)
+        with self._lock:
+            for stale in self._stale.values():
+                stale.update(cluster_ids)
+
+    def load(self, session: Session, quadra: Quadra, generation: int) -> _OpenClusterColumns:
+        with self._lock:
+            self._stale[quadra] = set()
+        columns = _pack_open_clusters(_read_open_clusters(session, quadra))
+        with self._lock:
+            self._columns[quadra] = columns
+            self._generations[quadra] = generation
+        return columns
+
+    def columns(self, session: Session, quadra: Quadra) -> _OpenClusterColumns:
+        if self._watch.refresh_due:
+            changed = self._watch.changed_ids(session)
+            if changed:
+                self.mark_stale(changed)
+        cache = pair_score_cache_for(session)
+        # Read before any rows, so users bumped while reading are patched next time.
+        generation = cache.generation
+        with self._lock:
+            columns = self._columns.get(quadra)
+            since = self._generations.get(quadra)
+        changed_users = None if columns is None else cache.changes_since(since)
+        if changed_users is None:
+            return self.load(session, quadra, generation)
+
+        with self._lock:
+            stale = self._stale.setdefault(quadra, set())
+            if changed_users:
+                touched = np.isin(columns.members.ids, np.fromiter(changed_users, dtype=np.int64))
+                stale.update(columns.ids[columns.member_slots[touched]].tolist())
+            self._generations[quadra] = generation
+            if not stale:
+                return columns
+            self._stale[quadra] = set()
+        replaced = sorted(stale)
+        fresh = _pack_open_clusters(_read_open_clusters(session, quadra, replaced))
+        with self._lock:
+            columns = _merge_open_clusters(self._columns.get(quadra, columns), replaced, fresh)
+            self._columns[quadra] = columns
+            return columns
+
+
+def open_cluster_index_for(session: Session) -> OpenClusterIndex:
+    """Return the open cluster index for the engine behind ``session``."""
+
+    state = engine_state(session)
+    index = state.get("open_cluster_index")
+    if index is None:
+        index = state.setdefault("open_cluster_index", OpenClusterIndex(get_settings().cache_refresh_seconds))
+    return index
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_cluster_changes(session: Session, flush_context) -> None:
+    changed = set()
+    for instance in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(instance, Cluster):
+            changed.add(instance.id)
+        elif isinstance(instance, ClusterMember) and instance.cluster_id is not None:
+            changed.add(instance.cluster_id)
+    if changed:
+        session.info.setdefault("changed_open_cluster_ids", set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_open_clusters_stale(session: Session) -> None:
+    changed = session.info.pop("changed_open_cluster_ids", None)
+    index = engine_state(session).get("open_cluster_index") if changed else None
+    if index is not None:
+        index.mark_stale(changed)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_cluster_changes(session: Session, previous_transaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop("changed_open_cluster_ids", None)
+
+
+def _rank_open_clusters_for_candidate(
+    db: Session,
+    quadra: Quadra,
+    tim: SocType,
+    candidate: User,
+    limit: int,
+) -> list[tuple[int, float]]:
+    """Rank open clusters by the candidate's mean score against their members.
+
+    Member features come from the engine's ``OpenClusterIndex`` and are
+    scored in a single batched pass; a heap keeps only the best ``limit``.
+    Ties keep the lower cluster id first. A session with flushed, not yet
+    committed cluster changes reads its own view instead of the snapshot.
+    """
+
+    if db.info.get("changed_open_cluster_ids"):
+        columns = _pack_open_clusters(_read_open_clusters(db, quadra))
+    else:
+        columns = open_cluster_index_for(db).columns(db, quadra)
+    eligible = np.ones(len(columns.ids), dtype=bool)
+    if tim in QUADRA_MEMBERS[quadra]:
+        eligible = (columns.occupied & QUADRA_SLOT_BITS[tim]) == 0
+    cluster_ids = columns.ids[eligible]
+    _CANDIDATE_POOL.labels("open_clusters").observe(len(cluster_ids))
+    if not len(cluster_ids):
+        return []
+
+    members = np.flatnonzero(eligible[columns.member_slots])
+    means = np.full(len(cluster_ids), 0.5)
+    if len(members):
+        member_slots = (np.cumsum(eligible) - 1)[columns.member_slots[members]]
+        features = _concat_features([pack_scoring_features([candidate]), _take_features(columns.members, members)])
+        preferences = preference_index_for(db)
+        user_ids = features.ids[1:]
+        scores = pair_scores(
+            features,
+            np.zeros(len(members), dtype=np.intp),
+            np.arange(1, len(members) + 1, dtype=np.intp),
+            _weights_towards(user_ids, preferences.outgoing(candidate.id)),
+            _weights_towards(user_ids, preferences.incoming(candidate.id)),
+        )
+        totals = np.bincount(member_slots, weights=scores, minlength=len(cluster_ids))
+        sizes = np.bincount(member_slots, minlength=len(cluster_ids))
+        means = np.divide(totals, sizes, out=means, where=sizes > 0)
+
+    top = heapq.nlargest(limit, range(len(cluster_ids)), key=means.__getitem__)
+    return [(int(cluster_ids[slot]), float(means[slot])) for slot in top]
+
+
 def list_open_clusters_for_tim(
     quadra: Quadra,
     tim: SocType,
@@ -113,38 +723,30 @@ def list_open_clusters_for_tim(
 ) -> list[ClusterWithScore]:
     db, should_close = _ensure_session(session)
     try:
-        stmt = (
-            select(Cluster)
-            .where(Cluster.quadra == quadra.value)
-            .where(Cluster.status.in_(["open", "locked"]))
-            .options(joinedload(Cluster.members).joinedload(ClusterMember.user))
-            .limit(limit)
-        )
-        clusters = db.execute(stmt).scalars().unique().all()
-
-        result: list[ClusterWithScore] = []
-        for cluster in clusters:
-            members = [member for member in cluster.members]
-            tims_in_cluster = {SocType(member.socionics_type) for member in members}
-            if tim in tims_in_cluster:
-                continue
-            if len(members) >= len(QUADRA_MEMBERS[quadra]):
-                continue
-
-            score = 0.0
-            if candidate is not None:
-                score_values = [pair_score(candidate, member.user) for member in members]
-                if score_values:
-                    score = sum(score_values) / len(score_values)
-                else:
-                    score = 0.5
-            else:
-                score = len(members) / len(QUADRA_MEMBERS[quadra])
+        if candidate is not None:
+            ranked = _rank_open_clusters_for_candidate(db, quadra, tim, candidate, limit)
+            scores = dict(ranked)
+            clusters = _load_clusters(db, [cluster_id for cluster_id, _ in ranked])
+            return [
+                ClusterWithScore(cluster=cluster, score=scores[cluster.id], members=list(cluster.members))
+                for cluster in clusters
+            ]
 
-            result.append(ClusterWithScore(cluster=cluster, score=score, members=members))
+        capacity = len(QUADRA_MEMBERS[quadra])
+        stmt = _open_clusters_filter(select(Cluster.id), quadra, tim)
+        stmt = stmt.order_by(Cluster.member_count.desc(), Cluster.id).limit(limit)
+        clusters = _load_clusters(db, list(db.execute(stmt).scalars()))
 
+        result = [
+            ClusterWithScore(
+                cluster=cluster,
+                score=len(cluster.members) / capacity,
+                members=list(cluster.members),
+            )
+            for cluster in clusters
+        ]
         result.sort(key=lambda item: item.score, reverse=True)
-        return result[:limit]
+        return result
     finally:
         _close_session(db, should_close)
 
@@ -166,6 +768,7 @@ def _ensure_can_join(cluster: Cluster, user: User, tim: SocType) -> None:
         raise MatchingError("slot_taken")
 
 
+@_observed("try_join_cluster", _join_outcome)
 def try_join_cluster(
     user_id: int,
     cluster_id: int,
@@ -177,11 +780,7 @@ def try_join_cluster(
         user = db.execute(
             select(User)
             .where(User.id == user_id)
-            .options(
-                joinedload(User.availability),
-                joinedload(User.preferences_from),
-                joinedload(User.preferences_to),
-            )
+            .options(joinedload(User.availability))
         ).unique().scalar_one_or_none()
         if user is None:
             raise MatchingError(f"User {user_id} not found")
@@ -196,10 +795,13 @@ def try_join_cluster(
 
         tim = SocType(user.socionics_type)
         _ensure_can_join(cluster, user, tim)
-        _ensure_user_belongs_to_quadra(user, Quadra(cluster.quadra))
+        ensure_user_belongs_to_quadra(user, Quadra(cluster.quadra))
 
         membership = ClusterMember(cluster_id=cluster.id, user_id=user.id, socionics_type=tim.value)
         cluster.members.append(membership)
+        # Evaluated by the database so concurrent joins of other TIMs compose.
+        cluster.occupied_tims = Cluster.occupied_tims.bitwise_or(QUADRA_SLOT_BITS[tim])
+        cluster.member_count = Cluster.member_count + 1
 
         if len(cluster.members) >= len(QUADRA_MEMBERS[Quadra(cluster.quadra)]):
             cluster.status = "full"
@@ -215,34 +817,85 @@ def try_join_cluster(
         _close_session(db, should_close)
 
 
+def _unclustered_pool_stmt(quadra: Quadra, tim_values: Sequence[str], exclude: Iterable[int], *columns):
+    in_cluster = select(ClusterMember.id).where(ClusterMember.user_id == User.id).exists()
+    stmt = (
+        select(*columns)
+        .where(User.quadra == quadra.value)
+        .where(User.socionics_type.in_(tim_values))
+        .where(~in_cluster)
+        # Index order of ix_users_quadra_socionics_type: a ``User.id`` order
+        # alone makes SQLite scan the whole table to skip the sort.
+        .order_by(User.socionics_type, User.id)
+    )
+    excluded = list(exclude)
+    if excluded:
+        stmt = stmt.where(User.id.notin_(excluded))
+    return stmt
+
+
+def _unclustered_pool(
+    db: Session,
+    quadra: Quadra,
+    tims: Iterable[SocType],
+    exclude: Iterable[int] = (),
+) -> list[CandidateRow]:
+    """Fetch users of ``tims`` in ``quadra`` that are not in any cluster yet.
+
+    The quadra and TIM predicates run in SQL and an anti-join on
+    ``matching_cluster_members`` drops clustered users; rows come back as
+    column tuples instead of ORM objects.
+    """
+
+    tim_values = [tim.value for tim in tims]
+    if not tim_values:
+        return []
+
+    stmt = _unclustered_pool_stmt(
+        quadra,
+        tim_values,
+        exclude,
+        User.id,
+        User.socionics_type,
+        User.age,
+        User.timezone,
+        Availability.weekly_mask,
+    ).outerjoin(Availability, Availability.user_id == User.id)
+    return [CandidateRow(*row) for row in db.execute(stmt)]
+
+
 def _best_candidates_for_tim(
     db: Session,
     quadra: Quadra,
-    tim: SocType,
+    tims: Iterable[SocType],
     exclude: set[int],
     anchor: User,
-) -> list[User]:
-    stmt = (
-        select(User)
-        .where(User.socionics_type == tim.value)
-        .where(User.id.notin_(exclude))
-        .options(
-            joinedload(User.availability),
-            joinedload(User.preferences_from),
-            joinedload(User.preferences_to),
-        )
-    )
-    users = [
-        user
-        for user in db.execute(stmt).unique().scalars()
-        if user.quadra == quadra.value and not user.matching_membership
-    ]
+) -> dict[SocType, list[int]]:
+    """Rank unclustered quadra member ids for each of ``tims`` against ``anchor``.
+
+    The pool ids come from a single query and are scored in one pass; only
+    pairs missing from the pair score cache need their features loaded.
+    """
 
-    scored = [(pair_score(anchor, candidate), candidate) for candidate in users]
-    scored.sort(key=lambda item: item[0], reverse=True)
-    return [candidate for _, candidate in scored]
+    tim_values = [tim.value for tim in tims]
+    if not tim_values:
+        return {}
+    pool = db.connection().execute(
+        _unclustered_pool_stmt(quadra, tim_values, exclude, User.id, User.socionics_type)
+    ).all()
+    _CANDIDATE_POOL.labels("find_or_create").observe(len(pool))
+    if not pool:
+        return {}
 
+    scores = _cached_scores(db, anchor, [user_id for user_id, _ in pool])
+    ranked: dict[SocType, list[int]] = {}
+    for index in np.argsort(-scores, kind="stable"):
+        user_id, socionics_type = pool[index]
+        ranked.setdefault(SocType(socionics_type), []).append(user_id)
+    return ranked
 
+
+@_observed("find_or_create", _find_or_create_outcome)
 def find_or_create_cluster_for_user(
     user_id: int,
     quadra: Quadra,
@@ -254,16 +907,12 @@ def find_or_create_cluster_for_user(
         user = db.execute(
             select(User)
             .where(User.id == user_id)
-            .options(
-                joinedload(User.availability),
-                joinedload(User.preferences_from),
-                joinedload(User.preferences_to),
-            )
+            .options(joinedload(User.availability), joinedload(User.matching_membership))
         ).unique().scalar_one_or_none()
         if user is None:
             raise MatchingError(f"User {user_id} not found")
 
-        _ensure_user_belongs_to_quadra(user, quadra)
+        ensure_user_belongs_to_quadra(user, quadra)
 
         if user.matching_membership and user.matching_membership.cluster:
             cluster = user.matching_membership.cluster
@@ -280,42 +929,351 @@ def find_or_create_cluster_for_user(
         required = QUADRA_MEMBERS[quadra]
         missing: list[str] = []
 
-        selected: dict[SocType, User] = {SocType(user.socionics_type): user}
-        exclude_ids = {user.id}
+        anchor_tim = SocType(user.socionics_type)
+        selected: dict[SocType, int] = {anchor_tim: user.id}
+        remaining = [tim for tim in required if tim != anchor_tim]
+        ranked = _best_candidates_for_tim(db, quadra, remaining, {user.id}, user)
 
-        for tim in required:
-            if tim == SocType(user.socionics_type):
-                continue
-            candidates = _best_candidates_for_tim(db, quadra, tim, exclude_ids, user)
+        for tim in remaining:
+            candidates = ranked.get(tim)
             if not candidates:
                 missing.append(tim.value)
                 continue
             selected[tim] = candidates[0]
-            exclude_ids.add(candidates[0].id)
 
         if missing:
             return {"ok": False, "missing": missing}
 
-        cluster = Cluster(quadra=quadra.value, status="locked")
+        cluster = Cluster(
+            quadra=quadra.value,
+            status="full" if len(selected) >= len(required) else "locked",
+            occupied_tims=sum(QUADRA_SLOT_BITS[tim] for tim in selected),
+            member_count=len(selected),
+        )
         db.add(cluster)
         db.flush()
 
-        members_payload = []
-        for tim, member_user in selected.items():
-            membership = ClusterMember(
-                cluster_id=cluster.id,
-                user_id=member_user.id,
-                socionics_type=tim.value,
+        # One executemany for the members instead of an ORM flush, which
+        # inserts them one statement at a time to read back their ids.
+        members_payload = [
+            {"user_id": member_id, "socionics_type": tim.value} for tim, member_id in selected.items()
+        ]
+        db.execute(insert(ClusterMember), [{"cluster_id": cluster.id, **member} for member in members_payload])
+        return {"ok": True, "cluster_id": cluster.id, "members": members_payload}
+    finally:
+        _close_session(db, should_close)
+
+
+@dataclass(slots=True)
+class BatchMatchResult:
+    quadra: Quadra
+    clusters: list[list[int]]
+    cluster_ids: list[int]
+    total_score: float
+    rounds: int
+    elapsed: float
+    unmatched: int
+
+
+@dataclass(slots=True)
+class _LikeEdges:
+    """Sorted ``left * size + right`` keys of like weights inside a pool."""
+
+    keys: np.ndarray
+    weights: np.ndarray
+    size: int
+
+    def lookup(self, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        if not len(self.keys):
+            return np.zeros(len(left), dtype=np.float64)
+        query = left.astype(np.int64) * self.size + right
+        positions = np.minimum(np.searchsorted(self.keys, query), len(self.keys) - 1)
+        return np.where(self.keys[positions] == query, self.weights[positions], 0.0)
+
+
+def _pool_like_edges(pool: Sequence[CandidateRow], preferences: PreferenceIndex) -> _LikeEdges:
+    position = {candidate.id: index for index, candidate in enumerate(pool)}
+    keys: list[int] = []
+    weights: list[int] = []
+    for index, candidate in enumerate(pool):
+        for target_id, weight in preferences.outgoing(candidate.id).items():
+            target = position.get(target_id)
+            if target is not None:
+                keys.append(index * len(pool) + target)
+                weights.append(weight)
+
+    order = np.argsort(np.asarray(keys, dtype=np.int64), kind="stable")
+    return _LikeEdges(
+        keys=np.asarray(keys, dtype=np.int64)[order],
+        weights=np.asarray(weights, dtype=np.float64)[order],
+        size=len(pool),
+    )
+
+
+def _pool_scores(
+    features: ScoringFeatures, likes: _LikeEdges, left: np.ndarray, right: np.ndarray
+) -> np.ndarray:
+    return pair_scores(features, left, right, likes.lookup(left, right), likes.lookup(right, left))
+
+
+def _fit(
+    features: ScoringFeatures,
+    likes: _LikeEdges,
+    slots: np.ndarray,
+    others: np.ndarray,
+    members: np.ndarray,
+    clusters: np.ndarray,
+) -> np.ndarray:
+    """Sum of pair scores between each member and the other three slots of its cluster."""
+
+    neighbours = slots[clusters][:, others]
+    left = np.repeat(members, neighbours.shape[1])
+    return _pool_scores(features, likes, left, neighbours.ravel()).reshape(len(members), -1).sum(axis=1)
+
+
+def _seed_clusters(
+    features: ScoringFeatures,
+    likes: _LikeEdges,
+    groups: list[np.ndarray],
+    rng: np.random.Generator,
+    sample_size: int,
+    chunk_size: int = 1024,
+) -> tuple[np.ndarray, list[np.ndarray]]:
+    """Greedily grow one cluster around every member of the scarcest TIM.
+
+    TIM columns are filled one at a time. Each cluster picks the best of a
+    random sample of still-free users, scored against the members already
+    placed; when several clusters pick the same user the highest score wins
+    and the others retry on the next pass.
+    """
+
+    fill_order = sorted(range(len(groups)), key=lambda column: len(groups[column]))
+    cluster_count = len(groups[fill_order[0]])
+    slots = np.full((cluster_count, len(groups)), -1, dtype=np.intp)
+    slots[:, fill_order[0]] = rng.permutation(groups[fill_order[0]])
+    bench = [np.empty(0, dtype=np.intp) for _ in groups]
+    placed = [fill_order[0]]
+
+    for column in fill_order[1:]:
+        free = rng.permutation(groups[column])
+        pending = np.arange(cluster_count)
+        while len(pending):
+            chunk = pending[:chunk_size]
+            width = min(sample_size, len(free))
+            if len(free) > sample_size:
+                picks = rng.integers(0, len(free), size=(len(chunk), width))
+            else:
+                picks = np.broadcast_to(np.arange(width), (len(chunk), width))
+            candidates = free[picks]
+
+            totals = np.zeros(candidates.shape, dtype=np.float64)
+            for other in placed:
+                left = np.repeat(slots[chunk, other], width)
+                totals += _pool_scores(features, likes, left, candidates.ravel()).reshape(totals.shape)
+
+            rows = np.arange(len(chunk))
+            best = totals.argmax(axis=1)
+            chosen = candidates[rows, best]
+            order = np.lexsort((-totals[rows, best], chosen))
+            first_claim = np.ones(len(order), dtype=bool)
+            first_claim[1:] = chosen[order][1:] != chosen[order][:-1]
+            winners = np.zeros(len(chunk), dtype=bool)
+            winners[order[first_claim]] = True
+
+            slots[chunk[winners], column] = chosen[winners]
+            free = np.setdiff1d(free, chosen[winners], assume_unique=True)
+            pending = np.concatenate([chunk[~winners], pending[chunk_size:]])
+
+        bench[column] = free
+        placed.append(column)
+
+    return slots, bench
+
+
+def _accept_moves(delta: np.ndarray, *key_groups: Sequence[np.ndarray]) -> list[int]:
+    """Pick improving moves, best first, never touching the same key twice.
+
+    Arrays inside one group share a key space (e.g. both clusters of a swap).
+    """
+
+    improving = np.flatnonzero(delta > 1e-12)
+    accepted: list[int] = []
+    seen: list[set[int]] = [set() for _ in key_groups]
+    for move in improving[np.argsort(-delta[improving], kind="stable")]:
+        keys = [{int(array[move]) for array in group} for group in key_groups]
+        if any(group_keys & seen_keys for group_keys, seen_keys in zip(keys, seen)):
+            continue
+        for group_keys, seen_keys in zip(keys, seen):
+            seen_keys |= group_keys
+        accepted.append(int(move))
+    return accepted
+
+
+def _improve_clusters(
+    features: ScoringFeatures,
+    likes: _LikeEdges,
+    slots: np.ndarray,
+    bench: list[np.ndarray],
+    rng: np.random.Generator,
+    *,
+    deadline: float,
+    max_rounds: int | None,
+    batch_size: int,
+    patience: int,
+) -> int:
+    """Local search: swap same-TIM members between clusters or with the bench."""
+
+    cluster_count, width = slots.shape
+    others = [np.array([other for other in range(width) if other != column]) for column in range(width)]
+    rounds = 0
+    idle = 0
+    while idle < patience and time.perf_counter() < deadline:
+        if max_rounds is not None and rounds >= max_rounds:
+            break
+        column = rounds % width
+        rounds += 1
+        improved = False
+
+        if cluster_count > 1:
+            first = rng.integers(0, cluster_count, batch_size)
+            second = rng.integers(0, cluster_count, batch_size)
+            first_members = slots[first, column]
+            second_members = slots[second, column]
+            delta = (
+                _fit(features, likes, slots, others[column], second_members, first)
+                + _fit(features, likes, slots, others[column], first_members, second)
+                - _fit(features, likes, slots, others[column], first_members, first)
+                - _fit(features, likes, slots, others[column], second_members, second)
             )
-            cluster.members.append(membership)
-            members_payload.append({"user_id": member_user.id, "socionics_type": tim.value})
+            delta[first == second] = 0.0
+            for move in _accept_moves(delta, (first, second)):
+                slots[first[move], column] = second_members[move]
+                slots[second[move], column] = first_members[move]
+                improved = True
 
-        if len(cluster.members) >= len(required):
-            cluster.status = "full"
-        else:
-            cluster.status = "locked"
+        reserve = bench[column]
+        if len(reserve):
+            picks = rng.integers(0, len(reserve), batch_size)
+            targets = rng.integers(0, cluster_count, batch_size)
+            incoming = reserve[picks]
+            outgoing = slots[targets, column]
+            delta = _fit(features, likes, slots, others[column], incoming, targets) - _fit(
+                features, likes, slots, others[column], outgoing, targets
+            )
+            for move in _accept_moves(delta, (targets,), (picks,)):
+                slots[targets[move], column] = incoming[move]
+                reserve[picks[move]] = outgoing[move]
+                improved = True
 
-        db.flush()
-        return {"ok": True, "cluster_id": cluster.id, "members": members_payload}
+        idle = 0 if improved else idle + 1
+    return rounds
+
+
+def _persist_batch(db: Session, quadra: Quadra, columns: Sequence[SocType], clusters: list[list[int]]) -> list[int]:
+    if not clusters:
+        return []
+    cluster_ids = list(
+        db.execute(
+            insert(Cluster).returning(Cluster.id, sort_by_parameter_order=True),
+            [
+                {
+                    "quadra": quadra.value,
+                    "status": "full",
+                    "occupied_tims": sum(QUADRA_SLOT_BITS[tim] for tim in columns),
+                    "member_count": len(columns),
+                }
+                for _ in clusters
+            ],
+        ).scalars()
+    )
+    db.execute(
+        insert(ClusterMember),
+        [
+            {"cluster_id": cluster_id, "user_id": user_id, "socionics_type": tim.value}
+            for cluster_id, members in zip(cluster_ids, clusters)
+            for tim, user_id in zip(columns, members)
+        ],
+    )
+    return cluster_ids
+
+
+def match_quadra_pool(
+    quadra: Quadra,
+    *,
+    session: Session | None = None,
+    time_budget: float | None = None,
+    seed: int | None = None,
+    max_rounds: int | None = None,
+    sample_size: int = 128,
+    batch_size: int = 2048,
+    patience: int = 32,
+    persist: bool = True,
+) -> BatchMatchResult:
+    """Partition a quadra's unclustered users into as many full clusters as possible.
+
+    Clusters are seeded greedily and then refined by local-search swaps that
+    maximize the total intra-cluster ``pair_score``. The search stops after
+    ``time_budget`` seconds, ``max_rounds`` rounds or ``patience`` rounds
+    without improvement; with a fixed ``seed`` the result is reproducible
+    whenever the budget is not what ends the search. The clusters are written
+    with one bulk insert per table unless ``persist`` is false.
+    """
+
+    settings = get_settings()
+    budget = settings.batch_match_time_budget_seconds if time_budget is None else time_budget
+    rng = np.random.default_rng(settings.batch_match_seed if seed is None else seed)
+    started = time.perf_counter()
+
+    db, should_close = _ensure_session(session)
+    try:
+        columns = sorted(QUADRA_MEMBERS[quadra], key=lambda tim: tim.value)
+        pool = _unclustered_pool(db, quadra, columns)
+        _CANDIDATE_POOL.labels("batch").observe(len(pool))
+        tim_codes = np.array([columns.index(SocType(row.socionics_type)) for row in pool], dtype=np.intp)
+        groups = [np.flatnonzero(tim_codes == column) for column in range(len(columns))]
+        if not pool or min(len(group) for group in groups) == 0:
+            return BatchMatchResult(
+                quadra=quadra,
+                clusters=[],
+                cluster_ids=[],
+                total_score=0.0,
+                rounds=0,
+                elapsed=time.perf_counter() - started,
+                unmatched=len(pool),
+            )
+
+        features = pack_scoring_features(pool)
+        likes = _pool_like_edges(pool, preference_index_for(db))
+        slots, bench = _seed_clusters(features, likes, groups, rng, sample_size)
+        rounds = _improve_clusters(
+            features,
+            likes,
+            slots,
+            bench,
+            rng,
+            deadline=started + budget,
+            max_rounds=max_rounds,
+            batch_size=batch_size,
+            patience=patience,
+        )
+
+        pairs = [(a, b) for a in range(len(columns)) for b in range(a + 1, len(columns))]
+        total_score = float(
+            sum(_pool_scores(features, likes, slots[:, a], slots[:, b]).sum() for a, b in pairs)
+        )
+        clusters = [[int(features.ids[member]) for member in row] for row in slots]
+        cluster_ids = _persist_batch(db, quadra, columns, clusters) if persist else []
+        if persist and should_close:
+            db.commit()
+
+        return BatchMatchResult(
+            quadra=quadra,
+            clusters=clusters,
+            cluster_ids=cluster_ids,
+            total_score=total_score,
+            rounds=rounds,
+            elapsed=time.perf_counter() - started,
+            unmatched=len(pool) - slots.size,
+        )
     finally:
         _close_session(db, should_close)
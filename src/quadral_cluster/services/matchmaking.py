@@ -1,10 +1,19 @@
 from __future__ import annotations
 
+import threading
 from dataclasses import dataclass
-from typing import Iterable, Optional, Tuple
+from typing import Iterable, Optional, Sequence, Tuple
 
-from quadral_cluster.domain.socionics import QUADRA_MEMBERS, Quadra, SocType
+import numpy as np
+from sqlalchemy import case, event, func, select
+from sqlalchemy.orm import Session
+
+from quadral_cluster.config import get_settings
+from quadral_cluster.database import engine_state
+from quadral_cluster.domain.socionics import QUADRA_BITS, QUADRA_MEMBERS, Quadra, SocType
 from quadral_cluster.models.domain import Cluster, ClusterMembership, Profile
+from quadral_cluster.services.recommendations import recommendation_cache_for
+from quadral_cluster.services.scoring_cache import ScoringInputWatch
 
 SOCIONICS_TO_QUADRA = {
     soc_type.value: quadra.value.capitalize()
@@ -40,16 +49,29 @@ def _quadra_for_profile(profile: Optional[Profile]) -> Optional[str]:
     return SOCIONICS_TO_QUADRA.get(profile.socionics_type.upper())
 
 
+def _quadra_bit(quadra: Optional[str]) -> int:
+    return QUADRA_BITS[Quadra(quadra.lower())] if quadra is not None else 0
+
+
 def compute_breakdown(
     candidate: Profile,
     cluster: Cluster,
-    member_profiles: Iterable[Profile],
+    member_profiles: Optional[Iterable[Profile]] = None,
 ) -> CompatibilityBreakdown:
-    """Calculate a compatibility breakdown for the provided candidate and cluster."""
-
-    socionics = _compute_socionics(candidate, cluster, member_profiles)
+    """Calculate a compatibility breakdown for the provided candidate and cluster.
+
+    Without ``member_profiles`` the member-derived parts are scored from the
+    aggregates stored on ``cluster``, so no profiles need to be loaded.
+    """
+
+    if member_profiles is None:
+        socionics = _compute_socionics_from_aggregates(candidate, cluster)
+        age = _compute_age_from_aggregates(candidate, cluster)
+    else:
+        member_profiles = list(member_profiles)
+        socionics = _compute_socionics(candidate, cluster, member_profiles)
+        age = _compute_age(candidate, member_profiles)
     psycho = _compute_psycho(candidate, cluster)
-    age = _compute_age(candidate, member_profiles)
     geo = _compute_geo(candidate, cluster)
     activity = max(0.0, min(1.0, cluster.activity_score))
     reputation = max(0.0, min(1.0, candidate.reputation_score))
@@ -82,6 +104,19 @@ def _compute_socionics(candidate: Profile, cluster: Cluster, member_profiles: It
     return 1.0 if candidate_quadra in member_quadras else 0.0
 
 
+def _compute_socionics_from_aggregates(candidate: Profile, cluster: Cluster) -> float:
+    candidate_quadra = _quadra_for_profile(candidate)
+    if candidate_quadra is None:
+        return 0.0
+
+    if cluster.target_quadra:
+        return 1.0 if candidate_quadra.lower() == cluster.target_quadra.lower() else 0.0
+
+    if not cluster.member_quadras:
+        return 0.5
+    return 1.0 if cluster.member_quadras & _quadra_bit(candidate_quadra) else 0.0
+
+
 def _compute_psycho(candidate: Profile, cluster: Cluster) -> float:
     if candidate.psychotype is None:
         return 0.0
@@ -90,19 +125,30 @@ def _compute_psycho(candidate: Profile, cluster: Cluster) -> float:
     return 1.0 if candidate.psychotype.lower() == cluster.target_psychotype.lower() else 0.0
 
 
+def _age_fit(candidate_age: int, avg_age: float) -> float:
+    diff = abs(candidate_age - avg_age)
+    if diff <= 5:
+        return 1.0
+    if diff <= 10:
+        return 0.5
+    return 0.0
+
+
 def _compute_age(candidate: Profile, member_profiles: Iterable[Profile]) -> float:
     if candidate.age is None:
         return 0.0
     ages = [profile.age for profile in member_profiles if profile.age is not None]
     if not ages:
         return 0.5
-    avg_age = sum(ages) / len(ages)
-    diff = abs(candidate.age - avg_age)
-    if diff <= 5:
-        return 1.0
-    if diff <= 10:
+    return _age_fit(candidate.age, sum(ages) / len(ages))
+
+
+def _compute_age_from_aggregates(candidate: Profile, cluster: Cluster) -> float:
+    if candidate.age is None:
+        return 0.0
+    if not cluster.age_count:
         return 0.5
-    return 0.0
+    return _age_fit(candidate.age, cluster.age_sum / cluster.age_count)
 
 
 def _compute_geo(candidate: Profile, cluster: Cluster) -> float:
@@ -114,22 +160,434 @@ def _compute_geo(candidate: Profile, cluster: Cluster) -> float:
 
 
 def evaluate_candidate(
-    candidate: Profile, cluster: Cluster, memberships: Iterable[ClusterMembership]
+    candidate: Profile, cluster: Cluster, memberships: Optional[Iterable[ClusterMembership]] = None
 ) -> Tuple[float, CompatibilityBreakdown]:
-    """Return both the compatibility score and detailed breakdown."""
+    """Return both the compatibility score and detailed breakdown.
+
+    When ``memberships`` is omitted the cluster's stored aggregates are used.
+    """
 
-    member_profiles = [membership.user.profile for membership in memberships if membership.user.profile]
+    member_profiles = None
+    if memberships is not None:
+        member_profiles = [membership.user.profile for membership in memberships if membership.user.profile]
     breakdown = compute_breakdown(candidate, cluster, member_profiles)
     return round(breakdown.total, 2), breakdown
 
 
 def score_candidate_for_cluster(
-    candidate: Profile, cluster: Cluster, memberships: Iterable[ClusterMembership]
+    candidate: Profile, cluster: Cluster, memberships: Optional[Iterable[ClusterMembership]] = None
 ) -> float:
     score, _ = evaluate_candidate(candidate, cluster, memberships)
     return score
 
 
+def refresh_cluster_aggregates(session: Session, cluster_ids: Iterable[int]) -> None:
+    """Recompute member count, age sum/count and member quadras for ``cluster_ids``.
+
+    Call after memberships of these clusters change, or after a member's
+    profile age or sociotype changes.
+    """
+
+    ids = sorted(set(cluster_ids))
+    if not ids:
+        return
+    session.flush()
+
+    soc_type = func.upper(Profile.socionics_type)
+    quadra_flags = [
+        func.max(case((soc_type.in_([member.value for member in members]), QUADRA_BITS[quadra]), else_=0))
+        for quadra, members in QUADRA_MEMBERS.items()
+    ]
+    rows = session.execute(
+        select(
+            ClusterMembership.cluster_id,
+            func.count(ClusterMembership.id),
+            func.coalesce(func.sum(Profile.age), 0),
+            func.count(Profile.age),
+            *quadra_flags,
+        )
+        .outerjoin(Profile, Profile.user_id == ClusterMembership.user_id)
+        .where(ClusterMembership.cluster_id.in_(ids))
+        .group_by(ClusterMembership.cluster_id)
+    )
+    aggregates = {
+        cluster_id: (member_count, age_sum, age_count, sum(flags))
+        for cluster_id, member_count, age_sum, age_count, *flags in rows
+    }
+
+    for cluster in session.scalars(select(Cluster).where(Cluster.id.in_(ids))):
+        (
+            cluster.member_count,
+            cluster.age_sum,
+            cluster.age_count,
+            cluster.member_quadras,
+        ) = aggregates.get(cluster.id, (0, 0, 0, 0))
+    session.flush()
+    mark_clusters_changed(session, ids)
+
+
+def refresh_user_cluster_aggregates(session: Session, user_id: int) -> None:
+    """Refresh the aggregates of every cluster ``user_id`` belongs to."""
+
+    cluster_ids = session.scalars(
+        select(ClusterMembership.cluster_id).where(ClusterMembership.user_id == user_id)
+    ).all()
+    refresh_cluster_aggregates(session, cluster_ids)
+
+
+# Vocabulary codes are shifted by one so that code 0 means "no value" and a
+# candidate's lookup table can be indexed directly with the stored codes.
+_NO_CODE = 0
+
+_QUADRA_ORDER = tuple(Quadra)
+
+_SNAPSHOT_COLUMNS = (
+    Cluster.id,
+    Cluster.target_quadra,
+    Cluster.target_psychotype,
+    Cluster.city,
+    Cluster.timezone,
+    Cluster.activity_score,
+    Cluster.member_quadras,
+    Cluster.age_sum,
+    Cluster.age_count,
+)
+
+
+@dataclass(frozen=True, slots=True)
+class RankedCluster:
+    cluster_id: int
+    score: float
+    breakdown: CompatibilityBreakdown
+
+
+@dataclass(frozen=True, slots=True)
+class _ClusterColumns:
+    """Scoring inputs of every cluster, one row per cluster, sorted by id.
+
+    ``socionics[:, q]`` is the socionics component for a candidate from the
+    ``q``-th quadra, which depends on the cluster alone and is precomputed.
+    """
+
+    ids: np.ndarray
+    socionics: np.ndarray
+    target_psychotype: np.ndarray
+    city: np.ndarray
+    timezone: np.ndarray
+    activity: np.ndarray
+    avg_age: np.ndarray
+
+    def take(self, positions: np.ndarray) -> "_ClusterColumns":
+        return _ClusterColumns(*(getattr(self, name)[positions] for name in self.__slots__))
+
+    @staticmethod
+    def concat(parts: Sequence["_ClusterColumns"]) -> "_ClusterColumns":
+        return _ClusterColumns(
+            *(np.concatenate([getattr(part, name) for part in parts]) for name in _ClusterColumns.__slots__)
+        )
+
+
+class _Vocabulary:
+    """Stable integer codes for the string columns compared by equality."""
+
+    def __init__(self) -> None:
+        self._codes: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._codes) + 1
+
+    def code(self, value: Optional[str]) -> int:
+        if value is None:
+            return _NO_CODE
+        return self._codes.setdefault(value, len(self._codes) + 1)
+
+    def table(self, value: Optional[str], hit: float, missing: float = 0.0) -> np.ndarray:
+        """Lookup table scoring ``hit`` for ``value``, ``missing`` for no value and 0 otherwise."""
+
+        table = np.zeros(len(self))
+        table[_NO_CODE] = missing
+        if value is not None and value in self._codes:
+            table[self._codes[value]] = hit
+        return table
+
+
+def _socionics_by_quadra(target_quadra: Optional[str], member_quadras: int) -> list[float]:
+    if target_quadra:
+        target_bit = _quadra_bit_or_zero(target_quadra)
+        return [1.0 if target_bit == QUADRA_BITS[quadra] else 0.0 for quadra in _QUADRA_ORDER]
+    if not member_quadras:
+        return [0.5] * len(_QUADRA_ORDER)
+    return [1.0 if member_quadras & QUADRA_BITS[quadra] else 0.0 for quadra in _QUADRA_ORDER]
+
+
+class RecommendationEngine:
+    """Columnar snapshot of cluster scoring inputs for full-catalog recommendations.
+
+    ``recommend`` applies the ``CompatibilityBreakdown`` formula to every
+    cluster at once and returns the top ``limit``, ties broken by cluster id.
+    The snapshot is loaded in bulk on first use; clusters reported through
+    ``mark_stale`` are re-read and patched in before the next ranking.
+    """
+
+    def __init__(self) -> None:
+        self._columns: Optional[_ClusterColumns] = None
+        self._stale: set[int] = set()
+        self._lock = threading.Lock()
+        self._psychotypes = _Vocabulary()
+        self._cities = _Vocabulary()
+        self._timezones = _Vocabulary()
+
+    @property
+    def loaded(self) -> bool:
+        return self._columns is not None
+
+    def __len__(self) -> int:
+        return 0 if self._columns is None else len(self._columns.ids)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._columns = None
+            self._stale.clear()
+
+    def mark_stale(self, cluster_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._stale.update(cluster_ids)
+
+    def _pack(self, rows: Sequence[tuple]) -> _ClusterColumns:
+        count = len(rows)
+        ids, quadras, psychotypes, cities, timezones, activity, member_quadras, age_sums, age_counts = (
+            zip(*rows) if rows else ((),) * len(_SNAPSHOT_COLUMNS)
+        )
+        age_counts = np.fromiter(age_counts, dtype=np.float64, count=count)
+        age_sums = np.fromiter(age_sums, dtype=np.float64, count=count)
+        return _ClusterColumns(
+            ids=np.fromiter(ids, dtype=np.int64, count=count),
+            socionics=np.array(
+                [_socionics_by_quadra(quadra, mask) for quadra, mask in zip(quadras, member_quadras)],
+                dtype=np.float64,
+            ).reshape(count, len(_QUADRA_ORDER)),
+            target_psychotype=np.fromiter(
+                (self._psychotypes.code(_lower(value)) for value in psychotypes), dtype=np.int32, count=count
+            ),
+            city=np.fromiter(
+                (self._cities.code(_lower(value) or None) for value in cities), dtype=np.int32, count=count
+            ),
+            timezone=np.fromiter(
+                (self._timezones.code(value or None) for value in timezones), dtype=np.int32, count=count
+            ),
+            activity=np.clip(np.array(activity, dtype=np.float64).reshape(count), 0.0, 1.0),
+            avg_age=np.divide(age_sums, age_counts, out=np.full(count, np.nan), where=age_counts > 0),
+        )
+
+    def load(self, session: Session) -> None:
+        with self._lock:
+            self._stale.clear()
+        rows = session.execute(select(*_SNAPSHOT_COLUMNS).order_by(Cluster.id)).all()
+        with self._lock:
+            self._columns = self._pack(rows)
+
+    def _patch(self, session: Session, columns: _ClusterColumns) -> _ClusterColumns:
+        with self._lock:
+            stale, self._stale = self._stale, set()
+        rows = session.execute(
+            select(*_SNAPSHOT_COLUMNS).where(Cluster.id.in_(sorted(stale))).order_by(Cluster.id)
+        ).all()
+        with self._lock:
+            columns = self._columns if self._columns is not None else columns
+            keep = np.isin(columns.ids, np.fromiter(stale, dtype=np.int64, count=len(stale)), invert=True)
+            patched = _ClusterColumns.concat([columns.take(np.flatnonzero(keep)), self._pack(rows)])
+            self._columns = patched.take(np.argsort(patched.ids, kind="stable"))
+            return self._columns
+
+    def snapshot(self, session: Session) -> _ClusterColumns:
+        columns = self._columns
+        if columns is None:
+            self.load(session)
+            columns = self._columns
+        if self._stale:
+            return self._patch(session, columns)
+        return columns
+
+    def recommend(
+        self,
+        session: Session,
+        candidate: Profile,
+        limit: int,
+        *,
+        exclude: Iterable[int] = (),
+    ) -> list[RankedCluster]:
+        columns = self.snapshot(session)
+        if limit <= 0 or len(columns.ids) == 0:
+            return []
+
+        parts = self._breakdown_columns(candidate, columns)
+        totals = (
+            50 * parts["socionics"]
+            + 20 * parts["psycho"]
+            + 10 * parts["age"]
+            + 8 * parts["geo"]
+            + 6 * parts["activity"]
+            + 6 * parts["reputation"]
+        )
+        excluded = np.fromiter(exclude, dtype=np.int64)
+        if len(excluded):
+            positions = np.searchsorted(columns.ids, excluded)
+            found = positions < len(columns.ids)
+            found[found] = columns.ids[positions[found]] == excluded[found]
+            totals[positions[found]] = -np.inf
+
+        eligible = len(totals) - int(np.count_nonzero(np.isneginf(totals)))
+        limit = min(limit, eligible)
+        if limit == 0:
+            return []
+        if limit < len(totals):
+            kth = len(totals) - limit
+            threshold = totals[np.argpartition(totals, kth)[kth]]
+            chosen = np.flatnonzero(totals >= threshold)
+        else:
+            chosen = np.flatnonzero(~np.isneginf(totals))
+        chosen = chosen[np.lexsort((columns.ids[chosen], -totals[chosen]))][:limit]
+
+        ranked = []
+        for position in chosen:
+            breakdown = CompatibilityBreakdown(
+                **{name: float(values if np.ndim(values) == 0 else values[position]) for name, values in parts.items()}
+            )
+            ranked.append(
+                RankedCluster(
+                    cluster_id=int(columns.ids[position]),
+                    score=round(breakdown.total, 2),
+                    breakdown=breakdown,
+                )
+            )
+        return ranked
+
+    def _breakdown_columns(self, candidate: Profile, columns: _ClusterColumns) -> dict[str, np.ndarray | float]:
+        candidate_quadra = _quadra_for_profile(candidate)
+        if candidate_quadra is None:
+            socionics: np.ndarray | float = 0.0
+        else:
+            socionics = columns.socionics[:, _QUADRA_ORDER.index(Quadra(candidate_quadra.lower()))]
+
+        if candidate.psychotype is None:
+            psycho: np.ndarray | float = 0.0
+        else:
+            psycho = self._psychotypes.table(candidate.psychotype.lower(), hit=1.0, missing=0.5)[
+                columns.target_psychotype
+            ]
+
+        if candidate.age is None:
+            age: np.ndarray | float = 0.0
+        else:
+            diff = np.abs(candidate.age - columns.avg_age)
+            age = 0.5 * ((diff <= 5).astype(np.float64) + (diff <= 10) + np.isnan(diff))
+
+        city_scores = self._cities.table(_lower(candidate.city) or None, hit=1.0)
+        zone_scores = self._timezones.table(candidate.timezone or None, hit=0.5)
+        geo = np.maximum(city_scores[columns.city], zone_scores[columns.timezone])
+
+        return {
+            "socionics": socionics,
+            "psycho": psycho,
+            "age": age,
+            "geo": geo,
+            "activity": columns.activity,
+            "reputation": max(0.0, min(1.0, candidate.reputation_score)),
+        }
+
+
+def _lower(value: Optional[str]) -> Optional[str]:
+    return value.lower() if value is not None else None
+
+
+def _quadra_bit_or_zero(value: Optional[str]) -> int:
+    try:
+        return _quadra_bit(value) if value else 0
+    except ValueError:
+        return 0
+
+
+class _ClusterWatch(ScoringInputWatch):
+    _COLUMNS = (
+        ("clusters", Cluster.id, Cluster.updated_at),
+        ("cluster_memberships", ClusterMembership.cluster_id, ClusterMembership.updated_at),
+    )
+
+
+def _recommendation_engine(state: dict) -> RecommendationEngine:
+    engine = state.get("recommendation_engine")
+    if engine is None:
+        engine = state.setdefault("recommendation_engine", RecommendationEngine())
+    return engine
+
+
+def _cluster_watch(state: dict) -> _ClusterWatch:
+    watch = state.get("recommendation_watch")
+    if watch is None:
+        watch = state.setdefault("recommendation_watch", _ClusterWatch(get_settings().cache_refresh_seconds))
+    return watch
+
+
+def recommendation_refresh_due(session: Session) -> bool:
+    """Whether ``recommendation_engine_for`` will next look for other processes' writes."""
+
+    return _cluster_watch(engine_state(session)).refresh_due
+
+
+def recommendation_engine_for(session: Session) -> RecommendationEngine:
+    """Return the recommendation engine for the engine behind ``session``.
+
+    At most every ``cache_refresh_seconds`` it first marks stale the clusters
+    whose rows or memberships other processes have changed, and drops the
+    cached recommendation lists ranked over them.
+    """
+
+    state = engine_state(session)
+    engine = _recommendation_engine(state)
+    watch = _cluster_watch(state)
+    if watch.refresh_due:
+        changed = watch.changed_ids(session)
+        if changed:
+            engine.mark_stale(changed)
+            recommendation_cache_for(session).invalidate_all()
+    return engine
+
+
+def mark_clusters_changed(session: Session, cluster_ids: Iterable[int]) -> None:
+    """Queue ``cluster_ids`` for a snapshot refresh once ``session`` commits.
+
+    A changed cluster can move in anyone's ranking, so this also drops every
+    cached recommendation list.
+    """
+
+    session.info.setdefault("changed_cluster_ids", set()).update(cluster_ids)
+
+
+def mark_users_changed(session: Session, user_ids: Iterable[int]) -> None:
+    """Drop cached recommendations of ``user_ids`` once ``session`` commits."""
+
+    session.info.setdefault("changed_user_ids", set()).update(user_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_changes(session: Session) -> None:
+    changed_clusters = session.info.pop("changed_cluster_ids", None)
+    changed_users = session.info.pop("changed_user_ids", None)
+    if changed_clusters:
+        # No SQL after commit: mark stale without checking other processes' writes.
+        _recommendation_engine(engine_state(session)).mark_stale(changed_clusters)
+        recommendation_cache_for(session).invalidate_all()
+    elif changed_users:
+        recommendation_cache_for(session).invalidate_users(changed_users)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_changes(session: Session, previous_transaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop("changed_cluster_ids", None)
+        session.info.pop("changed_user_ids", None)
+
+
 def _extract_field(entity: object, field: str) -> Optional[object]:
     if isinstance(entity, dict):
         return entity.get(field)
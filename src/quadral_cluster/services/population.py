@@ -0,0 +1,390 @@
+"""Seeded synthetic populations for load tests and benchmarks.
+
+``generate_population`` fills a migrated database with ``users`` users and
+everything the matching and scoring paths read about them: profiles,
+weekly availability, likes, partially and fully staffed matching clusters,
+and community clusters with their member aggregates. The same spec and
+seed always produce the same rows, so benchmark runs on different
+machines or commits see identical data.
+
+The distributions are deliberately uneven, because uniform data hides the
+costs that matter: TIMs and timezones are skewed, ages cluster in the late
+twenties, availability follows evening and weekend habits in local time,
+and likes go mostly to a few popular users of the liker's own quadra.
+Rows are written with Core ``executemany`` inserts in ``batch_size``
+batches and explicit ids, so no ``RETURNING`` round trips are needed.
+"""
+
+from __future__ import annotations
+
+import itertools
+import random
+import time
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.orm import Session
+
+from quadral_cluster.database import engine_state
+from quadral_cluster.domain.socionics import QUADRA_BITS, QUADRA_MEMBERS, QUADRA_SLOT_BITS, Quadra, SocType
+from quadral_cluster.models.availability import Availability
+from quadral_cluster.models.cluster import MatchingCluster, MatchingClusterMember
+from quadral_cluster.models.domain import Cluster, ClusterMembership, Profile, User
+from quadral_cluster.models.preference import Preference
+from quadral_cluster.utils.time_overlap import HOURS_PER_WEEK
+
+# Relative TIM frequencies: extraverted sensing and logical types a little
+# more common, intuitive-ethical introverts rarer.
+TIM_WEIGHTS = {
+    SocType.ILE: 6, SocType.SEI: 6, SocType.ESE: 8, SocType.LII: 5,
+    SocType.SLE: 7, SocType.IEI: 5, SocType.EIE: 6, SocType.LSI: 8,
+    SocType.SEE: 7, SocType.ESI: 6, SocType.LIE: 8, SocType.ILI: 5,
+    SocType.IEE: 7, SocType.EII: 4, SocType.LSE: 7, SocType.SLI: 5,
+}  # fmt: skip
+TIMEZONE_WEIGHTS = {
+    "Europe/Moscow": 40,
+    "Europe/Minsk": 6,
+    "Europe/Berlin": 10,
+    "Asia/Yekaterinburg": 8,
+    "Asia/Novosibirsk": 6,
+    "Asia/Almaty": 5,
+    "Asia/Vladivostok": 3,
+    "America/New_York": 4,
+    None: 18,
+}
+CITY_WEIGHTS = {"Москва": 35, "Санкт-Петербург": 15, "Новосибирск": 6, "Казань": 5, "Berlin": 6, None: 33}
+LANGUAGE_WEIGHTS = {"ru": 70, "en": 20, "de": 6, "es": 4}
+INTERESTS = ["chess", "hiking", "music", "boardgames", "coding", "books", "travel", "cinema", "sport", "art"]
+# Like weights as the like endpoint sees them: mostly positive.
+LIKE_WEIGHTS = {1: 45, 2: 20, 0: 5, -1: 20, -2: 10}
+
+# Offsets are taken at a fixed instant so masks do not depend on the date.
+_OFFSET_INSTANT = datetime(2026, 1, 5)
+_CREATED_FROM = datetime(2025, 1, 1)
+
+
+@dataclass(frozen=True, slots=True)
+class PopulationSpec:
+    """What ``generate_population`` writes; every share is in ``[0, 1]``."""
+
+    users: int
+    seed: int = 0
+    profile_share: float = 0.95
+    availability_share: float = 0.85
+    likes_per_user: float = 8.0
+    same_quadra_like_share: float = 0.7
+    clustered_share: float = 0.3
+    full_cluster_share: float = 0.5
+    users_per_community: int = 40
+    batch_size: int = 5_000
+
+
+@dataclass(slots=True)
+class PopulationSummary:
+    users: int = 0
+    profiles: int = 0
+    availabilities: int = 0
+    preferences: int = 0
+    matching_clusters: int = 0
+    matching_members: int = 0
+    communities: int = 0
+    community_members: int = 0
+    elapsed: float = 0.0
+
+
+@dataclass(slots=True)
+class _Person:
+    id: int
+    tim: SocType
+    quadra: Quadra
+    age: int | None  # None exactly when the user has no profile
+
+
+def _weighted(rng: random.Random, weights: dict) -> Iterator:
+    values = list(weights)
+    cumulative = list(itertools.accumulate(weights.values()))
+    while True:
+        yield from rng.choices(values, cum_weights=cumulative, k=1024)
+
+
+def _batches(rows: Iterator, size: int) -> Iterator[list]:
+    while batch := list(itertools.islice(rows, size)):
+        yield batch
+
+
+def _age(rng: random.Random) -> int:
+    return min(70, max(18, round(rng.lognormvariate(3.35, 0.22))))
+
+
+def _offset_hours(timezone: str | None) -> int:
+    if timezone is None:
+        return 3
+    return round(ZoneInfo(timezone).utcoffset(_OFFSET_INSTANT) / timedelta(hours=1))
+
+
+def _habit_masks() -> list[list[int]]:
+    """Local-time hour lists for each combination of weekly habits.
+
+    Evenings start early, regular or late and last 2–5 hours on weekdays;
+    weekends are busy, free in the afternoon or free all day; some people
+    are also free over weekday lunch.
+    """
+
+    habits = []
+    for start, length, weekend, lunch in itertools.product((17, 19, 21), (2, 3, 5), range(3), (False, True)):
+        hours = [day * 24 + (start + hour) % 24 for day in range(5) for hour in range(length)]
+        if lunch:
+            hours.extend(day * 24 + 13 for day in range(5))
+        weekend_hours = [] if weekend == 0 else range(13, 18) if weekend == 1 else range(10, 23)
+        hours.extend(day * 24 + hour for day in (5, 6) for hour in weekend_hours)
+        habits.append(hours)
+    return habits
+
+
+class _MaskFactory:
+    """Packed UTC masks for a habit shifted from local time, with per-user noise."""
+
+    def __init__(self) -> None:
+        self._habits = _habit_masks()
+        self._shifted: dict[tuple[int, int], int] = {}
+
+    def __call__(self, rng: random.Random, offset: int) -> int:
+        habit = rng.randrange(len(self._habits))
+        key = (habit, offset)
+        mask = self._shifted.get(key)
+        if mask is None:
+            mask = 0
+            for hour in self._habits[habit]:
+                mask |= 1 << (HOURS_PER_WEEK - 1 - (hour - offset) % HOURS_PER_WEEK)
+            self._shifted[key] = mask
+        # Drop about one hour in eight, add about one in sixty-four.
+        dropped = self._sparse_bits(rng)
+        added = dropped & self._sparse_bits(rng)
+        return (mask & ~dropped) | added
+
+    @staticmethod
+    def _sparse_bits(rng: random.Random) -> int:
+        return rng.getrandbits(HOURS_PER_WEEK) & rng.getrandbits(HOURS_PER_WEEK) & rng.getrandbits(HOURS_PER_WEEK)
+
+
+def _write(session: Session, model: type, rows: Iterator[dict], batch_size: int) -> int:
+    # Core inserts on the table: ORM bulk inserts of SQLite rows go one by one.
+    written = 0
+    for batch in _batches(rows, batch_size):
+        session.execute(insert(model.__table__), batch)
+        written += len(batch)
+    return written
+
+
+def _next_id(session: Session, column) -> int:
+    return (session.scalar(select(func.max(column))) or 0) + 1
+
+
+def _user_rows(
+    rng: random.Random, spec: PopulationSpec, first_id: int, people: list[_Person]
+) -> Iterator[tuple[dict, dict | None, dict | None]]:
+    """``(user, profile, availability)`` rows; the last two are ``None`` when absent."""
+
+    tims = _weighted(rng, TIM_WEIGHTS)
+    zones = _weighted(rng, TIMEZONE_WEIGHTS)
+    cities = _weighted(rng, CITY_WEIGHTS)
+    masks = _MaskFactory()
+    offsets = {zone: _offset_hours(zone) for zone in TIMEZONE_WEIGHTS}
+    quadra_of = {tim: quadra for quadra, members in QUADRA_MEMBERS.items() for tim in members}
+    for index in range(spec.users):
+        user_id = first_id + index
+        tim = next(tims)
+        timezone = next(zones)
+        user = {
+            "id": user_id,
+            "username": f"synthetic_{spec.seed}_{user_id}",
+            "email": f"synthetic_{spec.seed}_{user_id}@example.com",
+            "socionics_type": tim.value,
+            "quadra": quadra_of[tim].value,
+            "timezone": timezone,
+            "created_at": _CREATED_FROM + timedelta(seconds=30 * index),
+        }
+        profile = None
+        if rng.random() < spec.profile_share:
+            user["age"] = _age(rng)
+            user["city"] = next(cities)
+            profile = {
+                "user_id": user_id,
+                "age": user["age"],
+                "city": user["city"],
+                "timezone": timezone,
+                "socionics_type": tim.value,
+                "interests": rng.sample(INTERESTS, rng.randint(1, 4)),
+                "reputation_score": round(rng.betavariate(5, 3), 3),
+                "activity_score": round(rng.betavariate(2, 3), 3),
+            }
+        else:
+            user["age"] = user["city"] = None
+        availability = None
+        if rng.random() < spec.availability_share:
+            availability = {"user_id": user_id, "weekly_mask": masks(rng, offsets[timezone])}
+        people.append(_Person(user_id, tim, quadra_of[tim], user["age"]))
+        yield user, profile, availability
+
+
+def _write_users(
+    session: Session, rng: random.Random, spec: PopulationSpec, summary: PopulationSummary
+) -> list[_Person]:
+    people: list[_Person] = []
+    first_id = _next_id(session, User.id)
+    for batch in _batches(_user_rows(rng, spec, first_id, people), spec.batch_size):
+        users, profiles, masks = zip(*batch)
+        profiles = [row for row in profiles if row is not None]
+        masks = [row for row in masks if row is not None]
+        session.execute(insert(User.__table__), list(users))
+        if profiles:
+            session.execute(insert(Profile.__table__), profiles)
+        if masks:
+            session.execute(insert(Availability.__table__), masks)
+        summary.users += len(users)
+        summary.profiles += len(profiles)
+        summary.availabilities += len(masks)
+    return people
+
+
+def _popular(rng: random.Random, pool: Sequence[int]) -> int:
+    # Zipf-like: the first positions of the (shuffled) pool get most likes.
+    return pool[int(len(pool) * rng.random() ** 3)]
+
+
+def _preference_rows(rng: random.Random, spec: PopulationSpec, people: list[_Person]) -> Iterator[dict]:
+    everyone = [person.id for person in people]
+    rng.shuffle(everyone)
+    by_quadra: dict[Quadra, list[int]] = {}
+    for person in people:
+        by_quadra.setdefault(person.quadra, []).append(person.id)
+    for pool in by_quadra.values():
+        rng.shuffle(pool)
+    weights = _weighted(rng, LIKE_WEIGHTS)
+    spread = max(0, round(2 * spec.likes_per_user))
+    for person in people:
+        targets = set()
+        for _ in range(rng.randint(0, spread)):
+            pool = by_quadra[person.quadra] if rng.random() < spec.same_quadra_like_share else everyone
+            target = _popular(rng, pool)
+            if target != person.id:
+                targets.add(target)
+        for target in sorted(targets):
+            yield {"from_user_id": person.id, "to_user_id": target, "weight": next(weights)}
+
+
+def _matching_clusters(
+    rng: random.Random, spec: PopulationSpec, people: list[_Person], first_id: int
+) -> tuple[list[dict], list[dict]]:
+    """Group a share of each quadra into clusters with at most one member per TIM."""
+
+    queues: dict[SocType, list[int]] = {tim: [] for tim in SocType}
+    for person in people:
+        if rng.random() < spec.clustered_share:
+            queues[person.tim].append(person.id)
+
+    clusters: list[dict] = []
+    members: list[dict] = []
+    for quadra, tims in QUADRA_MEMBERS.items():
+        quadra_queues = {tim: queues[tim] for tim in sorted(tims)}
+        while True:
+            available = [tim for tim, queue in quadra_queues.items() if queue]
+            if not available:
+                break
+            if len(available) == len(tims) and rng.random() < spec.full_cluster_share:
+                chosen = available
+            else:
+                chosen = rng.sample(available, rng.randint(1, min(3, len(available))))
+            cluster_id = first_id + len(clusters)
+            clusters.append(
+                {
+                    "id": cluster_id,
+                    "quadra": quadra.value,
+                    "status": "full" if len(chosen) == len(tims) else rng.choice(("open", "locked")),
+                    "occupied_tims": sum(QUADRA_SLOT_BITS[tim] for tim in chosen),
+                    "member_count": len(chosen),
+                }
+            )
+            members.extend(
+                {"cluster_id": cluster_id, "user_id": queues[tim].pop(), "socionics_type": tim.value} for tim in chosen
+            )
+    return clusters, members
+
+
+def _communities(
+    rng: random.Random, spec: PopulationSpec, people: list[_Person], first_id: int
+) -> tuple[list[dict], list[dict]]:
+    """Community clusters with 3–12 members each and aggregates to match."""
+
+    count = spec.users // spec.users_per_community if spec.users_per_community else 0
+    languages = _weighted(rng, LANGUAGE_WEIGHTS)
+    cities = _weighted(rng, CITY_WEIGHTS)
+    zones = _weighted(rng, TIMEZONE_WEIGHTS)
+    quadras = list(Quadra)
+    clusters: list[dict] = []
+    memberships: list[dict] = []
+    for index in range(count):
+        cluster_id = first_id + index
+        joined = rng.sample(people, min(len(people), rng.randint(3, 12)))
+        ages = [person.age for person in joined if person.age is not None]
+        clusters.append(
+            {
+                "id": cluster_id,
+                "name": f"synthetic_{spec.seed}_community_{cluster_id}",
+                "language": next(languages),
+                "city": next(cities),
+                "timezone": next(zones),
+                "target_quadra": rng.choice(quadras).value if rng.random() < 0.6 else None,
+                "activity_score": round(rng.betavariate(2, 2), 3),
+                "reputation_score": round(rng.betavariate(4, 2), 3),
+                "member_count": len(joined),
+                "age_sum": sum(ages),
+                "age_count": len(ages),
+                "member_quadras": sum({QUADRA_BITS[person.quadra] for person in joined if person.age is not None}),
+                "created_at": _CREATED_FROM + timedelta(minutes=17 * index),
+            }
+        )
+        memberships.extend(
+            {"cluster_id": cluster_id, "user_id": person.id, "role": "founder" if position == 0 else "member"}
+            for position, person in enumerate(joined)
+        )
+    return clusters, memberships
+
+
+def generate_population(session: Session, spec: PopulationSpec) -> PopulationSummary:
+    """Write the population described by ``spec`` and commit it.
+
+    Rows are appended after the highest existing ids, so the database may
+    already hold data; usernames and community names carry the seed. The
+    engine's in-process indexes and caches are dropped afterwards, since
+    the inserts bypass them.
+    """
+
+    started = time.perf_counter()
+    rng = random.Random(spec.seed)
+    summary = PopulationSummary()
+
+    people = _write_users(session, rng, spec, summary)
+    summary.preferences = _write(session, Preference, _preference_rows(rng, spec, people), spec.batch_size)
+
+    clusters, members = _matching_clusters(rng, spec, people, _next_id(session, MatchingCluster.id))
+    summary.matching_clusters = _write(session, MatchingCluster, iter(clusters), spec.batch_size)
+    summary.matching_members = _write(session, MatchingClusterMember, iter(members), spec.batch_size)
+
+    communities, memberships = _communities(rng, spec, people, _next_id(session, Cluster.id))
+    summary.communities = _write(session, Cluster, iter(communities), spec.batch_size)
+    summary.community_members = _write(session, ClusterMembership, iter(memberships), spec.batch_size)
+
+    session.commit()
+    session.execute(text("ANALYZE"))
+    session.commit()
+
+    engine_state(session).clear()
+    summary.elapsed = time.perf_counter() - started
+    return summary
+
+
+__all__ = ["PopulationSpec", "PopulationSummary", "generate_population"]
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Iterable, Mapping
+from datetime import datetime
+from types import MappingProxyType
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from quadral_cluster.config import get_settings
+from quadral_cluster.database import dialect_insert, engine_state
+from quadral_cluster.models.preference import Preference
+from quadral_cluster.services.scoring_cache import (
+    REFRESH_OVERLAP,
+    mark_scoring_inputs_changed,
+    pair_score_cache_for,
+)
+
+MIN_WEIGHT = -2
+MAX_WEIGHT = 2
+
+_EMPTY: Mapping[int, int] = MappingProxyType({})
+
+
+def clamp_weight(weight: int) -> int:
+    return max(min(weight, MAX_WEIGHT), MIN_WEIGHT)
+
+
+class PreferenceIndex:
+    """Sparse like/dislike graph keyed by ``(from_user_id, to_user_id)``.
+
+    Edges are kept as dict-of-dicts in both directions so the scorer can fetch
+    either everything a user rated or everything a user was rated with in one
+    lookup. The index is loaded in bulk on first use and then updated in place
+    with the edges written through ``queue_preference_edges`` once their
+    transaction commits. Updates replace a user's inner dict instead of
+    mutating it, so readers can iterate one without the lock.
+
+    Other processes (API workers, the matchmaking worker, bulk writers) write
+    likes too. With ``refresh_seconds`` set, ``refresh`` reads the rows
+    stamped since the previous load or refresh began (less
+    ``REFRESH_OVERLAP``), at most that often.
+    Deleted rows are not tracked; they only disappear with their users.
+    """
+
+    def __init__(self, refresh_seconds: float | None = None) -> None:
+        self._outgoing: dict[int, dict[int, int]] = {}
+        self._incoming: dict[int, dict[int, int]] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._writes_during_sync: list[tuple[int, int, int]] | None = None
+        self._refresh_seconds = refresh_seconds
+        self._since: datetime | None = None
+        self._synced_at = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def refresh_due(self) -> bool:
+        return self._refresh_seconds is not None and time.monotonic() - self._synced_at >= self._refresh_seconds
+
+    def load(self, session: Session) -> None:
+        with self._lock:
+            self._writes_during_sync = []
+            self._synced_at = time.monotonic()
+        started = datetime.utcnow()
+        rows = session.execute(
+            select(Preference.from_user_id, Preference.to_user_id, Preference.weight)
+        )
+        outgoing: dict[int, dict[int, int]] = {}
+        incoming: dict[int, dict[int, int]] = {}
+        for from_user_id, to_user_id, weight in rows:
+            value = clamp_weight(weight)
+            outgoing.setdefault(from_user_id, {})[to_user_id] = value
+            incoming.setdefault(to_user_id, {})[from_user_id] = value
+
+        with self._lock:
+            # Writes that raced with the bulk query win over what it returned.
+            for from_user_id, to_user_id, value in self._writes_during_sync or ():
+                outgoing.setdefault(from_user_id, {})[to_user_id] = value
+                incoming.setdefault(to_user_id, {})[from_user_id] = value
+            self._writes_during_sync = None
+            self._outgoing = outgoing
+            self._incoming = incoming
+            self._since = started
+            self._loaded = True
+
+    def refresh(self, session: Session) -> set[int]:
+        """Apply rows written since the last load or refresh; returns the users whose edges changed."""
+
+        with self._lock:
+            if not self._loaded or self._writes_during_sync is not None:
+                return set()  # not loaded yet, or another thread is syncing
+            self._writes_during_sync = []
+            self._synced_at = time.monotonic()
+            since = self._since
+        started = datetime.utcnow()
+        # Rows written before ``since`` were in the previous read; only the overlap is read twice.
+        rows = session.connection().execute(
+            select(Preference.from_user_id, Preference.to_user_id, Preference.weight).where(
+                Preference.updated_at >= since - REFRESH_OVERLAP
+            )
+        ).all()
+
+        changed: set[int] = set()
+        with self._lock:
+            written = {(from_user_id, to_user_id) for from_user_id, to_user_id, _ in self._writes_during_sync or ()}
+            self._writes_during_sync = None
+            if not self._loaded:
+                return set()
+            for from_user_id, to_user_id, weight in rows:
+                if (from_user_id, to_user_id) in written:
+                    continue
+                value = clamp_weight(weight)
+                if self._outgoing.get(from_user_id, _EMPTY).get(to_user_id) != value:
+                    self._put(from_user_id, to_user_id, value)
+                    changed.update((from_user_id, to_user_id))
+            self._since = started
+        return changed
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._writes_during_sync = None
+            self._outgoing = {}
+            self._incoming = {}
+            self._since = None
+            self._loaded = False
+
+    def set(self, from_user_id: int, to_user_id: int, weight: int) -> None:
+        value = clamp_weight(weight)
+        with self._lock:
+            if self._writes_during_sync is not None:
+                self._writes_during_sync.append((from_user_id, to_user_id, value))
+            if not self._loaded:
+                # Nothing cached yet; the next bulk load will pick the row up.
+                return
+            self._put(from_user_id, to_user_id, value)
+
+    def _put(self, from_user_id: int, to_user_id: int, value: int) -> None:
+        # Copy on write, under ``_lock``: readers iterate the maps ``outgoing``
+        # and ``incoming`` returned without holding it.
+        self._outgoing[from_user_id] = {**self._outgoing.get(from_user_id, _EMPTY), to_user_id: value}
+        self._incoming[to_user_id] = {**self._incoming.get(to_user_id, _EMPTY), from_user_id: value}
+
+    def update(self, edges: Iterable[tuple[int, int, int]]) -> None:
+        for from_user_id, to_user_id, weight in edges:
+            self.set(from_user_id, to_user_id, weight)
+
+    def weight(self, from_user_id: int, to_user_id: int) -> int:
+        return self._outgoing.get(from_user_id, _EMPTY).get(to_user_id, 0)
+
+    def outgoing(self, user_id: int) -> Mapping[int, int]:
+        """Weights ``user_id`` gave to other users.
+
+        The map is never modified once returned; later writes replace it.
+        """
+
+        return self._outgoing.get(user_id, _EMPTY)
+
+    def incoming(self, user_id: int) -> Mapping[int, int]:
+        """Weights other users gave to ``user_id``."""
+
+        return self._incoming.get(user_id, _EMPTY)
+
+    def __len__(self) -> int:
+        return sum(len(edges) for edges in self._outgoing.values())
+
+
+def preference_index_for(session: Session) -> PreferenceIndex:
+    """Return the loaded preference index for the engine behind ``session``.
+
+    At most every ``cache_refresh_seconds`` the index first picks up likes
+    written by other processes, and their pair scores are marked stale.
+    """
+
+    state = engine_state(session)
+    index = state.get("preference_index")
+    if index is None:
+        index = state.setdefault("preference_index", PreferenceIndex(get_settings().cache_refresh_seconds))
+    if not index.loaded:
+        index.load(session)
+    elif index.refresh_due:
+        changed = index.refresh(session)
+        if changed:
+            pair_score_cache_for(session).bump(changed)
+    return index
+
+
+def queue_preference_edges(session: Session, edges: Iterable[tuple[int, int, int]]) -> None:
+    """Apply ``(from_user_id, to_user_id, weight)`` edges to the index once ``session`` commits.
+
+    Call after writing the rows; a rollback discards the edges, so the index
+    never serves a weight that was not stored.
+    """
+
+    pending = session.info.setdefault("pending_preference_edges", {})
+    for from_user_id, to_user_id, weight in edges:
+        pending[(from_user_id, to_user_id)] = clamp_weight(weight)
+
+
+# Inserted ahead of ``scoring_cache``'s listener: pair scores are bumped only
+# once the edges are visible, so a score computed from the old edges can
+# never be filed under the new generation.
+@event.listens_for(Session, "after_commit", insert=True)
+def _apply_pending_edges(session: Session) -> None:
+    pending = session.info.pop("pending_preference_edges", None)
+    if not pending:
+        return
+    # Only update an index that already exists; a fresh one loads the committed rows.
+    index = engine_state(session).get("preference_index")
+    if index is not None:
+        index.update((from_user_id, to_user_id, weight) for (from_user_id, to_user_id), weight in pending.items())
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_pending_edges(session: Session, previous_transaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop("pending_preference_edges", None)
+
+
+def upsert_preferences(session: Session, weights: Mapping[tuple[int, int], int]) -> None:
+    """Write ``weights`` keyed by ``(from_user_id, to_user_id)`` in one ``INSERT ... ON CONFLICT``.
+
+    Weights are clamped. The in-memory index and the score versions of every
+    user involved are updated once ``session`` commits, as for the
+    single-item endpoint.
+    """
+
+    if not weights:
+        return
+    edges = [(from_id, to_id, clamp_weight(weight)) for (from_id, to_id), weight in weights.items()]
+    table = Preference.__table__
+    stmt = dialect_insert(session, table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.from_user_id, table.c.to_user_id],
+        set_={"weight": stmt.excluded.weight, "updated_at": stmt.excluded.updated_at},
+    )
+    session.connection().execute(
+        stmt, [{"from_user_id": from_id, "to_user_id": to_id, "weight": weight} for from_id, to_id, weight in edges]
+    )
+    queue_preference_edges(session, edges)
+    mark_scoring_inputs_changed(session, {user_id for edge in edges for user_id in edge[:2]})
+
+
+__all__ = [
+    "MAX_WEIGHT",
+    "MIN_WEIGHT",
+    "PreferenceIndex",
+    "clamp_weight",
+    "preference_index_for",
+    "queue_preference_edges",
+    "upsert_preferences",
+]
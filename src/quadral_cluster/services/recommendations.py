@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Generic, Iterable, Sequence, TypeVar
+
+from sqlalchemy.orm import Session
+
+from quadral_cluster.config import get_settings
+from quadral_cluster.database import engine_state
+from quadral_cluster.utils.cache import CacheStats, LRUCache
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True, slots=True)
+class _Entry(Generic[T]):
+    limit: int
+    items: tuple[T, ...]
+
+
+class RecommendationCache(Generic[T]):
+    """Per-user cache of ranked recommendations.
+
+    One entry per user holds the top ``limit`` results of the last ranking;
+    requests for a smaller limit are served from its prefix, because the
+    ranking order is deterministic. Every invalidation bumps a generation
+    counter, and results computed before it are not stored, so an entry can
+    never be older than the latest invalidation that covers it.
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None) -> None:
+        self._entries: LRUCache[int, _Entry[T]] = LRUCache(maxsize, ttl)
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def lookup(self, user_id: int, limit: int) -> tuple[list[T] | None, int]:
+        """Return the cached results (or ``None``) and a token for ``store``."""
+
+        token = self._generation
+        entry = self._entries.get(user_id)
+        if entry is None or entry.limit < limit:
+            return None, token
+        return list(entry.items[:limit]), token
+
+    def store(self, user_id: int, limit: int, items: Sequence[T], token: int) -> None:
+        with self._lock:
+            if token != self._generation:
+                return
+            self._entries.set(user_id, _Entry(limit=limit, items=tuple(items)))
+
+    def invalidate_users(self, user_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                self._entries.pop(user_id)
+
+    def invalidate_all(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        return self._entries.stats()
+
+
+def recommendation_cache_for(session: Session) -> RecommendationCache:
+    """Return the recommendation cache for the engine behind ``session``."""
+
+    state = engine_state(session)
+    cache = state.get("recommendation_cache")
+    if cache is None:
+        settings = get_settings()
+        cache = state.setdefault(
+            "recommendation_cache",
+            RecommendationCache(
+                maxsize=settings.recommendation_cache_size,
+                ttl=settings.recommendation_cache_ttl_seconds,
+            ),
+        )
+    return cache
+
+
+__all__ = ["RecommendationCache", "recommendation_cache_for"]
@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterable, Sequence
+
+import numpy as np
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from quadral_cluster.config import get_settings
+from quadral_cluster.database import engine_state
+from quadral_cluster.models.availability import Availability
+from quadral_cluster.models.domain import User
+
+# Each refresh re-reads rows stamped this long before the previous one began,
+# so writes stamped by a slower clock or committed by a slow transaction are
+# not missed. Request and job transactions are well under it.
+REFRESH_OVERLAP = timedelta(seconds=15)
+
+
+@dataclass(frozen=True, slots=True)
+class PairCacheStats:
+    hits: int
+    misses: int
+    stale: int
+    evictions: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+@dataclass(frozen=True, slots=True)
+class PairLookup:
+    """Cached scores of one anchor against many users, plus the generation read.
+
+    ``scores`` holds ``nan`` where nothing valid was cached. The generation
+    is passed back to ``PairScoreCache.store``, so results computed from data
+    older than a concurrent write are filed as already stale.
+    """
+
+    scores: np.ndarray
+    generation: int
+
+    @property
+    def missing(self) -> np.ndarray:
+        return np.flatnonzero(np.isnan(self.scores))
+
+
+class PairScoreCache:
+    """Bounded symmetric cache of ``pair_score`` results.
+
+    Entries are keyed by the unordered user pair and stamped with the cache
+    generation at the time of the lookup that computed them. ``bump``
+    advances the generation and records it as the user's last change
+    (availability, preferences, age or timezone); an entry is valid while
+    neither user changed after its stamp, so no scan of the cache is needed.
+
+    The per-user change map is an LRU as large as the entry cache. A user
+    dropped from it raises ``_floor`` to their last change, and entries
+    stamped below the floor count as stale, so forgetting a user can only
+    discard entries, never revive them. A single lock guards all state, so
+    the cache is safe under the threadpool that runs sync routes.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self._maxsize = maxsize
+        self._entries: OrderedDict[tuple[int, int], tuple[int, float]] = OrderedDict()
+        self._changed: OrderedDict[int, int] = OrderedDict()
+        self._generation = 0
+        self._floor = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def version(self, user_id: int) -> int:
+        """Generation of ``user_id``'s last change (a lower bound once forgotten)."""
+
+        with self._lock:
+            return self._changed.get(user_id, self._floor)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def changes_since(self, generation: int) -> set[int] | None:
+        """Users changed after ``generation``, or ``None`` once some were forgotten."""
+
+        with self._lock:
+            if self._floor > generation:
+                return None
+            changed: set[int] = set()
+            # Bumped users move to the end, so the newest changes come first.
+            for user_id in reversed(self._changed):
+                if self._changed[user_id] <= generation:
+                    break
+                changed.add(user_id)
+            return changed
+
+    def bump(self, user_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._generation += 1
+            changed = self._changed
+            for user_id in user_ids:
+                changed[user_id] = self._generation
+                changed.move_to_end(user_id)
+            while len(changed) > self._maxsize:
+                _, forgotten = changed.popitem(last=False)
+                self._floor = max(self._floor, forgotten)
+
+    def lookup(self, anchor_id: int, user_ids: Sequence[int]) -> PairLookup:
+        values = [np.nan] * len(user_ids)
+        entries = self._entries
+        hits = stale = 0
+        with self._lock:
+            generation = self._generation
+            floor = self._floor
+            changed_at = self._changed.get
+            anchor_changed = changed_at(anchor_id, 0)
+            for index, user_id in enumerate(user_ids):
+                key = (anchor_id, user_id) if anchor_id < user_id else (user_id, anchor_id)
+                entry = entries.get(key)
+                if entry is None:
+                    continue
+                stamp = entry[0]
+                if stamp < floor or stamp < anchor_changed or stamp < changed_at(user_id, 0):
+                    del entries[key]
+                    stale += 1
+                    continue
+                entries.move_to_end(key)
+                values[index] = entry[1]
+                hits += 1
+            self._hits += hits
+            self._misses += len(user_ids) - hits
+            self._stale += stale
+        return PairLookup(scores=np.array(values, dtype=np.float64), generation=generation)
+
+    def store(
+        self,
+        anchor_id: int,
+        user_ids: Sequence[int],
+        scores: Sequence[float],
+        lookup: PairLookup,
+        positions: Iterable[int],
+    ) -> None:
+        """File ``scores[k]`` for ``user_ids[k]`` at each of ``positions``."""
+
+        if self._maxsize == 0:
+            return
+        entries = self._entries
+        stamp = lookup.generation
+        with self._lock:
+            for index in positions:
+                user_id = user_ids[index]
+                key = (anchor_id, user_id) if anchor_id < user_id else (user_id, anchor_id)
+                entries[key] = (stamp, float(scores[index]))
+                entries.move_to_end(key)
+            overflow = len(entries) - self._maxsize
+            for _ in range(max(0, overflow)):
+                entries.popitem(last=False)
+            self._evictions += max(0, overflow)
+
+    def scores(
+        self,
+        anchor_id: int,
+        user_ids: Sequence[int],
+        compute: Callable[[np.ndarray], np.ndarray],
+    ) -> np.ndarray:
+        """Scores of ``anchor_id`` against ``user_ids``, computing only the misses.
+
+        ``compute`` receives the positions (into ``user_ids``) that missed and
+        returns their scores in the same order.
+        """
+
+        lookup = self.lookup(anchor_id, user_ids)
+        missing = lookup.missing
+        scores = lookup.scores
+        if len(missing):
+            scores[missing] = compute(missing)
+            self.store(anchor_id, user_ids, scores, lookup, missing.tolist())
+        return scores
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> PairCacheStats:
+        with self._lock:
+            return PairCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                stale=self._stale,
+                evictions=self._evictions,
+                size=len(self._entries),
+                maxsize=self._maxsize,
+            )
+
+
+class ScoringInputWatch:
+    """``updated_at`` watermarks over the user and availability rows behind pair scores.
+
+    Ages, timezones and masks written by other processes never reach this
+    process's commit hooks. ``changed_ids`` returns the ids whose rows were
+    stamped since the previous call began, less ``REFRESH_OVERLAP``,
+    skipping rows in that window it has already reported. The watch starts
+    at creation time, when the cache it guards is still empty. Subclasses
+    watch other tables through ``_COLUMNS``; the id column need not be
+    unique, e.g. memberships reported by their cluster id.
+    """
+
+    _COLUMNS = (
+        ("users", User.id, User.updated_at),
+        ("availabilities", Availability.user_id, Availability.updated_at),
+    )
+
+    def __init__(self, refresh_seconds: float | None = None) -> None:
+        self._refresh_seconds = refresh_seconds
+        self._since = datetime.utcnow()
+        self._seen: dict[str, dict[int, Any]] = {name: {} for name, _, _ in self._COLUMNS}
+        self._synced_at = time.monotonic()
+        self._syncing = False
+        self._lock = threading.Lock()
+
+    @property
+    def refresh_due(self) -> bool:
+        return self._refresh_seconds is not None and time.monotonic() - self._synced_at >= self._refresh_seconds
+
+    def changed_ids(self, session: Session) -> set[int]:
+        with self._lock:
+            if self._syncing:
+                return set()
+            self._syncing = True
+            self._synced_at = time.monotonic()
+        try:
+            started = datetime.utcnow()
+            changed: set[int] = set()
+            connection = session.connection()
+            for name, id_column, updated_column in self._COLUMNS:
+                # Oldest first, so an id shared by several rows keeps its newest stamp.
+                stmt = (
+                    select(id_column, updated_column)
+                    .where(updated_column >= self._since - REFRESH_OVERLAP)
+                    .order_by(updated_column)
+                )
+                seen = self._seen[name]
+                # Rows outside the window are never returned again, so only this read is kept.
+                current = dict(connection.execute(stmt).all())
+                changed.update(row_id for row_id, updated_at in current.items() if seen.get(row_id) != updated_at)
+                self._seen[name] = current
+            self._since = started
+            return changed
+        finally:
+            with self._lock:
+                self._syncing = False
+
+
+def _pair_score_cache(state: dict[str, Any]) -> PairScoreCache:
+    cache = state.get("pair_score_cache")
+    if cache is None:
+        cache = state.setdefault("pair_score_cache", PairScoreCache(get_settings().pair_score_cache_size))
+    return cache
+
+
+def pair_score_cache_for(session: Session) -> PairScoreCache:
+    """Return the pair score cache for the engine behind ``session``.
+
+    At most every ``cache_refresh_seconds`` it first marks stale the users
+    whose age, timezone or availability other processes have changed.
+    """
+
+    state = engine_state(session)
+    cache = _pair_score_cache(state)
+    watch = state.get("scoring_input_watch")
+    if watch is None:
+        watch = state.setdefault("scoring_input_watch", ScoringInputWatch(get_settings().cache_refresh_seconds))
+    if watch.refresh_due:
+        changed = watch.changed_ids(session)
+        if changed:
+            cache.bump(changed)
+    return cache
+
+
+def mark_scoring_inputs_changed(session: Session, user_ids: Iterable[int]) -> None:
+    """Bump the users' score versions once ``session`` commits.
+
+    Call after writing a user's availability, preferences, age or timezone.
+    """
+
+    session.info.setdefault("changed_scoring_user_ids", set()).update(user_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_changed_users(session: Session) -> None:
+    changed = session.info.pop("changed_scoring_user_ids", None)
+    if changed:
+        # No SQL after commit: bump without checking other processes' writes.
+        _pair_score_cache(engine_state(session)).bump(changed)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_changed_users(session: Session, previous_transaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop("changed_scoring_user_ids", None)
+
+
+__all__ = [
+    "PairCacheStats",
+    "PairLookup",
+    "PairScoreCache",
+    "REFRESH_OVERLAP",
+    "ScoringInputWatch",
+    "mark_scoring_inputs_changed",
+    "pair_score_cache_for",
+]
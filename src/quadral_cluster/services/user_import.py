@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import csv
+import json
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Iterator, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+from pydantic import ValidationError
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from quadral_cluster.models.domain import Profile, User
+from quadral_cluster.schemas import ProfileCreate, UserCreate
+from quadral_cluster.services.scoring_cache import mark_scoring_inputs_changed
+from quadral_cluster.utils.timezones import normalize_timezone
+
+NDJSON = "ndjson"
+CSV = "csv"
+FORMATS = (NDJSON, CSV)
+
+# Columns of a user that must be unique across the table.
+_UNIQUE_FIELDS = ("telegram_id", "username", "email")
+_USER_FIELDS = frozenset(UserCreate.model_fields) - {"profile"}
+_PROFILE_FIELDS = frozenset(ProfileCreate.model_fields)
+
+# A parsed input record: its 1-based line number and either the raw fields or
+# the reason the line could not be parsed.
+Record = tuple[int, "dict[str, Any] | str"]
+
+
+@dataclass(slots=True)
+class RowError:
+    line: int
+    errors: list[str]
+
+
+@dataclass(slots=True)
+class ImportReport:
+    created: int = 0
+    errors: list[RowError] = field(default_factory=list)
+
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+
+class RecordParser:
+    """Turn input lines into records, one record per line.
+
+    NDJSON lines hold one JSON object each. CSV starts with a header row;
+    columns named after ``UserCreate`` fields go into the user and those
+    named after ``ProfileCreate`` fields into the profile (``socionics_type``
+    into both). Empty cells are omitted and ``interests`` is split on ``;``.
+    Quoted cells spanning several lines are not supported.
+    """
+
+    def __init__(self, fmt: str) -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported import format {fmt!r}; expected one of {', '.join(FORMATS)}")
+        self.format = fmt
+        self._header: list[str] | None = None
+
+    def parse(self, number: int, line: str) -> Record | None:
+        """Record for line ``number`` (1-based), or ``None`` for blank and header lines."""
+
+        if not line.strip():
+            return None
+        if self.format == NDJSON:
+            try:
+                fields = json.loads(line)
+            except json.JSONDecodeError as exc:
+                return number, f"invalid JSON: {exc.msg}"
+            return number, fields if isinstance(fields, dict) else "expected a JSON object"
+
+        cells = next(csv.reader([line]))
+        if self._header is None:
+            self._header = [cell.strip() for cell in cells]
+            return None
+        if len(cells) != len(self._header):
+            return number, f"expected {len(self._header)} columns, got {len(cells)}"
+        user: dict[str, Any] = {}
+        profile: dict[str, Any] = {}
+        for column, value in zip(self._header, cells):
+            if value == "":
+                continue
+            if column in _USER_FIELDS:
+                user[column] = value
+            if column == "interests":
+                profile[column] = [item.strip() for item in value.split(";") if item.strip()]
+            elif column in _PROFILE_FIELDS:
+                profile[column] = value
+        user["profile"] = profile
+        return number, user
+
+
+def parse_records(lines: Iterable[str], fmt: str) -> Iterator[Record]:
+    parser = RecordParser(fmt)
+    for number, line in enumerate(lines, start=1):
+        record = parser.parse(number, line.rstrip("\r\n"))
+        if record is not None:
+            yield record
+
+
+async def aparse_records(chunks: AsyncIterable[bytes], fmt: str) -> AsyncIterator[Record]:
+    """Records from a UTF-8 byte stream such as a request body."""
+
+    parser = RecordParser(fmt)
+    number = 0
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            number += 1
+            record = parser.parse(number, line.decode("utf-8-sig").rstrip("\r"))
+            if record is not None:
+                yield record
+    if pending:
+        record = parser.parse(number + 1, pending.decode("utf-8-sig").rstrip("\r"))
+        if record is not None:
+            yield record
+
+
+def _validation_messages(exc: ValidationError) -> list[str]:
+    return [
+        f"{'.'.join(str(part) for part in error['loc']) or 'record'}: {error['msg']}"
+        for error in exc.errors(include_url=False)
+    ]
+
+
+def _rows_for(payload: UserCreate) -> tuple[dict[str, Any], dict[str, Any]]:
+    """User and profile column values for ``payload``, as ``POST /users`` stores them."""
+
+    profile = payload.profile.model_dump()
+    profile["timezone"] = normalize_timezone(profile.get("timezone"))
+    user = {
+        "telegram_id": payload.telegram_id,
+        "username": payload.username,
+        "email": payload.email,
+        "socionics_type": str(payload.socionics_type),
+        "quadra": None if payload.quadra is None else str(payload.quadra),
+        "timezone": profile["timezone"],
+        "age": profile.get("age"),
+    }
+    return user, profile
+
+
+def _taken_values(session: Session, users: Sequence[dict[str, Any]]) -> dict[str, set[Any]]:
+    """Unique column values of ``users`` that already exist, in one query."""
+
+    wanted = {name: {user[name] for user in users if user[name] is not None} for name in _UNIQUE_FIELDS}
+    clauses = [getattr(User, name).in_(values) for name, values in wanted.items() if values]
+    taken: dict[str, set[Any]] = {name: set() for name in _UNIQUE_FIELDS}
+    if not clauses:
+        return taken
+    for row in session.execute(select(*(getattr(User, name) for name in _UNIQUE_FIELDS)).where(or_(*clauses))):
+        for name, value in zip(_UNIQUE_FIELDS, row):
+            if value in wanted[name]:
+                taken[name].add(value)
+    return taken
+
+
+def _insert(session: Session, users: list[dict[str, Any]], profiles: list[dict[str, Any]]) -> list[int]:
+    """Insert ``users`` and their ``profiles``; return the user ids in input order.
+
+    Core inserts on the tables: the ORM bulk path costs several times more
+    per row. SQLite cannot promise RETURNING order, so asking for it makes
+    SQLAlchemy insert one row per statement; instead ids are matched back
+    through the unique columns, and only rows without any of them go in one
+    by one.
+    """
+
+    connection = session.connection()
+    user_table, profile_table = User.__table__, Profile.__table__
+    keyed = [index for index, user in enumerate(users) if any(user[name] is not None for name in _UNIQUE_FIELDS)]
+    unkeyed = sorted(set(range(len(users))) - set(keyed))
+    user_ids: list[int] = [0] * len(users)
+    if keyed:
+        unique_columns = [user_table.c[name] for name in _UNIQUE_FIELDS]
+        returned = connection.execute(
+            insert(user_table).returning(user_table.c.id, *unique_columns), [users[index] for index in keyed]
+        )
+        ids_by_key = {tuple(key): user_id for user_id, *key in returned}
+        for index in keyed:
+            user_ids[index] = ids_by_key[tuple(users[index][name] for name in _UNIQUE_FIELDS)]
+    for index in unkeyed:
+        user_ids[index] = connection.execute(insert(user_table).values(users[index])).inserted_primary_key[0]
+    connection.execute(
+        insert(profile_table), [{**profile, "user_id": user_id} for user_id, profile in zip(user_ids, profiles)]
+    )
+    return user_ids
+
+
+def import_user_chunk(session: Session, records: Sequence[Record], report: ImportReport) -> list[int]:
+    """Validate ``records`` and bulk insert the valid ones into ``session``.
+
+    Users and profiles go in with one executemany each; duplicates of
+    ``telegram_id``, ``username`` or ``email`` (against the table and within
+    the chunk) are reported instead of failing the chunk. Nothing is
+    committed here: callers commit once per chunk. Returns the new user ids.
+    """
+
+    errors: list[RowError] = []
+    lines: list[int] = []
+    users: list[dict[str, Any]] = []
+    profiles: list[dict[str, Any]] = []
+    for line, fields in records:
+        if isinstance(fields, str):
+            errors.append(RowError(line, [fields]))
+            continue
+        try:
+            user, profile = _rows_for(UserCreate.model_validate(fields))
+        except ValidationError as exc:
+            errors.append(RowError(line, _validation_messages(exc)))
+            continue
+        except ValueError as exc:  # unknown timezone
+            errors.append(RowError(line, [f"profile.timezone: {exc}"]))
+            continue
+        lines.append(line)
+        users.append(user)
+        profiles.append(profile)
+
+    taken = _taken_values(session, users)
+    accepted = []
+    for index, user in enumerate(users):
+        duplicates = [name for name in _UNIQUE_FIELDS if user[name] is not None and user[name] in taken[name]]
+        if duplicates:
+            errors.append(RowError(lines[index], [f"{name}: already exists" for name in duplicates]))
+            continue
+        for name in _UNIQUE_FIELDS:
+            if user[name] is not None:
+                taken[name].add(user[name])
+        accepted.append(index)
+
+    user_ids: list[int] = []
+    try:
+        if accepted:
+            with session.begin_nested():
+                user_ids = _insert(session, [users[i] for i in accepted], [profiles[i] for i in accepted])
+    except IntegrityError:
+        # A concurrent writer took a value after the check; retry row by row to find it.
+        for index in accepted:
+            try:
+                with session.begin_nested():
+                    user_ids += _insert(session, [users[index]], [profiles[index]])
+            except IntegrityError as exc:
+                errors.append(RowError(lines[index], [f"conflict: {exc.orig}"]))
+
+    report.errors += sorted(errors, key=lambda error: error.line)
+    report.created += len(user_ids)
+    # Ids may be reused after deletes; never let an old pair score outlive its user.
+    mark_scoring_inputs_changed(session, user_ids)
+    return user_ids
+
+
+def chunked(records: Iterable[Record], size: int) -> Iterator[list[Record]]:
+    chunk: list[Record] = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_users(session: Session, records: Iterable[Record], chunk_size: int) -> ImportReport:
+    """Import ``records`` in transactions of ``chunk_size`` rows each."""
+
+    report = ImportReport()
+    for chunk in chunked(records, chunk_size):
+        import_user_chunk(session, chunk, report)
+        session.commit()
+    return report
+
+
+__all__ = [
+    "CSV",
+    "FORMATS",
+    "NDJSON",
+    "ImportReport",
+    "Record",
+    "RecordParser",
+    "RowError",
+    "aparse_records",
+    "chunked",
+    "import_user_chunk",
+    "import_users",
+    "parse_records",
+]
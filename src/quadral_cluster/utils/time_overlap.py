@@ -6,6 +6,9 @@ from typing import Iterable
 
 
 HOURS_PER_WEEK = 7 * 24
+MASK_BYTES = HOURS_PER_WEEK // 8
+EMPTY_MASK = 0
+FULL_MASK = (1 << HOURS_PER_WEEK) - 1
 
 
 def _bits_from_bytes(raw: bytes) -> list[int]:
@@ -66,24 +69,67 @@ def decode_weekly_mask(mask: str | bytes | None) -> list[int]:
     return [0] * HOURS_PER_WEEK
 
 
-def overlap(mask_a: str | bytes | None, mask_b: str | bytes | None) -> float:
-    bits_a = decode_weekly_mask(mask_a)
-    bits_b = decode_weekly_mask(mask_b)
+def ensure_mask_length(bits: Iterable[int]) -> str:
+    values = list(bits)[:HOURS_PER_WEEK]
+    values.extend([0] * max(0, HOURS_PER_WEEK - len(values)))
+    return "".join("1" if value else "0" for value in values)
+
+
+def pack_weekly_mask(bits: Iterable[int]) -> int:
+    """Pack decoded hour bits into a 168-bit integer.
+
+    Hour 0 (Monday 00:00) is the most significant bit, so the integer reads
+    the same way as the 168-character ``"0101…"`` string form.
+    """
+
+    return int(ensure_mask_length(bits), 2)
+
+
+def normalize_weekly_mask(value: str | bytes | Iterable[object] | None) -> int:
+    """Packed mask from any accepted input: a list of hour flags or an encoded mask."""
+
+    if isinstance(value, (list, tuple)):
+        return pack_weekly_mask(1 if bool(flag) else 0 for flag in value)
+    return pack_weekly_mask(decode_weekly_mask(value if value is None or isinstance(value, bytes) else str(value)))
+
 
-    total_a = sum(bits_a)
-    total_b = sum(bits_b)
+def mask_to_bytes(mask: int) -> bytes:
+    """Serialize a packed mask into its fixed-size 21-byte storage form."""
+
+    return (mask & FULL_MASK).to_bytes(MASK_BYTES, "big")
+
+
+def mask_from_bytes(raw: bytes | None) -> int:
+    if not raw:
+        return EMPTY_MASK
+    if len(raw) == MASK_BYTES:
+        return int.from_bytes(raw, "big")
+    return pack_weekly_mask(_bits_from_bytes(raw))
+
+
+def overlap(mask_a: int, mask_b: int) -> float:
+    """Share of common hours relative to the busier of two packed masks."""
+
+    total_a = mask_a.bit_count()
+    total_b = mask_b.bit_count()
     if total_a == 0 and total_b == 0:
         return 0.0
 
-    overlap_hours = sum(1 for bit_a, bit_b in zip(bits_a, bits_b) if bit_a and bit_b)
+    overlap_hours = (mask_a & mask_b).bit_count()
     denominator = max(total_a, total_b, 1)
     return overlap_hours / denominator
 
 
-def ensure_mask_length(bits: Iterable[int]) -> str:
-    values = list(bits)[:HOURS_PER_WEEK]
-    values.extend([0] * max(0, HOURS_PER_WEEK - len(values)))
-    return "".join("1" if value else "0" for value in values)
-
-
-__all__ = ["decode_weekly_mask", "overlap", "ensure_mask_length", "HOURS_PER_WEEK"]
+__all__ = [
+    "EMPTY_MASK",
+    "FULL_MASK",
+    "HOURS_PER_WEEK",
+    "MASK_BYTES",
+    "decode_weekly_mask",
+    "ensure_mask_length",
+    "mask_from_bytes",
+    "mask_to_bytes",
+    "normalize_weekly_mask",
+    "overlap",
+    "pack_weekly_mask",
+]
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+
+
+MAX_SCORED_OFFSET_MINUTES = 12 * 60
+
+# Timezone compatibility for an absolute offset difference in minutes,
+# saturating at twelve hours apart.
+ZONE_SCORE_BY_MINUTES: tuple[float, ...] = tuple(
+    1.0 - minutes / MAX_SCORED_OFFSET_MINUTES for minutes in range(MAX_SCORED_OFFSET_MINUTES + 1)
+)
+
+_LOOKAHEAD = timedelta(days=366)
+_SCAN_STEP = timedelta(days=1)
+_PRECISION = timedelta(seconds=1)
+
+
+@dataclass(frozen=True, slots=True)
+class _OffsetEntry:
+    minutes: int | None
+    valid_from: float
+    valid_until: float
+
+
+_offsets: dict[str, _OffsetEntry] = {}
+_offsets_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _canonical_names() -> dict[str, str]:
+    return {name.lower(): name for name in available_timezones()}
+
+
+def normalize_timezone(name: str | None) -> str | None:
+    """Return the canonical IANA spelling of ``name``.
+
+    Blank values become ``None``; unknown zones raise ``ValueError``.
+    """
+
+    if name is None:
+        return None
+    candidate = name.strip()
+    if not candidate:
+        return None
+
+    canonical = _canonical_names().get(candidate.lower(), candidate)
+    try:
+        ZoneInfo(canonical)
+    except (ZoneInfoNotFoundError, ValueError, OSError) as exc:
+        raise ValueError(f"Unknown timezone: {name}") from exc
+    return canonical
+
+
+def _offset_minutes(zone: ZoneInfo, moment: datetime) -> int:
+    delta = moment.astimezone(zone).utcoffset()
+    return int(delta.total_seconds() // 60) if delta is not None else 0
+
+
+def _next_transition(zone: ZoneInfo, start: datetime, minutes: int) -> datetime:
+    """Find the first instant after ``start`` where the offset stops being ``minutes``."""
+
+    limit = start + _LOOKAHEAD
+    probe = start
+    while probe < limit:
+        step = probe + _SCAN_STEP
+        if _offset_minutes(zone, step) != minutes:
+            low, high = probe, step
+            while high - low > _PRECISION:
+                middle = low + (high - low) / 2
+                if _offset_minutes(zone, middle) == minutes:
+                    low = middle
+                else:
+                    high = middle
+            return high
+        probe = step
+    return limit
+
+
+def _resolve(name: str, now: float) -> _OffsetEntry:
+    try:
+        zone = ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError, OSError):
+        return _OffsetEntry(minutes=None, valid_from=float("-inf"), valid_until=float("inf"))
+
+    moment = datetime.fromtimestamp(now, tz=timezone.utc)
+    minutes = _offset_minutes(zone, moment)
+    return _OffsetEntry(
+        minutes=minutes,
+        valid_from=now,
+        valid_until=_next_transition(zone, moment, minutes).timestamp(),
+    )
+
+
+def utc_offset_minutes(name: str, now: float | None = None) -> int | None:
+    """Current UTC offset of ``name`` in minutes, or ``None`` for unknown zones.
+
+    Each zone is resolved once and reused until its next DST transition.
+    """
+
+    moment = time.time() if now is None else now
+    entry = _offsets.get(name)
+    if entry is not None and entry.valid_from <= moment < entry.valid_until:
+        return entry.minutes
+
+    entry = _resolve(name, moment)
+    with _offsets_lock:
+        _offsets[name] = entry
+    return entry.minutes
+
+
+def zone_score(minutes_a: int, minutes_b: int) -> float:
+    return ZONE_SCORE_BY_MINUTES[min(abs(minutes_a - minutes_b), MAX_SCORED_OFFSET_MINUTES)]
+
+
+def clear_offset_cache() -> None:
+    with _offsets_lock:
+        _offsets.clear()
+
+
+__all__ = [
+    "MAX_SCORED_OFFSET_MINUTES",
+    "ZONE_SCORE_BY_MINUTES",
+    "clear_offset_cache",
+    "normalize_timezone",
+    "utc_offset_minutes",
+    "zone_score",
+]
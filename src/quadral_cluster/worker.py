@@ -0,0 +1,114 @@
+"""Matchmaker worker: ``python -m quadral_cluster.worker`` or ``quadral-cluster-worker``.
+
+Runs queued ``find_or_create`` jobs (see ``services.jobs``) outside the API.
+The quadras are split into ``--processes`` shards, each served by its own
+process with its own engine, so the heavy pool scans use separate cores.
+A quadra always belongs to one shard, so the processes of one command do
+not build clusters from the same candidate pool. Other worker commands and
+the API's inline ``find_or_create`` can still pick the same user; the
+unique ``user_id`` of cluster members rejects the second insert, and that
+job is rolled back and retried (``services.jobs.MAX_ATTEMPTS`` in total).
+
+SIGINT/SIGTERM stop the processes after the job they are running. With
+``--once`` the jobs already queued are drained in this process and the
+command exits, which suits cron and tests.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+from collections.abc import Sequence
+
+from .config import get_settings
+from .database import SessionLocal, engine
+from .domain.socionics import Quadra
+from .migrations import upgrade_database
+from .services.jobs import process_jobs
+
+logger = logging.getLogger("quadral_cluster.worker")
+
+
+def shard_quadras(quadras: Sequence[Quadra], processes: int) -> list[list[Quadra]]:
+    """Split ``quadras`` round-robin into at most ``processes`` non-empty shards."""
+
+    count = max(1, min(processes, len(quadras)))
+    return [list(quadras[index::count]) for index in range(count)]
+
+
+def _configure_logging() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(levelname)s %(message)s")
+
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def drain(quadras: Sequence[Quadra], batch_size: int | None = None) -> int:
+    """Run jobs of ``quadras`` until none are queued; returns how many ran."""
+
+    worker_id = _worker_id()
+    total = 0
+    while claimed := process_jobs(SessionLocal, worker_id, quadras, batch_size=batch_size):
+        total += claimed
+    return total
+
+
+def _serve(quadras: list[Quadra], batch_size: int | None, poll_seconds: float, stop) -> None:
+    # The parent turns Ctrl-C into ``stop``; the current job is finished first.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _configure_logging()
+    worker_id = _worker_id()
+    logger.info("worker %s serving %s", worker_id, ", ".join(quadra.value for quadra in quadras))
+    while not stop.is_set():
+        if not process_jobs(SessionLocal, worker_id, quadras, batch_size=batch_size):
+            stop.wait(poll_seconds)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(prog="quadral-cluster-worker", description=__doc__)
+    parser.add_argument("--processes", type=int, default=min(len(Quadra), os.cpu_count() or 1))
+    parser.add_argument("--quadras", nargs="+", type=Quadra, default=list(Quadra), metavar="QUADRA")
+    parser.add_argument("--batch-size", type=int, help="jobs claimed at once (default: MATCHMAKING_JOB_BATCH_SIZE)")
+    parser.add_argument("--poll-seconds", type=float, default=settings.matchmaking_job_poll_seconds)
+    parser.add_argument("--once", action="store_true", help="drain the queue in this process and exit")
+    args = parser.parse_args(argv)
+    _configure_logging()
+
+    upgrade_database(engine)
+    if args.once:
+        logger.info("ran %d jobs", drain(args.quadras, args.batch_size))
+        return 0
+
+    # ``spawn`` gives each process fresh engines instead of forked copies of the parent's connections.
+    context = multiprocessing.get_context("spawn")
+    stop = context.Event()
+    processes = [
+        context.Process(
+            target=_serve,
+            args=(shard, args.batch_size, args.poll_seconds, stop),
+            name=f"matchmaker-{'-'.join(quadra.value for quadra in shard)}",
+        )
+        for shard in shard_quadras(args.quadras, args.processes)
+    ]
+    for process in processes:
+        process.start()
+
+    def request_stop(signum, _frame) -> None:
+        logger.info("signal %d: stopping after current jobs", signum)
+        stop.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    for process in processes:
+        process.join()
+    return max((process.exitcode or 0 for process in processes), default=0)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
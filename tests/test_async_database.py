@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from quadral_cluster.database import Base, FairCheckout, async_database_url, read_only_database_url
+from quadral_cluster.models import availability, cluster, domain, preference  # noqa: F401
+from quadral_cluster.models.domain import User
+
+
+def test_async_database_url_swaps_driver() -> None:
+    assert async_database_url("sqlite:///./dev.db") == "sqlite+aiosqlite:///./dev.db"
+    assert async_database_url("sqlite:///:memory:") == "sqlite+aiosqlite:///:memory:"
+    assert async_database_url("postgresql+psycopg://u:p@db/qc") == "postgresql+asyncpg://u:p@db/qc"
+    assert async_database_url("sqlite+aiosqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+    with pytest.raises(ValueError):
+        async_database_url("mssql+pyodbc://db/qc")
+
+
+def test_read_only_url_only_for_sqlite_files() -> None:
+    assert read_only_database_url("sqlite+aiosqlite:///./dev.db") == "sqlite+aiosqlite:///file:./dev.db?mode=ro&uri=true"
+    assert read_only_database_url("sqlite+aiosqlite:///:memory:") is None
+    assert read_only_database_url("postgresql+asyncpg://u:p@db/qc") is None
+
+
+def test_read_only_engine_refuses_writes(tmp_path) -> None:
+    url = f"sqlite:///{tmp_path / 'qc.db'}"
+    Base.metadata.create_all(create_engine(url))
+
+    async def scenario() -> int:
+        engine = create_async_engine(read_only_database_url(async_database_url(url)))
+        try:
+            async with engine.connect() as connection:
+                count = await connection.scalar(select(func.count()).select_from(User))
+                with pytest.raises(OperationalError, match="readonly"):
+                    await connection.execute(text("INSERT INTO users (username) VALUES ('ro')"))
+                return count
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(scenario()) == 0
+
+
+def _create_user(test_client) -> int:
+    response = test_client.post(
+        "/users",
+        json={
+            "email": f"{uuid.uuid4().hex[:8]}@example.com",
+            "username": uuid.uuid4().hex[:8],
+            "socionics_type": "ILE",
+            "quadra": "alpha",
+            "profile": {"socionics_type": "ILE"},
+        },
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_fair_checkout_admits_in_arrival_order() -> None:
+    checkout = FairCheckout(1, timeout=0.5)
+    admitted: list[int] = []
+
+    async def request(index: int, hold: float) -> None:
+        async with checkout():
+            admitted.append(index)
+            await asyncio.sleep(hold)
+
+    async def scenario() -> None:
+        first = asyncio.create_task(request(0, 0.05))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(request(index, 0)) for index in (1, 2, 3)]
+        await asyncio.sleep(0.01)
+        # A late arrival queues behind the requests already waiting.
+        await asyncio.gather(first, *waiters, request(4, 0))
+
+        short = FairCheckout(1, timeout=0.05)
+        async with short():
+            with pytest.raises(PoolTimeoutError):
+                async with short():
+                    pass
+
+    asyncio.run(scenario())
+    assert admitted == [0, 1, 2, 3, 4]
+
+
+def test_async_writes_reach_state_shared_with_sync_sessions(test_client) -> None:
+    from quadral_cluster.database import SessionLocal
+    from quadral_cluster.services.preferences import preference_index_for
+    from quadral_cluster.services.scoring_cache import pair_score_cache_for
+
+    liker = _create_user(test_client)
+    liked = _create_user(test_client)
+    with SessionLocal() as session:
+        cache = pair_score_cache_for(session)
+        before = cache.version(liked)
+
+        response = test_client.post(
+            "/preferences/like", json={"from_user_id": liker, "to_user_id": liked, "weight": 2}
+        )
+        assert response.status_code == 200
+        assert preference_index_for(session).outgoing(liker) == {liked: 2}
+        assert cache.version(liked) > before
+
+    assert test_client.get(f"/users/{liker}").json()["id"] == liker
+    assert test_client.get("/users/999999").status_code == 404
+
+
+def test_ranking_reads_stay_off_the_read_write_session(test_client) -> None:
+    from quadral_cluster.database import get_session, read_sync_engine
+    from quadral_cluster.main import app
+
+    assert read_sync_engine.url.query.get("mode") == "ro"
+
+    def refuse():
+        pytest.fail("read routes must not open a read-write session")
+
+    user_id = _create_user(test_client)
+    app.dependency_overrides[get_session] = refuse
+    try:
+        for path, params in (
+            ("/clusters/open", {"quadra": "beta", "tim": "EIE", "user_id": user_id}),
+            ("/matchmaking/recommendations", {"user_id": user_id}),
+        ):
+            assert test_client.get(path, params=params).status_code == 200
+    finally:
+        app.dependency_overrides.pop(get_session, None)
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from quadral_cluster.domain.socionics import QUADRA_MEMBERS, Quadra, SocType
+from quadral_cluster.models.availability import Availability
+from quadral_cluster.models.cluster import Cluster, ClusterMember
+from quadral_cluster.services.matching import match_quadra_pool
+from quadral_cluster.utils.time_overlap import HOURS_PER_WEEK
+
+from .utils_matching import create_session, make_user
+
+
+@pytest.fixture()
+def db_session() -> Session:
+    session = create_session()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _populate(session: Session, quadra: Quadra, per_tim: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    for tim in sorted(QUADRA_MEMBERS[quadra], key=lambda t: t.value):
+        for _ in range(per_tim + (2 if tim == SocType.ILE else 0)):
+            user = make_user(session, tim, quadra)
+            user.age = rng.randint(18, 50)
+            user.timezone = rng.choice(["UTC", "Europe/Moscow", "Asia/Tokyo"])
+            session.add(Availability(user_id=user.id, weekly_mask=rng.getrandbits(HOURS_PER_WEEK)))
+    make_user(session, SocType.SEE, Quadra.GAMMA)
+    session.flush()
+
+
+def test_batch_partitions_pool_into_full_clusters(db_session: Session) -> None:
+    _populate(db_session, Quadra.ALPHA, per_tim=10)
+
+    result = match_quadra_pool(Quadra.ALPHA, session=db_session, seed=3, max_rounds=40)
+
+    assert len(result.clusters) == 10
+    assert result.unmatched == 2
+    members = [user_id for cluster in result.clusters for user_id in cluster]
+    assert len(members) == len(set(members))
+
+    stored = db_session.execute(select(func.count()).select_from(Cluster)).scalar_one()
+    assert stored == 10
+    statuses = set(db_session.execute(select(Cluster.status)).scalars())
+    assert statuses == {"full"}
+    tims_per_cluster = db_session.execute(
+        select(ClusterMember.cluster_id, func.count(func.distinct(ClusterMember.socionics_type))).group_by(
+            ClusterMember.cluster_id
+        )
+    ).all()
+    assert {count for _, count in tims_per_cluster} == {4}
+
+
+def test_batch_is_deterministic_and_local_search_helps(db_session: Session) -> None:
+    _populate(db_session, Quadra.ALPHA, per_tim=25, seed=1)
+
+    seeded = match_quadra_pool(Quadra.ALPHA, session=db_session, seed=7, max_rounds=0, persist=False)
+    first = match_quadra_pool(Quadra.ALPHA, session=db_session, seed=7, max_rounds=200, persist=False)
+    second = match_quadra_pool(Quadra.ALPHA, session=db_session, seed=7, max_rounds=200, persist=False)
+
+    assert first.clusters == second.clusters
+    assert first.total_score >= seeded.total_score
+
+
+def test_batch_without_complete_quadra_creates_nothing(db_session: Session) -> None:
+    make_user(db_session, SocType.ILE, Quadra.ALPHA)
+    result = match_quadra_pool(Quadra.ALPHA, session=db_session, seed=0)
+    assert result.clusters == [] and result.unmatched == 1
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import uuid
+
+from sqlalchemy import select
+
+from quadral_cluster.models.availability import Availability
+from quadral_cluster.models.preference import Preference
+from quadral_cluster.services.availability import upsert_availabilities
+from quadral_cluster.services.preferences import preference_index_for, upsert_preferences
+from quadral_cluster.services.scoring_cache import pair_score_cache_for
+from quadral_cluster.utils.time_overlap import HOURS_PER_WEEK, pack_weekly_mask
+
+from .utils_matching import create_session
+
+
+def _create_user(test_client) -> int:
+    response = test_client.post(
+        "/users",
+        json={"username": uuid.uuid4().hex[:8], "socionics_type": "ESI", "profile": {"socionics_type": "ESI"}},
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_batch_endpoints_upsert_and_keep_last_item(test_client) -> None:
+    first, second, third = (_create_user(test_client) for _ in range(3))
+    assert test_client.put("/availability", json={"user_id": first, "weekly_mask": "1" * HOURS_PER_WEEK}).json()["ok"]
+
+    response = test_client.put(
+        "/availability/batch",
+        json={
+            "items": [
+                {"user_id": first, "weekly_mask": [1, 1, 0, 1]},
+                {"user_id": second, "weekly_mask": "0" * HOURS_PER_WEEK},
+                {"user_id": second, "weekly_mask": "1" + "0" * (HOURS_PER_WEEK - 1)},
+            ]
+        },
+    )
+    assert response.json() == {"ok": True, "written": 2}
+
+    likes = [
+        {"from_user_id": first, "to_user_id": second, "weight": 1},
+        {"from_user_id": first, "to_user_id": third, "weight": -2},
+    ]
+    assert test_client.post("/preferences/like/batch", json={"items": likes}).json()["written"] == 2
+    likes[0]["weight"] = 2
+    assert test_client.post("/preferences/like/batch", json={"items": likes[:1]}).status_code == 200
+    out_of_range = test_client.post("/preferences/like/batch", json={"items": [{**likes[0], "weight": 3}]})
+    assert out_of_range.status_code == 422
+
+    from quadral_cluster.database import SessionLocal
+
+    with SessionLocal() as session:
+        masks = select(Availability.user_id, Availability.weekly_mask).where(Availability.user_id.in_([first, second]))
+        assert dict(session.execute(masks).all()) == {
+            first: pack_weekly_mask([1, 1, 0, 1]),
+            second: 1 << (HOURS_PER_WEEK - 1),
+        }
+        weights = select(Preference.to_user_id, Preference.weight).where(Preference.from_user_id == first)
+        assert dict(session.execute(weights).all()) == {second: 2, third: -2}
+        assert preference_index_for(session).outgoing(first) == {second: 2, third: -2}
+
+
+def test_upserts_bump_score_versions_on_commit() -> None:
+    session = create_session()
+    cache = pair_score_cache_for(session)
+    index = preference_index_for(session)
+
+    upsert_preferences(session, {(1, 2): 1})
+    session.rollback()
+    assert index.weight(1, 2) == 0
+
+    upsert_availabilities(session, {1: 0b1011})
+    upsert_preferences(session, {(1, 2): 5})
+    assert (cache.version(1), cache.version(2), index.weight(1, 2)) == (0, 0, 0)
+    session.commit()
+    assert (cache.version(1), cache.version(2), index.weight(1, 2)) == (1, 1, 2)
+
+    upsert_availabilities(session, {1: 0b1})
+    session.commit()
+    assert session.scalars(select(Availability.weekly_mask)).one() == 0b1
+    assert session.scalars(select(Preference.weight)).one() == 2  # clamped
+    session.close()
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import uuid
+
+from quadral_cluster.services.recommendations import RecommendationCache
+from quadral_cluster.utils.cache import LRUCache
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lru_cache_evicts_least_recent_and_expires() -> None:
+    clock = _Clock()
+    cache: LRUCache[str, int] = LRUCache(2, ttl=10.0, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+    clock.now = 10.0
+    assert cache.get("a") is None
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.evictions, stats.expirations, stats.size) == (3, 1, 1, 1, 1)
+
+
+def test_recommendation_cache_skips_stale_results() -> None:
+    cache: RecommendationCache[str] = RecommendationCache(maxsize=8, ttl=None)
+    missing, token = cache.lookup(1, 3)
+    assert missing is None
+    cache.store(1, 3, ["x", "y", "z"], token)
+    assert cache.lookup(1, 2)[0] == ["x", "y"]
+    assert cache.lookup(1, 5)[0] is None
+
+    _, token = cache.lookup(2, 3)
+    cache.invalidate_users([1])
+    cache.store(2, 3, ["computed before invalidation"], token)
+    assert cache.lookup(1, 1)[0] is None
+    assert cache.lookup(2, 1)[0] is None
+
+
+def _create_user(test_client, socionics_type: str, age: int) -> int:
+    response = test_client.post(
+        "/users",
+        json={
+            "email": f"{uuid.uuid4().hex[:8]}@example.com",
+            "username": uuid.uuid4().hex[:8],
+            "socionics_type": socionics_type,
+            "profile": {"age": age, "socionics_type": socionics_type},
+        },
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_recommendations_served_from_cache_until_invalidated(test_client) -> None:
+    founder = _create_user(test_client, "SLE", 30)
+    candidate = _create_user(test_client, "EIE", 31)
+    created = test_client.post("/clusters", json={"name": uuid.uuid4().hex, "founder_user_id": founder})
+    assert created.status_code == 201
+
+    def stats() -> dict:
+        return test_client.get("/matchmaking/recommendations/cache").json()
+
+    before = stats()
+    first = test_client.get("/matchmaking/recommendations", params={"user_id": candidate, "limit": 5}).json()
+    again = test_client.get("/matchmaking/recommendations", params={"user_id": candidate, "limit": 3}).json()
+    after = stats()
+    assert again == first[:3]
+    assert after["hits"] - before["hits"] == 1
+
+    test_client.patch(f"/users/{candidate}/profile", json={"age": 60})
+    # Pair scoring reads the age from ``User``, not the profile.
+    from quadral_cluster.database import SessionLocal
+    from quadral_cluster.models.domain import User
+
+    with SessionLocal() as session:
+        assert session.get(User, candidate).age == 60
+    refreshed = test_client.get("/matchmaking/recommendations", params={"user_id": candidate, "limit": 5}).json()
+    assert stats()["hits"] == after["hits"]
+    mine = next(item for item in refreshed if item["cluster"]["id"] == created.json()["id"])
+    assert mine["breakdown"]["age"] == 0.0
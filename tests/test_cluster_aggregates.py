@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import uuid
+
+import pytest
+from sqlalchemy.orm import Session
+
+from quadral_cluster.domain.socionics import QUADRA_BITS, Quadra
+from quadral_cluster.models.domain import Cluster, ClusterMembership, Profile, User
+from quadral_cluster.services.matchmaking import (
+    evaluate_candidate,
+    refresh_cluster_aggregates,
+    refresh_user_cluster_aggregates,
+)
+
+from .utils_matching import create_session
+
+
+@pytest.fixture()
+def db_session() -> Session:
+    session = create_session()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _user_with_profile(session: Session, socionics_type: str | None, age: int | None) -> User:
+    user = User(username=f"user_{uuid.uuid4().hex[:8]}", socionics_type=socionics_type or "ILE")
+    user.profile = Profile(socionics_type=socionics_type, age=age, timezone="Europe/Moscow")
+    session.add(user)
+    session.flush()
+    return user
+
+
+def _cluster_with(session: Session, members: list[User]) -> Cluster:
+    cluster = Cluster(name=f"cluster_{uuid.uuid4().hex[:8]}", timezone="Europe/Moscow")
+    session.add(cluster)
+    session.flush()
+    session.add_all(ClusterMembership(cluster_id=cluster.id, user_id=member.id) for member in members)
+    refresh_cluster_aggregates(session, [cluster.id])
+    return cluster
+
+
+def test_aggregates_track_membership_and_profiles(db_session: Session) -> None:
+    members = [
+        _user_with_profile(db_session, "sle", 30),
+        _user_with_profile(db_session, "IEI", None),
+        _user_with_profile(db_session, "LII", 40),
+    ]
+    cluster = _cluster_with(db_session, members)
+
+    assert cluster.member_count == 3
+    assert (cluster.age_sum, cluster.age_count) == (70, 2)
+    assert cluster.member_quadras == QUADRA_BITS[Quadra.BETA] | QUADRA_BITS[Quadra.ALPHA]
+
+    members[1].profile.age = 20
+    refresh_user_cluster_aggregates(db_session, members[1].id)
+    assert (cluster.age_sum, cluster.age_count) == (90, 3)
+
+    empty = _cluster_with(db_session, [])
+    assert (empty.member_count, empty.age_count, empty.member_quadras) == (0, 0, 0)
+
+
+@pytest.mark.parametrize(
+    ("candidate_type", "candidate_age"),
+    [("EIE", 33), ("ESE", 50), (None, 33), ("LSI", None)],
+)
+def test_aggregate_breakdown_matches_member_profiles(
+    db_session: Session, candidate_type: str | None, candidate_age: int | None
+) -> None:
+    members = [_user_with_profile(db_session, "SLE", 30), _user_with_profile(db_session, "IEI", 38)]
+    cluster = _cluster_with(db_session, members)
+    db_session.refresh(cluster)
+    candidate = _user_with_profile(db_session, candidate_type, candidate_age).profile
+
+    from_profiles = evaluate_candidate(candidate, cluster, cluster.memberships)
+    from_aggregates = evaluate_candidate(candidate, cluster)
+    assert from_aggregates == from_profiles
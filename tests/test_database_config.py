@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine
+
+from quadral_cluster.config import Settings
+from quadral_cluster.database import engine_options, install_sqlite_pragmas, sqlite_pragmas
+
+
+def test_engine_options_size_pools_except_in_memory_sqlite() -> None:
+    settings = Settings(db_pool_size=12, db_max_overflow=3, db_pool_pre_ping=True, db_statement_cache_size=64)
+
+    memory = engine_options("sqlite:///:memory:", settings)
+    assert "pool_size" not in memory
+    assert memory["connect_args"] == {"cached_statements": 64}
+
+    on_disk = engine_options("sqlite+aiosqlite:///./qc.db", settings)
+    assert (on_disk["pool_size"], on_disk["max_overflow"], on_disk["pool_pre_ping"]) == (12, 3, True)
+
+    postgres = engine_options("postgresql+asyncpg://u:p@db/qc", settings)
+    assert postgres["connect_args"] == {"prepared_statement_cache_size": 64}
+    assert "connect_args" not in engine_options("postgresql+psycopg://u:p@db/qc", settings)
+
+
+def test_sqlite_pragmas_applied_on_connect(tmp_path) -> None:
+    settings = Settings(sqlite_busy_timeout_ms=1234, sqlite_cache_size=-2000)
+    assert "journal_mode" not in sqlite_pragmas(settings, read_only=True)
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'qc.db'}")
+    install_sqlite_pragmas(engine, sqlite_pragmas(settings))
+    with engine.connect() as connection:
+        def pragma(name: str):
+            return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("busy_timeout") == 1234
+        assert pragma("cache_size") == -2000
+    engine.dispose()
+
+
+def test_sqlite_pragma_modes_are_validated() -> None:
+    assert Settings(sqlite_journal_mode="wal", sqlite_synchronous="full").sqlite_synchronous == "FULL"
+    with pytest.raises(ValidationError):
+        Settings(sqlite_journal_mode="WALL")
+    with pytest.raises(ValidationError):
+        Settings(sqlite_synchronous="NORMAL; DROP TABLE users")
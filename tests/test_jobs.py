@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, select, update
+from sqlalchemy.orm import sessionmaker
+
+from quadral_cluster.database import Base, engine_state
+from quadral_cluster.domain.socionics import QUADRA_MEMBERS, Quadra, SocType
+from quadral_cluster.models.job import JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, MatchmakingJob
+from quadral_cluster.services import jobs
+from quadral_cluster.services.jobs import claim_jobs, enqueue_find_or_create, process_jobs
+from quadral_cluster.services.matching import MatchingError
+from quadral_cluster.worker import drain, shard_quadras
+
+from .utils_matching import create_session, make_user
+
+
+def _factory(session):
+    return sessionmaker(bind=session.get_bind(), autoflush=False)
+
+
+def _queue(session, user_id: int, quadra: Quadra) -> MatchmakingJob:
+    # Bypasses the quadra check of ``enqueue_find_or_create``, like a job queued before a TIM change.
+    job = MatchmakingJob(user_id=user_id, quadra=quadra.value, status=JOB_QUEUED, attempts=0)
+    session.add(job)
+    session.flush()
+    return job
+
+
+def test_worker_runs_find_or_create_and_stores_result() -> None:
+    session = create_session()
+    quadra = Quadra.GAMMA
+    users = [make_user(session, tim, quadra) for tim in sorted(QUADRA_MEMBERS[quadra], key=lambda tim: tim.value)]
+    outsider = make_user(session, SocType.ILE, Quadra.ALPHA)
+    job = enqueue_find_or_create(session, users[0].id, quadra)
+    assert enqueue_find_or_create(session, users[0].id, quadra).id == job.id
+    with pytest.raises(MatchingError, match="not part of quadra"):
+        enqueue_find_or_create(session, outsider.id, quadra)
+    rejected = _queue(session, outsider.id, quadra)
+    session.commit()
+
+    state = engine_state(session)
+    assert process_jobs(_factory(session), "w1", [Quadra.ALPHA]) == 0
+    assert process_jobs(_factory(session), "w1", [quadra]) == 2
+    warm = (state["preference_index"], state["pair_score_cache"])
+
+    again = _queue(session, outsider.id, quadra)
+    session.commit()
+    assert process_jobs(_factory(session), "w1", [quadra]) == 1
+    # Caches stay warm between batches instead of being reloaded from scratch.
+    assert (state["preference_index"], state["pair_score_cache"]) == warm
+    assert session.get(MatchmakingJob, again.id).status == JOB_FAILED
+
+    session.expire_all()
+    done = session.get(MatchmakingJob, job.id)
+    assert done.status == JOB_DONE and done.attempts == 1 and done.finished_at is not None
+    assert done.result["ok"] is True
+    assert sorted(member["user_id"] for member in done.result["members"]) == sorted(user.id for user in users)
+    failed = session.get(MatchmakingJob, rejected.id)
+    assert failed.status == JOB_FAILED and "not part of quadra" in failed.error
+    session.close()
+
+
+def test_claims_are_disjoint_and_expired_leases_are_reclaimed() -> None:
+    session = create_session()
+    for _ in range(5):
+        _queue(session, make_user(session, SocType.ILE, Quadra.ALPHA).id, Quadra.ALPHA)
+    session.commit()
+
+    first = claim_jobs(session, "w1", [Quadra.ALPHA], 3)
+    second = claim_jobs(session, "w2", [Quadra.ALPHA], 3)
+    assert len(first) == 3 and len(second) == 2
+    assert not {job.id for job in first} & {job.id for job in second}
+    assert claim_jobs(session, "w3", [Quadra.ALPHA], 3) == []
+
+    stale = datetime.utcnow() - timedelta(minutes=10)
+    session.execute(update(MatchmakingJob).where(MatchmakingJob.id == first[0].id).values(claimed_at=stale))
+    reclaimed = claim_jobs(session, "w3", [Quadra.ALPHA], 3, lease_seconds=60)
+    assert [job.id for job in reclaimed] == [first[0].id]
+    owner, attempts = session.execute(
+        select(MatchmakingJob.claimed_by, MatchmakingJob.attempts).where(MatchmakingJob.id == first[0].id)
+    ).one()
+    assert owner == "w3" and attempts == 2
+    session.close()
+
+
+def test_concurrent_workers_claim_each_job_once(tmp_path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False)
+    with factory() as session:
+        for _ in range(200):
+            _queue(session, make_user(session, SocType.ILE, Quadra.ALPHA).id, Quadra.ALPHA)
+        session.commit()
+
+    claimed: list[int] = []
+    lock = threading.Lock()
+
+    def work(worker_id: str) -> None:
+        while True:
+            with factory() as session:
+                jobs = claim_jobs(session, worker_id, [Quadra.ALPHA], 7)
+                session.commit()
+            if not jobs:
+                return
+            with lock:
+                claimed.extend(job.id for job in jobs)
+
+    threads = [threading.Thread(target=work, args=(f"w{index}",)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(claimed) == 200 and len(set(claimed)) == 200
+    with factory() as session:
+        assert set(session.scalars(select(MatchmakingJob.status))) == {JOB_RUNNING}
+    engine.dispose()
+
+
+def test_enqueue_returns_the_job_of_a_concurrent_enqueue(monkeypatch) -> None:
+    session = create_session()
+    user = make_user(session, SocType.ILE, Quadra.ALPHA)
+    existing = _queue(session, user.id, Quadra.ALPHA)
+    session.commit()
+
+    lookups = []
+    pending_job = jobs._pending_job
+
+    def racing(session, user_id):
+        # The first lookup runs before the other enqueue commits and finds nothing.
+        lookups.append(user_id)
+        return None if len(lookups) == 1 else pending_job(session, user_id)
+
+    monkeypatch.setattr(jobs, "_pending_job", racing)
+    assert enqueue_find_or_create(session, user.id, Quadra.ALPHA).id == existing.id
+    session.commit()
+    assert session.scalar(select(func.count()).select_from(MatchmakingJob)) == 1
+
+    session.execute(update(MatchmakingJob).values(status=JOB_DONE))
+    assert enqueue_find_or_create(session, user.id, Quadra.ALPHA).id != existing.id
+    session.close()
+
+
+def test_shards_split_quadras_round_robin() -> None:
+    quadras = list(Quadra)
+    assert shard_quadras(quadras, 2) == [quadras[0::2], quadras[1::2]]
+    assert shard_quadras(quadras, 16) == [[quadra] for quadra in quadras]
+    assert shard_quadras(quadras, 0) == [quadras]
+
+
+def test_async_find_or_create_returns_ticket(test_client) -> None:
+    response = test_client.post(
+        "/users",
+        json={"username": uuid.uuid4().hex[:8], "socionics_type": "SLI", "profile": {"socionics_type": "SLI"}},
+    )
+    user_id = response.json()["id"]
+
+    response = test_client.post("/clusters/find_or_create", json={"user_id": user_id, "quadra": "delta", "async": True})
+    assert response.status_code == 202
+    ticket = response.json()
+    assert ticket["status"] == JOB_QUEUED and response.headers["location"] == f"/jobs/{ticket['job_id']}"
+    again = test_client.post("/clusters/find_or_create", json={"user_id": user_id, "quadra": "delta", "async": True})
+    assert again.json()["job_id"] == ticket["job_id"]
+    assert test_client.get(f"/jobs/{ticket['job_id']}").json()["status"] == JOB_QUEUED
+
+    assert drain([Quadra.DELTA]) >= 1
+    job = test_client.get(f"/jobs/{ticket['job_id']}").json()
+    assert job["status"] == JOB_DONE and job["result"] is not None
+
+    # Rejected up front, like the inline call, instead of queueing a job bound to fail.
+    wrong = test_client.post("/clusters/find_or_create", json={"user_id": user_id, "quadra": "alpha", "async": True})
+    assert wrong.status_code == 400 and "not part of quadra" in wrong.json()["detail"]
+
+    missing = test_client.post("/clusters/find_or_create", json={"user_id": 10**9, "quadra": "delta", "async": True})
+    assert missing.status_code == 404
+    assert test_client.get("/jobs/999999999").status_code == 404
@@ -1,15 +1,23 @@
 from __future__ import annotations
 
 import pytest
+from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
 
-from quadral_cluster.domain.socionics import QUADRA_MEMBERS, Quadra, SocType
+from quadral_cluster.config import get_settings
+from quadral_cluster.database import Base
+from quadral_cluster.domain.socionics import QUADRA_MEMBERS, QUADRA_SLOT_BITS, Quadra, SocType
+from quadral_cluster.models.availability import Availability
 from quadral_cluster.models.cluster import Cluster, ClusterMember
+from quadral_cluster.models.domain import User
 from quadral_cluster.services.matching import (
     find_or_create_cluster_for_user,
     list_open_clusters_for_tim,
+    open_cluster_index_for,
     try_join_cluster,
 )
+from quadral_cluster.services.scoring_cache import mark_scoring_inputs_changed
+from quadral_cluster.utils.time_overlap import FULL_MASK
 
 from .utils_matching import create_session, make_user
 
@@ -78,3 +86,128 @@ def test_path_b_missing_members(db_session: Session) -> None:
     missing = set(result["missing"])
     expected_missing = {tim.value for tim in QUADRA_MEMBERS[quadra] if tim != SocType.IEE}
     assert expected_missing <= missing
+
+
+def test_open_clusters_filter_before_limit(db_session: Session) -> None:
+    quadra = Quadra.BETA
+    for _ in range(3):
+        founder = make_user(db_session, SocType.SLE, quadra)
+        result = try_join_cluster(founder.id, _empty_cluster(db_session, quadra).id, session=db_session)
+        assert result == {"ok": True}
+    taken = try_join_cluster(
+        make_user(db_session, SocType.IEI, quadra).id,
+        _empty_cluster(db_session, quadra).id,
+        session=db_session,
+    )
+    assert taken == {"ok": True}
+
+    open_for_sle = list_open_clusters_for_tim(quadra, SocType.SLE, limit=1, session=db_session)
+    assert len(open_for_sle) == 1
+    assert {member.socionics_type for member in open_for_sle[0].members} == {SocType.IEI.value}
+
+    open_for_eie = list_open_clusters_for_tim(quadra, SocType.EIE, limit=10, session=db_session)
+    assert len(open_for_eie) == 4
+    cluster = open_for_eie[0].cluster
+    assert cluster.member_count == 1
+    assert cluster.occupied_tims in {bit for bit in (1, 2, 4, 8)}
+
+
+def test_open_clusters_ranked_for_candidate(db_session: Session) -> None:
+    quadra = Quadra.BETA
+    candidate = make_user(db_session, SocType.EIE, quadra)
+    candidate.age, candidate.timezone = 30, "Europe/Berlin"
+    db_session.add(Availability(user_id=candidate.id, weekly_mask=FULL_MASK))
+
+    far = make_user(db_session, SocType.SLE, quadra)
+    far.age, far.timezone = 55, "Asia/Tokyo"
+    near = make_user(db_session, SocType.IEI, quadra)
+    near.age, near.timezone = 31, "Europe/Berlin"
+    db_session.add(Availability(user_id=near.id, weekly_mask=FULL_MASK))
+    for member in (far, near):
+        assert try_join_cluster(member.id, _empty_cluster(db_session, quadra).id, session=db_session) == {"ok": True}
+    db_session.flush()
+
+    ranked = list_open_clusters_for_tim(quadra, SocType.EIE, limit=2, session=db_session, candidate=candidate)
+    assert [item.members[0].user_id for item in ranked] == [near.id, far.id]
+    assert ranked[0].score > ranked[1].score
+
+    top = list_open_clusters_for_tim(quadra, SocType.EIE, limit=1, session=db_session, candidate=candidate)
+    assert [item.cluster.id for item in top] == [ranked[0].cluster.id]
+    assert top[0].score == pytest.approx(ranked[0].score)
+
+
+def test_open_cluster_snapshot_follows_commits(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("CACHE_REFRESH_SECONDS", "0")
+    get_settings.cache_clear()
+    url = f"sqlite:///{tmp_path / 'qc.db'}"
+    # Engines keep separate in-process state, like two API workers on one database.
+    ours, theirs = create_engine(url), create_engine(url)
+    Base.metadata.create_all(ours)
+    quadra = Quadra.BETA
+
+    def ranked(session: Session, candidate_id: int) -> list[tuple[int, float]]:
+        candidate = session.get(User, candidate_id)
+        found = list_open_clusters_for_tim(quadra, SocType.EIE, limit=10, session=session, candidate=candidate)
+        return [(item.cluster.id, item.score) for item in found]
+
+    try:
+        with Session(ours) as session:
+            candidate = make_user(session, SocType.EIE, quadra)
+            candidate.age, candidate.timezone = 30, "Europe/Berlin"
+            session.add(Availability(user_id=candidate.id, weekly_mask=FULL_MASK))
+            far = make_user(session, SocType.SLE, quadra)
+            far.age, far.timezone = 55, "Asia/Tokyo"
+            near = make_user(session, SocType.IEI, quadra)
+            near.age, near.timezone = 31, "Europe/Berlin"
+            session.add(Availability(user_id=near.id, weekly_mask=FULL_MASK))
+            first, second = _empty_cluster(session, quadra).id, _empty_cluster(session, quadra).id
+            session.commit()
+            candidate_id, far_id = candidate.id, far.id
+
+            assert [cluster_id for cluster_id, _ in ranked(session, candidate_id)] == [first, second]
+            assert try_join_cluster(far_id, first, session=session) == {"ok": True}
+            assert try_join_cluster(near.id, second, session=session) == {"ok": True}
+            session.commit()
+            assert [cluster_id for cluster_id, _ in ranked(session, candidate_id)] == [second, first]
+
+            far = session.get(User, far_id)
+            far.age, far.timezone = 31, "Europe/Berlin"
+            session.add(Availability(user_id=far_id, weekly_mask=FULL_MASK))
+            mark_scoring_inputs_changed(session, [far_id])
+            session.commit()
+            scores = dict(ranked(session, candidate_id))
+            assert scores[first] == pytest.approx(scores[second])
+
+        with Session(theirs) as session:
+            rival = make_user(session, SocType.EIE, quadra)
+            third = _empty_cluster(session, quadra).id
+            assert try_join_cluster(rival.id, first, session=session) == {"ok": True}
+            session.commit()
+
+        with Session(ours) as session:
+            assert [cluster_id for cluster_id, _ in ranked(session, candidate_id)] == [second, third]
+            # The snapshot serves every TIM; ``first`` only lost its EIE slot.
+            columns = open_cluster_index_for(session).columns(session, quadra)
+            assert columns.ids.tolist() == [first, second, third]
+            assert columns.occupied.tolist()[0] == QUADRA_SLOT_BITS[SocType.SLE] | QUADRA_SLOT_BITS[SocType.EIE]
+    finally:
+        ours.dispose()
+        theirs.dispose()
+        monkeypatch.undo()
+        get_settings.cache_clear()
+
+
+def _empty_cluster(session: Session, quadra: Quadra) -> Cluster:
+    cluster = Cluster(quadra=quadra.value, status="open")
+    session.add(cluster)
+    session.flush()
+    return cluster
+
+
+def test_open_clusters_route_accepts_candidate(test_client) -> None:
+    response = test_client.get("/clusters/open", params={"quadra": "beta", "tim": "EIE"})
+    assert response.status_code == 200
+    assert isinstance(response.json(), list)
+
+    missing = test_client.get("/clusters/open", params={"quadra": "beta", "tim": "EIE", "user_id": 10**9})
+    assert missing.status_code == 404
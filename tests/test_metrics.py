@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import uuid
+
+import pytest
+
+from quadral_cluster.domain.socionics import Quadra, SocType
+from quadral_cluster.metrics import CONTENT_TYPE, REGISTRY, MetricsRegistry
+from quadral_cluster.models.cluster import Cluster, ClusterMember
+from quadral_cluster.services.matching import try_join_cluster
+
+from .utils_matching import create_session, make_user
+
+
+def _samples(text: str) -> dict[str, float]:
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if line and not line.startswith("#")
+    }
+
+
+def test_registry_renders_prometheus_text() -> None:
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ("path",))
+    depth = registry.gauge("queue_depth", "Queued jobs.")
+    latency = registry.histogram("latency_seconds", "Latency.", ("path",), buckets=(0.1, 1.0))
+    requests.labels('/a"b').inc()
+    requests.labels('/a"b').inc(2)
+    depth.set(7)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.labels("/a").observe(value)
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text and "# TYPE latency_seconds histogram" in text
+    samples = _samples(text)
+    assert samples['requests_total{path="/a\\"b"}'] == 3
+    assert samples["queue_depth"] == 7
+    assert samples['latency_seconds_bucket{path="/a",le="0.1"}'] == 2
+    assert samples['latency_seconds_bucket{path="/a",le="1"}'] == 3
+    assert samples['latency_seconds_bucket{path="/a",le="+Inf"}'] == 4
+    assert samples['latency_seconds_count{path="/a"}'] == 4
+    assert samples['latency_seconds_sum{path="/a"}'] == pytest.approx(3.65)
+
+    with pytest.raises(ValueError):
+        registry.counter("requests_total", "Again.")
+    with pytest.raises(ValueError):
+        requests.labels("/a", "extra")
+
+
+def test_try_join_records_outcome() -> None:
+    session = create_session()
+    owner = make_user(session, SocType.ILE, Quadra.ALPHA)
+    rival = make_user(session, SocType.ILE, Quadra.ALPHA)
+    cluster = Cluster(quadra=Quadra.ALPHA.value, status="locked")
+    session.add(cluster)
+    session.flush()
+    session.add(ClusterMember(cluster_id=cluster.id, user_id=owner.id, socionics_type=SocType.ILE.value))
+    session.flush()
+
+    key = 'matching_operation_duration_seconds_count{operation="try_join_cluster",outcome="slot_taken"}'
+    before = _samples(REGISTRY.render()).get(key, 0)
+    assert try_join_cluster(rival.id, cluster.id, session=session) == {"ok": False, "reason": "slot_taken"}
+    assert _samples(REGISTRY.render())[key] == before + 1
+    session.close()
+
+
+def test_metrics_endpoint_reports_routes_pool_and_caches(test_client) -> None:
+    user = test_client.post(
+        "/users",
+        json={"username": uuid.uuid4().hex[:8], "socionics_type": "ILE", "profile": {"age": 30, "socionics_type": "ILE"}},
+    ).json()
+    test_client.get(f"/users/{user['id']}")
+    test_client.get("/matchmaking/recommendations", params={"user_id": user["id"]})
+    test_client.get("/matchmaking/recommendations", params={"user_id": user["id"]})
+    test_client.post("/clusters/find_or_create", json={"user_id": user["id"], "quadra": "alpha"})
+
+    response = test_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == CONTENT_TYPE
+    samples = _samples(response.text)
+    assert samples['http_requests_total{method="GET",route="/users/{user_id}",status="200"}'] >= 1
+    assert samples['http_request_duration_seconds_count{method="GET",route="/users/{user_id}"}'] >= 1
+    assert samples['http_request_db_statements_total{method="POST",route="/users"}'] >= 1
+    assert samples['db_pool_checkout_seconds_count{engine="sync"}'] >= 1
+    assert samples['cache_hits_total{cache="recommendation"}'] >= 1
+    assert 0 < samples['cache_hit_ratio{cache="recommendation"}'] <= 1
+    assert any(
+        name.startswith('matching_operation_duration_seconds_count{operation="find_or_create"') for name in samples
+    )
+    assert samples['matching_candidate_pool_size_count{operation="find_or_create"}'] >= 1
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from quadral_cluster.database import Base
+from quadral_cluster.domain.socionics import QUADRA_BITS, QUADRA_SLOT_BITS, Quadra, SocType
+from quadral_cluster.migrations import upgrade_database
+from quadral_cluster.models import availability, cluster, domain, job, preference  # noqa: F401
+from quadral_cluster.models.availability import Availability
+from quadral_cluster.models.cluster import MatchingCluster
+from quadral_cluster.models.domain import Cluster
+
+
+def _revision(engine) -> str:
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT version_num FROM alembic_version")).scalar_one()
+
+
+def test_migrations_build_the_model_schema(tmp_path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'qc.db'}")
+    upgrade_database(engine)
+    with engine.connect() as connection:
+        assert compare_metadata(MigrationContext.configure(connection), Base.metadata) == []
+    assert _revision(engine) == "0009"
+
+
+def test_create_all_database_is_stamped_not_rebuilt(tmp_path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'qc.db'}")
+    Base.metadata.create_all(engine)
+    upgrade_database(engine)
+    assert _revision(engine) == "0009"
+
+
+def test_upgrade_backfills_masks_and_aggregates(tmp_path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'qc.db'}")
+    upgrade_database(engine, "0001")
+    mask = "1" * 24 + "0" * 144
+    with engine.begin() as connection:
+        stamp = "'2026-01-01 00:00:00'"
+        connection.execute(
+            text(
+                "INSERT INTO users (id, username, socionics_type, created_at, updated_at) VALUES "
+                f"(1, 'a', 'ILE', {stamp}, {stamp}), (2, 'b', 'SLE', {stamp}, {stamp})"
+            )
+        )
+        connection.execute(
+            text(
+                "INSERT INTO profiles (user_id, age, socionics_type, reputation_score, activity_score, created_at, updated_at)"
+                f" VALUES (1, 30, 'ILE', 0.5, 0.5, {stamp}, {stamp}), (2, NULL, 'SLE', 0.5, 0.5, {stamp}, {stamp})"
+            )
+        )
+        connection.execute(text(f"INSERT INTO availabilities VALUES (1, :mask, {stamp})"), {"mask": mask})
+        connection.execute(
+            text(
+                "INSERT INTO clusters (id, name, language, activity_score, reputation_score, created_at, updated_at)"
+                f" VALUES (1, 'c', 'ru', 0.5, 0.5, {stamp}, {stamp})"
+            )
+        )
+        connection.execute(
+            text(
+                "INSERT INTO cluster_memberships (cluster_id, user_id, role, created_at, updated_at) VALUES "
+                f"(1, 1, 'founder', {stamp}, {stamp}), (1, 2, 'member', {stamp}, {stamp})"
+            )
+        )
+        connection.execute(text(f"INSERT INTO matching_clusters VALUES (1, 'beta', 'locked', {stamp}, {stamp})"))
+        connection.execute(text(f"INSERT INTO matching_cluster_members VALUES (1, 1, 2, 'SLE', {stamp})"))
+
+    upgrade_database(engine)
+
+    with Session(engine) as session:
+        assert session.get(Availability, 1).weekly_mask == int(mask, 2)
+        matching = session.get(MatchingCluster, 1)
+        assert (matching.member_count, matching.occupied_tims) == (1, QUADRA_SLOT_BITS[SocType.SLE])
+        aggregated = session.get(Cluster, 1)
+        assert (aggregated.member_count, aggregated.age_sum, aggregated.age_count) == (2, 30, 1)
+        assert aggregated.member_quadras == QUADRA_BITS[Quadra.ALPHA] | QUADRA_BITS[Quadra.BETA]
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import json
+import uuid
+
+from quadral_cluster.api.pagination import NDJSON_MEDIA_TYPE, NEXT_CURSOR_HEADER
+
+
+def _create_user(test_client, age: int = 30) -> int:
+    response = test_client.post(
+        "/users",
+        json={
+            "email": f"{uuid.uuid4().hex[:8]}@example.com",
+            "username": uuid.uuid4().hex[:8],
+            "socionics_type": "LII",
+            "profile": {"age": age, "socionics_type": "LII"},
+        },
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _pages(test_client, path: str, **params) -> list[list[dict]]:
+    pages = []
+    cursor = None
+    while True:
+        response = test_client.get(path, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return pages
+
+
+def test_users_pages_follow_cursor_and_match_stream(test_client) -> None:
+    created = {_create_user(test_client) for _ in range(5)}
+
+    pages = _pages(test_client, "/users", limit=2)
+    ids = [user["id"] for page in pages for user in page]
+    assert all(len(page) <= 2 for page in pages)
+    assert ids == sorted(set(ids)) and created <= set(ids)
+
+    streamed = test_client.get("/users", headers={"Accept": NDJSON_MEDIA_TYPE})
+    assert streamed.headers["content-type"].startswith(NDJSON_MEDIA_TYPE)
+    assert [json.loads(line) for line in streamed.text.splitlines()] == [user for page in pages for user in page]
+
+
+def test_search_pages_newest_first_with_age_filter(test_client) -> None:
+    language = uuid.uuid4().hex[:8]
+    names = []
+    for age in (30, 30, 50, 30, 30):
+        founder = _create_user(test_client, age)
+        name = uuid.uuid4().hex
+        response = test_client.post("/clusters", json={"name": name, "language": language, "founder_user_id": founder})
+        assert response.status_code == 201
+        names.append(name)
+    test_client.post("/clusters", json={"name": uuid.uuid4().hex, "language": language})  # no ages: always matches
+
+    pages = _pages(test_client, "/clusters/search", language=language, candidate_age=33, limit=2)
+    found = [cluster["name"] for page in pages for cluster in page]
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert found[1:] == [names[4], names[3], names[1], names[0]]
+
+
+def test_invalid_cursor_is_rejected(test_client) -> None:
+    assert test_client.get("/clusters", params={"cursor": "not-a-cursor"}).status_code == 400
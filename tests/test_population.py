@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from sqlalchemy import func, select
+
+from quadral_cluster.domain.socionics import QUADRA_MEMBERS, QUADRA_SLOT_BITS, Quadra, SocType
+from quadral_cluster.models.cluster import MatchingCluster, MatchingClusterMember
+from quadral_cluster.models.domain import Cluster, User
+from quadral_cluster.models.preference import Preference
+from quadral_cluster.services.matching import find_or_create_cluster_for_user
+from quadral_cluster.services.matchmaking import refresh_cluster_aggregates
+from quadral_cluster.services.population import PopulationSpec, generate_population
+
+from .utils_matching import create_session
+
+SPEC = PopulationSpec(users=400, seed=11)
+
+
+def _snapshot(session) -> tuple[list, list]:
+    users = session.execute(select(User.socionics_type, User.timezone, User.age).order_by(User.id)).all()
+    likes = session.execute(
+        select(Preference.from_user_id, Preference.to_user_id, Preference.weight).order_by(
+            Preference.from_user_id, Preference.to_user_id
+        )
+    ).all()
+    return users, likes
+
+
+def test_same_seed_gives_same_population() -> None:
+    first, second = create_session(), create_session()
+    summary = generate_population(first, SPEC)
+    generate_population(second, SPEC)
+
+    assert summary.users == 400 and summary.preferences > 400
+    assert 0 < summary.matching_members < summary.users
+    assert _snapshot(first) == _snapshot(second)
+    other = create_session()
+    generate_population(other, PopulationSpec(users=400, seed=12))
+    assert _snapshot(other) != _snapshot(first)
+    for session in (first, second, other):
+        session.close()
+
+
+def test_population_is_consistent_with_matching_invariants() -> None:
+    session = create_session()
+    generate_population(session, SPEC)
+
+    quadra_of = {tim.value: quadra.value for quadra, members in QUADRA_MEMBERS.items() for tim in members}
+    assert all(quadra == quadra_of[tim] for tim, quadra in session.execute(select(User.socionics_type, User.quadra)))
+    assert session.scalar(select(func.count()).where(Preference.from_user_id == Preference.to_user_id)) == 0
+
+    for cluster in session.scalars(select(MatchingCluster)):
+        tims = [SocType(member.socionics_type) for member in cluster.members]
+        assert all(tim in QUADRA_MEMBERS[Quadra(cluster.quadra)] for tim in tims)
+        assert cluster.member_count == len(tims)
+        assert cluster.occupied_tims == sum(QUADRA_SLOT_BITS[tim] for tim in tims)
+        assert (cluster.status == "full") == (len(tims) == 4)
+
+    stored = session.execute(
+        select(Cluster.id, Cluster.member_count, Cluster.age_sum, Cluster.age_count, Cluster.member_quadras)
+    ).all()
+    refresh_cluster_aggregates(session, [row.id for row in stored])
+    recomputed = session.execute(
+        select(Cluster.id, Cluster.member_count, Cluster.age_sum, Cluster.age_count, Cluster.member_quadras)
+    ).all()
+    assert stored == recomputed
+
+    in_cluster = select(MatchingClusterMember.id).where(MatchingClusterMember.user_id == User.id).exists()
+    user = session.scalars(select(User).where(~in_cluster).order_by(User.id).limit(1)).one()
+    result = find_or_create_cluster_for_user(user.id, Quadra(user.quadra), session=session)
+    assert result["ok"] is True and len(result["members"]) == 4
+    session.close()
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import time
+from collections import Counter
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from quadral_cluster.config import Settings, get_settings
+from quadral_cluster.models import availability, cluster, preference  # noqa: F401
+from quadral_cluster.models.domain import Cluster, Profile
+from quadral_cluster.profiling import PROFILE_ID_HEADER, TRIGGER_HEADER, ProfileStore, ProfilingMiddleware
+from quadral_cluster.services.matchmaking import evaluate_candidate
+
+TOKEN = "s3cret"
+
+
+def _score_for(seconds: float) -> None:
+    candidate = Profile(socionics_type="SLE", age=30, city="Kazan", reputation_score=0.5)
+    target = Cluster(name="c", target_quadra="beta", city="kazan", activity_score=1.0, age_sum=31, age_count=1)
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        evaluate_candidate(candidate, target)
+
+
+def _client(store: ProfileStore, **options) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, store=store, interval_ms=2, **options)
+
+    @app.get("/score/{seconds}")
+    def score(seconds: float) -> dict[str, bool]:
+        _score_for(seconds)
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def _stacks(store: ProfileStore, profile_id: str) -> Counter:
+    stacks = Counter()
+    for line in store.read(profile_id).splitlines():
+        stack, count = line.rsplit(" ", 1)
+        stacks[stack] += int(count)
+    return stacks
+
+
+def test_header_profiles_request_with_service_spans(tmp_path) -> None:
+    store = ProfileStore(tmp_path, keep=10)
+    client = _client(store, token=TOKEN)
+
+    response = client.get("/score/0.2", headers={TRIGGER_HEADER: TOKEN})
+    profile_id = response.headers[PROFILE_ID_HEADER]
+    assert profile_id.endswith("-GET-score_seconds")
+    assert [info.id for info in store.profiles()] == [profile_id]
+
+    stacks = _stacks(store, profile_id)
+    assert sum(stacks.values()) >= 10
+    # Stacks start at the outermost application frame and name it after the function.
+    assert all(stack.startswith("evaluate_candidate") for stack in stacks)
+    assert any(";compute_breakdown" in stack for stack in stacks)
+
+
+def test_wrong_token_and_fast_requests_are_not_profiled(tmp_path) -> None:
+    store = ProfileStore(tmp_path, keep=10)
+    client = _client(store, token=TOKEN, slow_ms=500)
+
+    response = client.get("/score/0.01", headers={TRIGGER_HEADER: "guess"})
+    assert response.status_code == 200 and PROFILE_ID_HEADER not in response.headers
+    assert store.profiles() == []
+
+
+def test_slow_requests_are_profiled_past_threshold(tmp_path) -> None:
+    store = ProfileStore(tmp_path, keep=2)
+    client = _client(store, slow_ms=50)
+
+    for _ in range(3):
+        assert PROFILE_ID_HEADER not in client.get("/score/0.15").headers
+    client.get("/score/0.01")
+
+    profiles = store.profiles()
+    assert len(profiles) == 2
+    assert all(any("evaluate_candidate" in stack for stack in _stacks(store, info.id)) for info in profiles)
+
+
+@pytest.fixture()
+def profiling_settings(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILING_TOKEN", TOKEN)
+    monkeypatch.setenv("PROFILING_DIR", str(tmp_path))
+    get_settings.cache_clear()
+    yield ProfileStore(tmp_path, keep=10)
+    monkeypatch.undo()
+    get_settings.cache_clear()
+
+
+def test_admin_routes_are_hidden_without_token(test_client) -> None:
+    assert get_settings().profiling_token is None
+    assert test_client.get("/admin/profiles", headers={"X-Profile-Token": TOKEN}).status_code == 404
+
+
+def test_slow_capture_requires_token(monkeypatch) -> None:
+    monkeypatch.setenv("PROFILING_SLOW_MS", "500")
+    with pytest.raises(ValidationError, match="PROFILING_TOKEN"):
+        Settings()
+    monkeypatch.setenv("PROFILING_TOKEN", TOKEN)
+    assert Settings().profiling_slow_ms == 500
+
+
+def test_admin_routes_list_and_return_profiles(test_client, profiling_settings) -> None:
+    store = profiling_settings
+    store.write("20260101T000000-abcd1234-POST-clusters_find_or_create", Counter({"a;b": 3, "a": 1}))
+
+    assert test_client.get("/admin/profiles").status_code == 403
+    assert test_client.get("/admin/profiles", headers={"X-Profile-Token": "guess"}).status_code == 403
+
+    headers = {"X-Profile-Token": TOKEN}
+    listed = test_client.get("/admin/profiles", headers=headers).json()
+    assert [item["id"] for item in listed] == ["20260101T000000-abcd1234-POST-clusters_find_or_create"]
+
+    response = test_client.get(f"/admin/profiles/{listed[0]['id']}", headers=headers)
+    assert response.status_code == 200 and response.text == "a;b 3\na 1\n"
+    assert test_client.get("/admin/profiles/missing", headers=headers).status_code == 404
+    assert test_client.get("/admin/profiles/..%2Fsecrets", headers=headers).status_code in (404, 422)
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from quadral_cluster.domain.socionics import QUADRA_MEMBERS, Quadra
+from quadral_cluster.query_counter import (
+    QUERIES_HEADER,
+    ROWS_HEADER,
+    TIME_HEADER,
+    QueryCounterMiddleware,
+    count_queries,
+    install_query_counter,
+    query_budget,
+)
+from quadral_cluster.services.matching import find_or_create_cluster_for_user
+
+from .utils_matching import create_session, make_user
+
+
+def _create_user(test_client, tim: str = "ILE") -> int:
+    response = test_client.post(
+        "/users",
+        json={"username": uuid.uuid4().hex[:8], "socionics_type": tim, "profile": {"age": 30, "socionics_type": tim}},
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _create_clusters(test_client, count: int) -> list[int]:
+    ids = []
+    for _ in range(count):
+        founder = _create_user(test_client)
+        response = test_client.post("/clusters", json={"name": uuid.uuid4().hex, "founder_user_id": founder})
+        assert response.status_code == 201
+        ids.append(response.json()["id"])
+    return ids
+
+
+def _recommendation_statements(test_client) -> int:
+    # The first request after a write rebuilds the engine snapshot; the
+    # budget is for a warm engine, so let another user pay for that.
+    test_client.get("/matchmaking/recommendations", params={"user_id": _create_user(test_client)})
+    user_id = _create_user(test_client)
+    test_client.get("/matchmaking/recommendations", params={"user_id": _create_user(test_client)})
+    with query_budget(3) as stats:
+        response = test_client.get("/matchmaking/recommendations", params={"user_id": user_id})
+    assert response.status_code == 200 and response.json()
+    return stats.statements
+
+
+def test_recommendations_do_not_query_per_cluster(test_client) -> None:
+    _create_clusters(test_client, 2)
+    few = _recommendation_statements(test_client)
+    _create_clusters(test_client, 12)
+    assert _recommendation_statements(test_client) == few
+
+
+def test_application_create_budget(test_client) -> None:
+    cluster_id = _create_clusters(test_client, 1)[0]
+    user_id = _create_user(test_client, "SEI")
+    with query_budget(4):
+        response = test_client.post("/applications", json={"user_id": user_id, "cluster_id": cluster_id})
+    assert response.status_code == 201
+
+
+@pytest.mark.parametrize("spare_candidates", [0, 20])
+def test_find_or_create_does_not_query_per_candidate(spare_candidates: int) -> None:
+    session = create_session()
+    install_query_counter(session.get_bind())
+    quadra = Quadra.BETA
+    tims = sorted(QUADRA_MEMBERS[quadra], key=lambda tim: tim.value)
+    initiator_id = make_user(session, tims[0], quadra).id
+    for index in range(3 + spare_candidates):
+        make_user(session, tims[1 + index % 3], quadra)
+    session.commit()
+
+    with query_budget(6):
+        result = find_or_create_cluster_for_user(initiator_id, quadra, session=session)
+    assert result["ok"] is True and len(result["members"]) == 4
+    session.close()
+
+
+def test_budget_failure_lists_statements() -> None:
+    session = create_session()
+    install_query_counter(session.get_bind())
+    with pytest.raises(AssertionError, match="2 SQL statements, budget is 1") as failure:
+        with query_budget(1):
+            session.execute(text("SELECT 1"))
+            session.execute(text("SELECT 2"))
+    assert "2. SELECT 2" in str(failure.value)
+    session.close()
+
+
+@pytest.mark.parametrize("emit_headers", [True, False])
+def test_middleware_reports_request_totals(emit_headers: bool) -> None:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    install_query_counter(engine)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+        connection.execute(text("INSERT INTO items (id) VALUES (1), (2)"))
+    app = FastAPI()
+    app.add_middleware(QueryCounterMiddleware, emit_headers=emit_headers)
+
+    @app.get("/probe")
+    def probe() -> int:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1")).all()
+            return len(connection.execute(text("SELECT id FROM items")).all())
+
+    with count_queries(record_sql=False) as stats:
+        response = TestClient(app).get("/probe")
+    assert response.json() == 2 and stats.statements == 2 and stats.rows == 3
+    if emit_headers:
+        assert response.headers[QUERIES_HEADER] == "2" and response.headers[ROWS_HEADER] == "3"
+        assert float(response.headers[TIME_HEADER]) >= 0
+    else:
+        assert QUERIES_HEADER not in response.headers
+    engine.dispose()
@@ -0,0 +1,232 @@
+"""Every query a hot route issues must be answerable without a full table scan.
+
+The routes run against a temporary database migrated to head and filled with
+a synthetic population large enough for SQLite's planner (after ``ANALYZE``)
+to prefer indexes whenever one applies. The SQL each request sends is
+captured and replayed through ``EXPLAIN QUERY PLAN``.
+"""
+
+from __future__ import annotations
+
+import random
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from quadral_cluster.api.pagination import encode_cursor
+from quadral_cluster.database import (
+    async_database_url,
+    get_async_session,
+    get_read_session,
+    get_read_session_factory,
+    get_session,
+    share_engine_state,
+)
+from quadral_cluster.domain.socionics import QUADRA_MEMBERS, QUADRA_SLOT_BITS, Quadra
+from quadral_cluster.main import app
+from quadral_cluster.migrations import upgrade_database
+from quadral_cluster.models import availability, cluster, domain, preference  # noqa: F401
+from quadral_cluster.models.availability import Availability
+from quadral_cluster.models.cluster import MatchingCluster, MatchingClusterMember
+from quadral_cluster.models.domain import Application, Cluster, ClusterMembership, Profile, TestResult, User
+from quadral_cluster.utils.time_overlap import HOURS_PER_WEEK
+
+USERS = 20_000
+CLUSTERS = 4_000
+LANGUAGES = ["ru", "en", "de", "es"]
+CITIES = ["Moscow", "Berlin", "Madrid", "London", None]
+EPOCH = datetime(2026, 1, 1)
+
+# ``SCAN t`` without ``USING ... INDEX`` walks the whole table.
+_FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+def _populate(connection, rng: random.Random) -> None:
+    quadras = list(Quadra)
+    users = []
+    for index in range(USERS):
+        quadra = quadras[index % len(quadras)]
+        tims = sorted(QUADRA_MEMBERS[quadra])
+        users.append(
+            {
+                "id": index + 1,
+                "username": f"user_{index}",
+                "socionics_type": tims[(index // len(quadras)) % len(tims)].value,
+                "quadra": quadra.value,
+                "age": rng.randint(18, 60),
+                "timezone": "Europe/Moscow",
+                "created_at": EPOCH + timedelta(minutes=index),
+            }
+        )
+    connection.execute(insert(User), users)
+    connection.execute(
+        insert(Profile),
+        [{"user_id": row["id"], "age": row["age"], "socionics_type": row["socionics_type"]} for row in users],
+    )
+    connection.execute(
+        insert(Availability),
+        [{"user_id": row["id"], "weekly_mask": rng.getrandbits(HOURS_PER_WEEK)} for row in users],
+    )
+    connection.execute(
+        insert(Cluster),
+        [
+            {
+                "id": index + 1,
+                "name": f"cluster_{index}",
+                "language": rng.choice(LANGUAGES),
+                "city": rng.choice(CITIES),
+                "created_at": EPOCH + timedelta(minutes=index),
+            }
+            for index in range(CLUSTERS)
+        ],
+    )
+    connection.execute(
+        insert(ClusterMembership),
+        [{"cluster_id": index % CLUSTERS + 1, "user_id": index + 1} for index in range(USERS // 2)],
+    )
+    connection.execute(
+        insert(Application),
+        [{"user_id": rng.randint(1, USERS), "cluster_id": rng.randint(1, CLUSTERS)} for _ in range(USERS)],
+    )
+    connection.execute(
+        insert(TestResult),
+        [{"user_id": rng.randint(1, USERS), "test_type": "socionics"} for _ in range(USERS)],
+    )
+    # Half of the users sit in partially filled matching clusters of two.
+    matching_members = []
+    matching_clusters = []
+    starts = [start + offset for start in range(0, USERS // 2, 8) for offset in range(4)]
+    for cluster_id, start in enumerate(starts, start=1):
+        pair = users[start : start + 8 : 4]  # same quadra, different TIMs
+        matching_clusters.append(
+            {
+                "id": cluster_id,
+                "quadra": pair[0]["quadra"],
+                "status": "locked",
+                "member_count": len(pair),
+                "occupied_tims": sum(QUADRA_SLOT_BITS[row["socionics_type"]] for row in pair),
+            }
+        )
+        matching_members += [
+            {"cluster_id": cluster_id, "user_id": row["id"], "socionics_type": row["socionics_type"]} for row in pair
+        ]
+    connection.execute(insert(MatchingCluster), matching_clusters)
+    connection.execute(insert(MatchingClusterMember), matching_members)
+    connection.exec_driver_sql("ANALYZE")
+
+
+@pytest.fixture(scope="module")
+def planned(tmp_path_factory):
+    """Yield ``(client, statements, explain)`` for the synthetic database."""
+
+    url = f"sqlite:///{tmp_path_factory.mktemp('plans') / 'qc.db'}"
+    engine = create_engine(url)
+    upgrade_database(engine)
+    with engine.begin() as connection:
+        _populate(connection, random.Random(5))
+
+    async_engine = create_async_engine(async_database_url(url))
+    share_engine_state(engine, async_engine.sync_engine)
+    sessions = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    sync_sessions = sessionmaker(bind=engine, autoflush=False)
+
+    async def override_async_session():
+        async with sessions() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    async def override_read_session():
+        async with sessions() as session:
+            yield session
+
+    def override_session():
+        with sync_sessions() as session:
+            yield session
+            session.commit()
+
+    statements: list[tuple[str, object]] = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def _capture(_connection, _cursor, statement, parameters, _context, executemany) -> None:
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            statements.append((statement, parameters))
+
+    def explain(statement: str, parameters) -> list[str]:
+        with engine.connect() as connection:
+            rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        return [row[-1] for row in rows]
+
+    app.dependency_overrides[get_async_session] = override_async_session
+    app.dependency_overrides[get_read_session] = override_read_session
+    app.dependency_overrides[get_session] = override_session
+    app.dependency_overrides[get_read_session_factory] = lambda: sync_sessions
+    try:
+        yield TestClient(app), statements, explain
+    finally:
+        app.dependency_overrides.clear()
+        event.remove(async_engine.sync_engine, "before_cursor_execute", _capture)
+        event.remove(engine, "before_cursor_execute", _capture)
+        async_engine.sync_engine.dispose()
+        engine.dispose()
+
+
+@pytest.mark.parametrize(
+    "method, path, body",
+    [
+        ("GET", "/users/{user}", None),
+        ("GET", "/users?limit=50&cursor={id_cursor}", None),
+        ("GET", "/users/{user}/applications", None),
+        ("GET", "/users/{user}/applications?limit=5&cursor={time_cursor}", None),
+        ("GET", "/users/{user}/tests", None),
+        ("GET", "/clusters?limit=50&cursor={id_cursor}", None),
+        ("GET", "/clusters/{cluster}", None),
+        ("GET", "/clusters/search?language=ru&city=Berlin&limit=20", None),
+        ("GET", "/clusters/search?language=ru&limit=20", None),
+        ("GET", "/clusters/search?limit=20", None),
+        ("GET", "/clusters/search?language=ru&limit=20&cursor={time_cursor}", None),
+        ("GET", "/clusters/search?candidate_age=30&limit=20&cursor={time_cursor}", None),
+        ("GET", "/matchmaking/recommendations?user_id={user}&limit=5", None),
+        ("GET", "/clusters/open?quadra=alpha&tim=ILE&limit=10&user_id={user}", None),
+        ("POST", "/clusters/find_or_create", {"user_id": "{user}", "quadra": "{quadra}"}),
+    ],
+)
+def test_route_queries_use_indexes(planned, method: str, path: str, body) -> None:
+    client, statements, explain = planned
+    rng = random.Random(path)
+
+    def request() -> None:
+        user = rng.randint(USERS // 2 + 1, USERS)  # outside any matching cluster
+        cluster_id = rng.randint(1, CLUSTERS)
+        values = {
+            "user": user,
+            "cluster": cluster_id,
+            "quadra": list(Quadra)[(user - 1) % 4].value,
+            "id_cursor": encode_cursor([cluster_id]),
+            "time_cursor": encode_cursor([EPOCH + timedelta(minutes=cluster_id - 1), cluster_id]),
+        }
+        payload = {key: value.format(**values) for key, value in body.items()} if body else None
+        if payload and "user_id" in payload:
+            payload["user_id"] = int(payload["user_id"])
+        response = client.request(method, path.format(**values), json=payload)
+        assert response.status_code < 400, response.text
+
+    request()  # warm per-engine indexes and snapshots
+    statements.clear()
+    request()
+    assert statements
+
+    scans = {
+        statement: [line for line in explain(statement, parameters) if _FULL_SCAN.match(line)]
+        for statement, parameters in statements
+    }
+    assert not {statement: lines for statement, lines in scans.items() if lines}
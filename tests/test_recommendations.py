@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from quadral_cluster.config import get_settings
+from quadral_cluster.database import Base
+from quadral_cluster.domain.socionics import QUADRA_BITS
+from quadral_cluster.models.domain import Cluster, ClusterMembership, Profile, User
+from quadral_cluster.services.matchmaking import (
+    RecommendationEngine,
+    evaluate_candidate,
+    mark_clusters_changed,
+    recommendation_engine_for,
+    refresh_cluster_aggregates,
+)
+from quadral_cluster.services.recommendations import recommendation_cache_for
+
+from .utils_matching import create_session
+
+_QUADRAS = [None, "", "Alpha", "beta", "GAMMA", "unknown"]
+_PSYCHOTYPES = [None, "", "Analyst", "builder"]
+_CITIES = [None, "", "Moscow", "moscow", "Kazan"]
+_TIMEZONES = [None, "Europe/Moscow", "Asia/Tokyo"]
+
+
+@pytest.fixture()
+def db_session() -> Session:
+    session = create_session()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _random_catalog(session: Session, rng: random.Random, count: int) -> list[Cluster]:
+    clusters = []
+    for index in range(count):
+        age_count = rng.choice([0, 0, 1, 3])
+        clusters.append(
+            Cluster(
+                name=f"cluster_{index}",
+                target_quadra=rng.choice(_QUADRAS),
+                target_psychotype=rng.choice(_PSYCHOTYPES),
+                city=rng.choice(_CITIES),
+                timezone=rng.choice(_TIMEZONES),
+                activity_score=rng.choice([0.5, 0.5, -0.2, 1.4, rng.random()]),
+                member_count=age_count,
+                age_sum=sum(rng.randint(18, 60) for _ in range(age_count)),
+                age_count=age_count,
+                member_quadras=rng.choice([0, *QUADRA_BITS.values(), 0b0101]),
+            )
+        )
+    session.add_all(clusters)
+    session.commit()
+    return clusters
+
+
+def _random_candidate(rng: random.Random) -> Profile:
+    return Profile(
+        socionics_type=rng.choice([None, "ile", "SLE", "EIE", "LSI"]),
+        psychotype=rng.choice([None, "analyst", "Builder", "Dreamer"]),
+        age=rng.choice([None, 25, 33, 47]),
+        city=rng.choice([None, "MOSCOW", "Kazan", "Perm"]),
+        timezone=rng.choice([None, "Europe/Moscow", "Asia/Tokyo"]),
+        reputation_score=rng.choice([0.5, 1.3]),
+    )
+
+
+def test_engine_matches_scalar_breakdown(db_session: Session) -> None:
+    rng = random.Random(7)
+    clusters = _random_catalog(db_session, rng, 300)
+    engine = RecommendationEngine()
+
+    for _ in range(25):
+        candidate = _random_candidate(rng)
+        exclude = {cluster.id for cluster in rng.sample(clusters, 5)}
+        expected = sorted(
+            (
+                (-evaluate_candidate(candidate, cluster)[1].total, cluster.id, evaluate_candidate(candidate, cluster))
+                for cluster in clusters
+                if cluster.id not in exclude
+            ),
+        )[:10]
+
+        ranked = engine.recommend(db_session, candidate, 10, exclude=exclude)
+
+        assert [item.cluster_id for item in ranked] == [cluster_id for _, cluster_id, _ in expected]
+        assert [(item.score, item.breakdown) for item in ranked] == [result for _, _, result in expected]
+
+
+def test_engine_patches_committed_changes(db_session: Session) -> None:
+    rng = random.Random(3)
+    clusters = _random_catalog(db_session, rng, 20)
+    engine = recommendation_engine_for(db_session)
+    candidate = Profile(socionics_type="SLE", age=30, city="Kazan", reputation_score=0.5)
+    engine.recommend(db_session, candidate, 3)
+    assert len(engine) == 20
+
+    target = clusters[5]
+    target.target_quadra, target.city, target.activity_score = "Beta", "Kazan", 1.0
+    target.age_sum, target.age_count = 30, 1
+    mark_clusters_changed(db_session, [target.id])
+    db_session.flush()
+    assert engine.recommend(db_session, candidate, 1)[0].cluster_id != target.id
+
+    db_session.commit()
+    added = Cluster(name="late", target_quadra="beta", city="kazan", activity_score=1.0, age_sum=31, age_count=1)
+    db_session.add(added)
+    db_session.flush()
+    mark_clusters_changed(db_session, [added.id])
+    db_session.commit()
+
+    top = engine.recommend(db_session, candidate, 2)
+    assert [item.cluster_id for item in top] == sorted([target.id, added.id])
+    assert top[0].score == evaluate_candidate(candidate, target)[0]
+    assert len(engine) == 21
+
+
+def test_engine_follows_other_processes_writes(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("CACHE_REFRESH_SECONDS", "0")
+    get_settings.cache_clear()
+    url = f"sqlite:///{tmp_path / 'qc.db'}"
+    # Engines keep separate in-process state, like two API workers on one database.
+    ours, theirs = create_engine(url), create_engine(url)
+    Base.metadata.create_all(ours)
+    candidate = Profile(socionics_type="SLE", age=30, city="Kazan", reputation_score=0.5)
+
+    try:
+        with Session(ours) as session:
+            clusters = _random_catalog(session, random.Random(5), 10)
+            target_id = clusters[4].id
+            ranked = recommendation_engine_for(session).recommend(session, candidate, 3)
+            assert target_id not in [item.cluster_id for item in ranked]
+            cache = recommendation_cache_for(session)
+            cache.store(1, 3, ranked, cache.lookup(1, 3)[1])
+
+        with Session(theirs) as session:
+            target = session.get(Cluster, target_id)
+            target.target_quadra, target.city, target.activity_score = "Beta", "Kazan", 1.0
+            session.commit()
+
+        with Session(ours) as session:
+            engine = recommendation_engine_for(session)
+            assert cache.lookup(1, 3)[0] is None
+            assert engine.recommend(session, candidate, 1)[0].cluster_id == target_id
+
+        with Session(theirs) as session:
+            user = User(username="member", socionics_type="SLE", quadra="beta")
+            session.add(user)
+            session.flush()
+            session.add(ClusterMembership(cluster_id=target_id, user_id=user.id))
+            session.add(Profile(user_id=user.id, socionics_type="SLE", age=30))
+            session.flush()
+            refresh_cluster_aggregates(session, [target_id])
+            session.commit()
+
+        with Session(ours) as session:
+            columns = recommendation_engine_for(session).snapshot(session)
+            position = columns.ids.tolist().index(target_id)
+            assert columns.avg_age[position] == 30
+    finally:
+        ours.dispose()
+        theirs.dispose()
+        monkeypatch.undo()
+        get_settings.cache_clear()
@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from quadral_cluster.config import get_settings
+from quadral_cluster.database import Base
+from quadral_cluster.domain.socionics import Quadra, SocType
+from quadral_cluster.models.availability import Availability
+from quadral_cluster.models.preference import Preference
+from quadral_cluster.services.matching import pair_score, score_candidates
+from quadral_cluster.services.scoring_cache import (
+    PairScoreCache,
+    mark_scoring_inputs_changed,
+    pair_score_cache_for,
+)
+from quadral_cluster.utils.time_overlap import HOURS_PER_WEEK
+
+from .utils_matching import create_session, make_user
+
+TIMEZONES = [None, "UTC", "Europe/Moscow", "Asia/Kathmandu", "America/New_York", "Not/AZone"]
+
+
+@pytest.fixture()
+def db_session() -> Session:
+    session = create_session()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _populate(session: Session, count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    users = []
+    for _ in range(count):
+        user = make_user(session, SocType.ILE, Quadra.ALPHA)
+        user.age = rng.choice([None, *range(18, 60)])
+        user.timezone = rng.choice(TIMEZONES)
+        if rng.random() < 0.8:
+            session.add(Availability(user_id=user.id, weekly_mask=rng.getrandbits(HOURS_PER_WEEK)))
+        users.append(user)
+    session.flush()
+
+    edges = {(source.id, target.id) for source, target in (rng.sample(users, 2) for _ in range(count * 3))}
+    for source_id, target_id in sorted(edges):
+        session.add(Preference(from_user_id=source_id, to_user_id=target_id, weight=rng.randint(-2, 2)))
+    session.flush()
+    session.expire_all()
+    return users
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_score_candidates_matches_scalar_pair_score(db_session: Session, seed: int) -> None:
+    users = _populate(db_session, 40, seed)
+    anchor, candidates = users[0], users[1:]
+
+    batch = score_candidates(anchor, candidates)
+
+    assert batch.shape == (len(candidates),)
+    for candidate, value in zip(candidates, batch):
+        assert value == pytest.approx(pair_score(anchor, candidate), abs=1e-9)
+
+
+def test_score_candidates_handles_empty_pool(db_session: Session) -> None:
+    anchor = make_user(db_session, SocType.ILE, Quadra.ALPHA)
+    assert score_candidates(anchor, []).shape == (0,)
+
+
+def test_timezone_offsets_are_cached_and_validated() -> None:
+    from quadral_cluster.utils.timezones import normalize_timezone, utc_offset_minutes
+
+    assert normalize_timezone("  europe/moscow ") == "Europe/Moscow"
+    assert normalize_timezone("") is None
+    with pytest.raises(ValueError):
+        normalize_timezone("Mars/Olympus_Mons")
+
+    assert utc_offset_minutes("Asia/Kathmandu") == 345
+    assert utc_offset_minutes("Not/AZone") is None
+    # 2024-03-31 00:30 UTC is just before the EU switch to summer time.
+    before = utc_offset_minutes("Europe/Berlin", now=1711845000.0)
+    after = utc_offset_minutes("Europe/Berlin", now=1711845000.0 + 3600)
+    assert (before, after) == (60, 120)
+
+
+def test_preference_index_updates_in_place(db_session: Session) -> None:
+    from quadral_cluster.services.preferences import preference_index_for
+
+    first = make_user(db_session, SocType.ILE, Quadra.ALPHA)
+    second = make_user(db_session, SocType.SEI, Quadra.ALPHA)
+    db_session.add(Preference(from_user_id=first.id, to_user_id=second.id, weight=2))
+    db_session.flush()
+
+    index = preference_index_for(db_session)
+    assert index.weight(first.id, second.id) == 2
+    assert dict(index.incoming(second.id)) == {first.id: 2}
+    liked = pair_score(first, second)
+    # Readers iterate returned maps without the lock, so writes must not touch them.
+    rated_by_second = index.outgoing(second.id)
+
+    index.set(second.id, first.id, 2)
+    assert dict(rated_by_second) == {}
+    assert dict(index.outgoing(second.id)) == {first.id: 2}
+    assert pair_score(first, second) > liked
+    assert pair_score(first, second) == pytest.approx(score_candidates(first, [second])[0])
+
+
+def test_queued_preference_edges_apply_on_commit_only(db_session: Session) -> None:
+    from quadral_cluster.services.preferences import preference_index_for, queue_preference_edges
+
+    first = make_user(db_session, SocType.ILE, Quadra.ALPHA)
+    second = make_user(db_session, SocType.SEI, Quadra.ALPHA)
+    db_session.commit()
+    index = preference_index_for(db_session)
+
+    db_session.add(Preference(from_user_id=first.id, to_user_id=second.id, weight=2))
+    db_session.flush()
+    queue_preference_edges(db_session, [(first.id, second.id, 2)])
+    assert index.weight(first.id, second.id) == 0
+    db_session.rollback()
+    db_session.commit()
+    assert index.weight(first.id, second.id) == 0
+
+    db_session.add(Preference(from_user_id=first.id, to_user_id=second.id, weight=-1))
+    queue_preference_edges(db_session, [(first.id, second.id, -1)])
+    db_session.commit()
+    assert index.weight(first.id, second.id) == -1
+
+
+def test_pair_cache_bumps_after_committed_edges_apply(db_session: Session, monkeypatch) -> None:
+    from quadral_cluster.services.preferences import preference_index_for, upsert_preferences
+
+    first = make_user(db_session, SocType.ILE, Quadra.ALPHA)
+    second = make_user(db_session, SocType.SEI, Quadra.ALPHA)
+    db_session.commit()
+    index = preference_index_for(db_session)
+    cache = pair_score_cache_for(db_session)
+    weights_at_bump = []
+    bump = cache.bump
+
+    def recording_bump(user_ids) -> None:
+        weights_at_bump.append(index.weight(first.id, second.id))
+        bump(user_ids)
+
+    monkeypatch.setattr(cache, "bump", recording_bump)
+    upsert_preferences(db_session, {(first.id, second.id): 2})
+    db_session.commit()
+    assert weights_at_bump == [2]
+
+
+def test_preference_index_picks_up_likes_from_other_processes(tmp_path, monkeypatch) -> None:
+    from quadral_cluster.services.preferences import preference_index_for
+
+    monkeypatch.setenv("CACHE_REFRESH_SECONDS", "0")
+    get_settings.cache_clear()
+    url = f"sqlite:///{tmp_path / 'qc.db'}"
+    # Engines keep separate in-process state, like two API workers on one database.
+    ours, theirs = create_engine(url), create_engine(url)
+    Base.metadata.create_all(ours)
+    try:
+        with Session(ours) as session:
+            first = make_user(session, SocType.ILE, Quadra.ALPHA).id
+            second = make_user(session, SocType.SEI, Quadra.ALPHA).id
+            session.add(Preference(from_user_id=first, to_user_id=second, weight=1))
+            session.commit()
+            assert preference_index_for(session).weight(first, second) == 1
+            version = pair_score_cache_for(session).version(second)
+
+        with Session(theirs) as session:
+            session.merge(Preference(from_user_id=first, to_user_id=second, weight=-2))
+            session.add(Preference(from_user_id=second, to_user_id=first, weight=2))
+            session.commit()
+
+        with Session(ours) as session:
+            index = preference_index_for(session)
+            assert (index.weight(first, second), index.weight(second, first)) == (-2, 2)
+            assert pair_score_cache_for(session).version(second) > version
+            # Rows inside the overlap window are re-read but change nothing.
+            assert index.refresh(session) == set()
+    finally:
+        ours.dispose()
+        theirs.dispose()
+        monkeypatch.undo()
+        get_settings.cache_clear()
+
+
+def test_pair_cache_sees_availability_from_other_processes(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("CACHE_REFRESH_SECONDS", "0")
+    get_settings.cache_clear()
+    url = f"sqlite:///{tmp_path / 'qc.db'}"
+    ours, theirs = create_engine(url), create_engine(url)
+    Base.metadata.create_all(ours)
+    try:
+        with Session(ours) as session:
+            target = make_user(session, SocType.ILE, Quadra.ALPHA).id
+            session.commit()
+            pair_score_cache_for(session)
+            settled = pair_score_cache_for(session).version(target)
+            assert pair_score_cache_for(session).version(target) == settled
+
+        with Session(theirs) as session:
+            session.add(Availability(user_id=target, weekly_mask=0b111))
+            session.commit()
+
+        with Session(ours) as session:
+            changed = pair_score_cache_for(session).version(target)
+            assert changed > settled
+            assert pair_score_cache_for(session).version(target) == changed
+    finally:
+        ours.dispose()
+        theirs.dispose()
+        monkeypatch.undo()
+        get_settings.cache_clear()
+
+
+def test_pair_cache_is_symmetric_and_versioned(db_session: Session) -> None:
+    users = _populate(db_session, 12, seed=5)
+    anchor, candidates = users[0], users[1:]
+    cache = pair_score_cache_for(db_session)
+
+    first = score_candidates(anchor, candidates, cache=cache)
+    assert first == pytest.approx(score_candidates(anchor, candidates))
+    assert cache.stats().misses == len(candidates)
+
+    reverse = cache.lookup(candidates[3].id, [anchor.id])
+    assert reverse.scores[0] == pytest.approx(first[3])
+
+    target = candidates[3]
+    db_session.merge(Availability(user_id=target.id, weekly_mask=0))
+    mark_scoring_inputs_changed(db_session, [target.id])
+    db_session.commit()
+    db_session.expire_all()
+
+    again = score_candidates(anchor, candidates, cache=cache)
+    assert again == pytest.approx(score_candidates(anchor, candidates))
+    stats = cache.stats()
+    assert (stats.stale, stats.hits) == (1, 1 + len(candidates) - 1)
+
+
+def test_pair_cache_files_late_results_under_old_stamps() -> None:
+    cache = PairScoreCache(maxsize=2)
+    lookup = cache.lookup(1, [2, 3, 4])
+    cache.bump([3])
+    cache.store(1, [2, 3, 4], [0.1, 0.2, 0.3], lookup, range(3))
+
+    assert len(cache) == 2
+    assert cache.stats().evictions == 1
+    refreshed = cache.lookup(1, [3, 4])
+    assert refreshed.missing.tolist() == [0]
+    assert refreshed.scores[1] == pytest.approx(0.3)
+
+
+def test_pair_cache_forgets_old_changes_without_reviving_entries() -> None:
+    cache = PairScoreCache(maxsize=2)
+    lookup = cache.lookup(1, [2])
+    cache.store(1, [2], [0.5], lookup, [0])
+    cache.bump([2])
+    for user_id in range(10, 20):
+        cache.bump([user_id])
+
+    assert len(cache._changed) == 2
+    assert cache.version(2) >= 1
+    assert cache.lookup(1, [2]).missing.tolist() == [0]
+    fresh = cache.lookup(1, [2])
+    cache.store(1, [2], [0.7], fresh, [0])
+    assert cache.lookup(2, [1]).scores[0] == pytest.approx(0.7)
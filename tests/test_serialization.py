@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from quadral_cluster.api.serialization import APPLICATION_READ, CLUSTER_READ, USER_READ, FastJSONResponse
+from quadral_cluster.models.domain import Application, ApplicationStatusEnum, Cluster, Profile, User
+from quadral_cluster.schemas import ApplicationRead, ClusterRead, UserRead
+
+from .utils_matching import create_session
+
+
+def test_projections_match_schema_dumps() -> None:
+    session = create_session()
+    with_profile = User(username="анна", email="anna@example.com", socionics_type="LSI", quadra=None)
+    with_profile.profile = Profile(age=34, city="Казань", interests=["chess"], socionics_type="LSI")
+    bare = User(username="boris", socionics_type="SEE", quadra="gamma")
+    cluster = Cluster(name="Клуб", city=None, activity_score=0.25)
+    session.add_all([with_profile, bare, cluster])
+    session.flush()
+    session.add(Application(user_id=bare.id, cluster_id=cluster.id, compatibility_score=0.5))
+    session.add(Application(user_id=bare.id, cluster_id=cluster.id, status=ApplicationStatusEnum.APPROVED))
+    session.commit()
+
+    cases = [
+        (USER_READ, UserRead, select(User).options(selectinload(User.profile)).order_by(User.id), User.id),
+        (CLUSTER_READ, ClusterRead, select(Cluster), Cluster.id),
+        (APPLICATION_READ, ApplicationRead, select(Application).order_by(Application.id), Application.id),
+    ]
+    for projection, schema, orm_query, key in cases:
+        expected = [schema.model_validate(obj).model_dump() for obj in session.scalars(orm_query)]
+        dumped = projection.dump_all(session.execute(projection.select().order_by(key)))
+        assert dumped == expected
+        assert [list(item) for item in dumped] == [list(item) for item in expected]
+        as_json = [schema.model_validate(item).model_dump(mode="json") for item in dumped]
+        assert FastJSONResponse(dumped).body == JSONResponse(as_json).body
+
+    users = USER_READ.dump_all(session.execute(USER_READ.select().order_by(User.id)))
+    assert [(user["quadra"], user["profile"] and user["profile"]["city"]) for user in users] == [
+        ("beta", "Казань"),
+        ("gamma", None),
+    ]
+    session.close()
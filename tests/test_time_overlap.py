@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import base64
+import random
+
+import pytest
+
+from quadral_cluster.utils.time_overlap import (
+    HOURS_PER_WEEK,
+    decode_weekly_mask,
+    ensure_mask_length,
+    mask_from_bytes,
+    mask_to_bytes,
+    overlap,
+    pack_weekly_mask,
+)
+
+
+def _reference_overlap(bits_a: list[int], bits_b: list[int]) -> float:
+    total_a, total_b = sum(bits_a), sum(bits_b)
+    if total_a == 0 and total_b == 0:
+        return 0.0
+    common = sum(1 for a, b in zip(bits_a, bits_b) if a and b)
+    return common / max(total_a, total_b, 1)
+
+
+def test_pack_matches_string_form() -> None:
+    bits = [1, 0, 1] + [0] * (HOURS_PER_WEEK - 3)
+    packed = pack_weekly_mask(bits)
+    assert packed == int(ensure_mask_length(bits), 2)
+    assert packed >> (HOURS_PER_WEEK - 1) == 1
+
+
+def test_bytes_roundtrip() -> None:
+    rng = random.Random(7)
+    mask = rng.getrandbits(HOURS_PER_WEEK)
+    raw = mask_to_bytes(mask)
+    assert len(raw) == 21
+    assert mask_from_bytes(raw) == mask
+    assert pack_weekly_mask(decode_weekly_mask(base64.b64encode(raw).decode())) == mask
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_popcount_overlap_matches_bitwise_reference(seed: int) -> None:
+    rng = random.Random(seed)
+    bits_a = [1 if rng.random() < 0.3 else 0 for _ in range(HOURS_PER_WEEK)]
+    bits_b = [1 if rng.random() < 0.5 else 0 for _ in range(HOURS_PER_WEEK)]
+    assert overlap(pack_weekly_mask(bits_a), pack_weekly_mask(bits_b)) == pytest.approx(
+        _reference_overlap(bits_a, bits_b)
+    )
+
+
+def test_overlap_of_empty_masks() -> None:
+    assert overlap(0, 0) == 0.0
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+import uuid
+
+from sqlalchemy import func, select
+
+from quadral_cluster.models.domain import Profile, User
+from quadral_cluster.services.user_import import CSV, import_users, parse_records
+
+from .utils_matching import create_session
+
+
+def _record(username: str, **fields) -> dict:
+    return {"username": username, "socionics_type": "EIE", "profile": {"age": 25, "timezone": "europe/berlin"}, **fields}
+
+
+def test_import_endpoint_reports_rows_and_commits_chunks(test_client) -> None:
+    names = [uuid.uuid4().hex[:12] for _ in range(4)]
+    lines = [
+        json.dumps(_record(names[0])),
+        "{not json",
+        json.dumps(_record(names[1], quadra="alpha")),  # EIE is beta
+        json.dumps(_record(names[2])),
+        "",
+        json.dumps(_record(names[0])),  # duplicate of a row committed in the first chunk
+        json.dumps(_record(names[3], profile={"age": 12})),
+    ]
+    response = test_client.post(
+        "/users/import",
+        params={"chunk_size": 2},
+        content="\n".join(lines).encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["created"], report["failed"]) == (2, 4)
+    assert [error["line"] for error in report["errors"]] == [2, 3, 6, 7]
+    assert report["errors"][2]["errors"] == ["username: already exists"]
+    assert report["errors"][3]["errors"][0].startswith("profile.age:")
+
+    users = {user["username"]: user for user in test_client.get("/users", params={"limit": 500}).json()}
+    imported = users[names[2]]
+    assert imported["quadra"] == "beta"
+    assert imported["profile"]["timezone"] == "Europe/Berlin"
+
+    unsupported = test_client.post("/users/import", content=b"{}", headers={"Content-Type": "application/json"})
+    assert unsupported.status_code == 415
+
+
+def test_import_csv_splits_user_and_profile_columns() -> None:
+    session = create_session()
+    lines = [
+        "username,email,socionics_type,age,city,interests",
+        "anna,anna@example.com,LSI,34,Kazan,chess; hiking",
+        "boris,anna@example.com,SEE,,,",
+        "vera,vera@example.com,ESI,41",
+    ]
+    report = import_users(session, parse_records(lines, CSV), chunk_size=100)
+
+    assert report.created == 1
+    assert [(error.line, error.errors) for error in report.errors] == [
+        (3, ["email: already exists"]),
+        (4, ["expected 6 columns, got 4"]),
+    ]
+    user = session.scalars(select(User)).one()
+    assert (user.username, user.quadra, user.profile.age, user.profile.socionics_type) == ("anna", "beta", 34, "LSI")
+    assert user.age == 34
+    assert user.profile.interests == ["chess", "hiking"]
+    assert session.scalar(select(func.count()).select_from(Profile)) == 1
+    session.close()
@@ -7,7 +7,7 @@ from sqlalchemy.orm import Session, sessionmaker
 
 from quadral_cluster.database import Base
 from quadral_cluster.domain.socionics import Quadra, SocType
-from quadral_cluster.models import availability, cluster, domain, preference  # noqa: F401
+from quadral_cluster.models import availability, cluster, domain, job, preference  # noqa: F401
 from quadral_cluster.models.domain import User
 
 